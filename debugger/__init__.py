@@ -28,9 +28,14 @@ from debugger import *
 from location import *
 from stack_frame import *
 from breakpoint import *
+from logpoint import *
 from file_manager import *
 from dprocess import *
 from dthread import *
+from unique_stacks import *
+from watch import *
+from profiler import *
+from symbol_index_cache import *
 from dpty import *
 
 def __init__():
@@ -11,12 +11,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from util import *
 from . import *
 
 _breakpoint_id_counter = 1
 
 class Breakpoint(object):
-  def __init__(self,location):
+  def __init__(self,location,condition=None,ignore_count=0,hit_threshold=0):
     global _breakpoint_id_counter
     self._id = _breakpoint_id_counter
     _breakpoint_id_counter += 1
@@ -26,9 +27,13 @@ class Breakpoint(object):
     self._debugger = None
     self._location = location # might be null
     self._enabled = True # whether the breakpoint is enabled
+    self._condition = condition # expression the backend checks on each hit, stopping only when true
+    self._ignore_count = ignore_count # hits to skip before stopping
+    self._hit_threshold = hit_threshold # stop only from this hit onward
     self._backend_breakpoints = {} # the backends on which this breakpoint is currently established
     self._actual_location_list = None # the location where the debugger actually placed the bkpt
     self._error = ""
+    self._bind_generation = 0 # bumped on every (un)bind so late bulk-insert replies can be dropped
 
     self._update()
 
@@ -66,6 +71,52 @@ class Breakpoint(object):
         bp = self._backend_breakpoints[backend]
         backend.disable_breakpoint(self,bp.id)
 
+  @property
+  def condition(self):
+    """Expression evaluated by the backend on each hit. The breakpoint only stops when it is true. None for always."""
+    return self._condition
+  @condition.setter
+  def condition(self,condition):
+    if condition == "":
+      condition = None
+    self._condition = condition
+    if self._debugger:
+      self._debugger._on_breakpoint_needs_update(self, lambda: self._push_condition(True, False))
+
+  @property
+  def ignore_count(self):
+    """Number of hits to skip before stopping, counted from when it is set or the breakpoint is bound."""
+    return self._ignore_count
+  @ignore_count.setter
+  def ignore_count(self,count):
+    self._ignore_count = count
+    if self._debugger:
+      self._debugger._on_breakpoint_needs_update(self, lambda: self._push_condition(False, True))
+
+  @property
+  def hit_threshold(self):
+    """
+    Hit number from which on the breakpoint stops, e.g. 5000 to stop on the
+    5000th hit and later ones. Hits where the condition is false don't count.
+    0 to stop on every hit.
+    """
+    return self._hit_threshold
+  @hit_threshold.setter
+  def hit_threshold(self,threshold):
+    self._hit_threshold = threshold
+    if self._debugger:
+      self._debugger._on_breakpoint_needs_update(self, lambda: self._push_condition(False, True))
+
+  @property
+  def hit_count(self):
+    """Number of hits so far that satisfied the condition, summed over all backends."""
+    count = 0
+    for backend in self._backend_breakpoints:
+      bp = self._backend_breakpoints[backend]
+      if bp.valid:
+        count += backend.get_breakpoint_hit_count(bp.id)
+    return count
+
   @property
   def all_valid(self):
     """Whether the breakpoint is valid. If invalid, check error for why."""
@@ -106,6 +157,20 @@ class Breakpoint(object):
         locs.add(l)
     return list(locs)
 
+  def __repr__(self):
+    return "Breakpoint(%r%s)" % (self._location, self._get_condition_repr())
+
+  def _get_condition_repr(self):
+    """Keyword arguments recreating the condition, ignore count and threshold, for __repr__."""
+    res = ""
+    if self._condition != None:
+      res += ", condition=%r" % self._condition
+    if self._ignore_count:
+      res += ", ignore_count=%r" % self._ignore_count
+    if self._hit_threshold:
+      res += ", hit_threshold=%r" % self._hit_threshold
+    return res
+
   @property
   def on_hit(self):
     """Hit util.Event fired when the debugger stops on this breakpoint."""
@@ -114,12 +179,15 @@ class Breakpoint(object):
   # Innards
   def _get_debugger(self):
     return self._debugger
-  def _set_debugger(self,val):
+  def _set_debugger(self,val,update=True):
+    """Binds to a debugger. With update=False the caller inserts the backend breakpoints itself."""
     if self._debugger and val:
       raise Exception("Can't set debugger. Already bound to one! You probably added this breakpoint already.")
     self._delete_cur_breakpoint_if_needed()
     self._debugger = val
-    self._update()
+    self._bind_generation += 1
+    if update:
+      self._update()
 
   def _delete_cur_breakpoint_if_needed(self):
     for backend in self._backend_breakpoints:
@@ -129,6 +197,61 @@ class Breakpoint(object):
       self._valid = False
     self._backend_breakpoints.clear()
 
+  def _get_dprintf(self):
+    """What to print instead of stopping, for backend.begin_new_breakpoints. None for plain breakpoints."""
+    return None
+
+  def _get_condition(self):
+    """
+    The condition and ignore count to insert the breakpoint with, for
+    backend.begin_new_breakpoints. None when it should stop on every hit.
+    """
+    ignore_count = max(self._ignore_count, self._hit_threshold - 1)
+    if self._condition == None and ignore_count == 0:
+      return None
+    return DynObject({"expression" : self._condition, "ignore_count" : ignore_count})
+
+  def _get_ignore_count(self, backend, bp):
+    if self._hit_threshold <= 1:
+      return self._ignore_count
+    remaining = self._hit_threshold - 1 - backend.get_breakpoint_hit_count(bp.id)
+    return max(self._ignore_count, remaining)
+
+  def _push_condition(self, condition, ignore_count):
+    """Updates the condition and/or ignore count of the already inserted backend breakpoints."""
+    for backend in self._backend_breakpoints.keys():
+      bp = self._backend_breakpoints[backend]
+      if not bp.valid:
+        continue
+      try:
+        if condition:
+          backend.set_breakpoint_condition(bp.id, self._condition)
+        if ignore_count:
+          backend.set_breakpoint_ignore_count(bp.id, self._get_ignore_count(backend, bp))
+      except DebuggerException, e:
+        # leaving it in would stop where the user asked it not to
+        backend.delete_breakpoint(bp.id)
+        self._set_backend_breakpoint(backend, None, e)
+    self._debugger._on_breakpoint_changed(self)
+
+  def _make_hit_cb(self, backend):
+    return lambda: self._debugger._on_backend_breakpoint_hit(backend,self)
+
+  def _set_backend_breakpoint(self, backend, res, exc):
+    """Records the result of inserting this breakpoint on backend: res from new_breakpoint or the exception it raised."""
+    bp = DynObject()
+    if exc:
+      log1("Error creating breakpoint %s on %s: %s", self._location, backend, exc.message)
+      bp.valid = False
+      bp.error = exc.message
+    else:
+      bp.id = res.id
+      bp.valid = True
+      bp.location_list = res.location_list
+      if self._enabled == False: # they get created 'enabled'
+        backend.disable_breakpoint(bp.id)
+    self._backend_breakpoints[backend] = bp
+
   def _update(self):
     # early out if we're not attached
     if not self._debugger:
@@ -138,24 +261,12 @@ class Breakpoint(object):
     self._delete_cur_breakpoint_if_needed()
 
     # issue break command
-    location = self._location
     for backend in self._debugger._backends:
       try:
-        resp = backend.new_breakpoint(location, lambda: self._debugger._on_backend_breakpoint_hit(backend,self))
-        bp = DynObject()
-        bp.id = resp.id
-        bp.valid = True
-        bp.location_list = resp.location_list
-        if self._enabled == False: # they get created 'enabled'
-          backend.disable_breakpoint(self,bp.id)
-        self._backend_breakpoints[backend] = bp
-
+        resp = backend.new_breakpoint(self._location, self._make_hit_cb(backend), self._get_dprintf(), self._get_condition())
+        self._set_backend_breakpoint(backend, resp, None)
       except DebuggerException,e:
-        log1("Error creating breakpoint %s on %s: %s", location, backend, e.message)
-        bp = DynObject()
-        bp.valid = False
-        bp.error = e.message
-        self._backend_breakpoints[backend] = bp
+        self._set_backend_breakpoint(backend, None, e)
 
     # let debugger know of change
     if self._debugger:
@@ -32,10 +32,15 @@ from . import *
 from debugger_base import *
 from gdb_backend import GdbBackend, GDB_STATUS_BREAK, GDB_STATUS_RUNNING
 from gdb_parsers import GdbPhraseMatcher
+from gdb_backend_pool import GdbBackendPool
 from dpassive_process import *
+from unique_stacks import *
+from watch import *
+from logpoint import *
+from profiler import *
 
 class Debugger(DebuggerBase):
-  def __init__(self,use_multiple_gdb_backends_override=False):
+  def __init__(self,use_multiple_gdb_backends_override=False,backend_pool_size=0):
     DebuggerBase.__init__(self)
     self._first_added_process = None
     self._processes = IdentifiedItemListBase(lambda p: p.frontend_id)
@@ -56,7 +61,12 @@ class Debugger(DebuggerBase):
     self._backends = []
     self._gdb_backend = None # don't access this directly, use self._get_backend_for_new_process
     self._use_multiple_gdb_backends_override = use_multiple_gdb_backends_override
+    self._backend_pool = GdbBackendPool(backend_pool_size) # warm backends, so new processes don't wait for gdb to start
+    self._lazy_solib_symbols = False
+    self._non_stop = False
+    self._logpoint_log = LogpointLog()
     self._pending_on_status_break_callbacks = [] # callbacks to run when we next hit status = break
+    self._sample = None # the begin_sample_stacks in progress
 
     # processes, threads, status
     self._status_changed = Event()
@@ -66,6 +76,7 @@ class Debugger(DebuggerBase):
 
     # other stuff
     self._init_breakpoints()
+    self._init_watches()
     self._init_interpreter()
 
   def _get_backend_for_new_process(self):
@@ -73,7 +84,10 @@ class Debugger(DebuggerBase):
       if self._gdb_backend == None:
         log1("Debugger: Creating backend")
         rebind_breakpoints = self._temporarily_unbind_all_breakpoints()
-        self._gdb_backend = GdbBackend()
+        self._gdb_backend = self._backend_pool.take()
+        self._gdb_backend.lazy_solib_symbols = self._lazy_solib_symbols
+        self._gdb_backend.non_stop = self._non_stop
+        self._gdb_backend.logpoint_log = self._logpoint_log
         self._backends.append(self._gdb_backend)
         self._set_listening_to_backend(self._gdb_backend, True)
         rebind_breakpoints()
@@ -87,7 +101,10 @@ class Debugger(DebuggerBase):
 
       log1("Debugger: Creating backend")
       rebind_breakpoints = self._temporarily_unbind_all_breakpoints()
-      backend = GdbBackend()
+      backend = self._backend_pool.take()
+      backend.lazy_solib_symbols = self._lazy_solib_symbols
+      backend.non_stop = self._non_stop
+      backend.logpoint_log = self._logpoint_log
       self._backends.append(backend)
       self._set_listening_to_backend(backend, True)
       rebind_breakpoints()
@@ -122,6 +139,7 @@ class Debugger(DebuggerBase):
       if self._backends > 1 and len(backend.processes) == 0 and len(backend.threads) == 0:
         log1("Debugger: Shutting down backend")
         rebind_breakpoints = self._temporarily_unbind_all_breakpoints()
+        self._forget_watches_on_backend(backend)
         backend.shutdown(force=True)
         self._set_listening_to_backend(backend,False)
         self._backends.remove(backend)
@@ -130,11 +148,78 @@ class Debugger(DebuggerBase):
   def shutdown(self):
     log1("Debugger: Shutting down")
     self._shutdown_breakpoints()
+    for backend in self._backends:
+      self._forget_watches_on_backend(backend)
     log1("Debugger: Shutting backends")
     for backend in self._backends:
       self._set_listening_to_backend(backend,False)
       backend.shutdown(force=True)
     del self._backends[:]
+    self._backend_pool.shutdown()
+
+  @property
+  def backend_pool(self):
+    """The GdbBackendPool new processes take their backends from. Its size can be changed."""
+    return self._backend_pool
+
+  @property
+  def lazy_solib_symbols(self):
+    """
+    Whether shared library symbols are read only when needed: for libraries
+    that frames being looked at are in, that hold breakpoint addresses, or
+    that load_library_symbols is asked for. Makes attaching to and
+    launching programs with many libraries much faster. Affects processes
+    launched or attached to afterward.
+    """
+    return self._lazy_solib_symbols
+  @lazy_solib_symbols.setter
+  def lazy_solib_symbols(self, lazy):
+    self._lazy_solib_symbols = lazy
+    for backend in self._backends:
+      if len(backend.processes) == 0:
+        backend.lazy_solib_symbols = lazy
+
+  @property
+  def non_stop(self):
+    """
+    Whether threads stop and resume individually. A breakpoint hit or step
+    then only stops the thread concerned, and the debugger's status follows
+    the active thread. Can only be changed when there are no processes.
+    """
+    return self._non_stop
+
+  @non_stop.setter
+  def non_stop(self, non_stop):
+    if len(self._processes):
+      raise DebuggerException("Can only change non-stop mode when there are no processes")
+    self._non_stop = non_stop
+    for backend in self._backends:
+      backend.non_stop = non_stop
+
+  @property
+  def libraries(self):
+    """Shared libraries of all processes, as DynObjects with name, ranges and symbols_loaded."""
+    res = []
+    for backend in self._backends:
+      res.extend(backend.libraries)
+    return res
+
+  def load_library_symbols(self, name_regex = ""):
+    """
+    Reads symbols for every library whose name name_regex matches a part of,
+    as gdb's sharedlibrary does: all of them by default. Returns how many
+    were loaded.
+    """
+    if self.status != STATUS_BREAK:
+      raise DebuggerException("Can only load symbols when stopped.")
+    try:
+      regex = re.compile(name_regex)
+    except re.error, e:
+      raise DebuggerException("Bad library regex %s: %s" % (name_regex, e))
+    n = 0
+    for backend in self._backends:
+      n += backend.load_library_symbols([l.name for l in backend.libraries if regex.search(l.name)])
+    return n
 
   # basic stuff
   @property
@@ -158,6 +243,30 @@ class Debugger(DebuggerBase):
 
     backend = self._get_backend_for_new_process()
     return backend.begin_attach_to_pid(pid, was_launched)
+
+  def begin_open_core(self, exe, core_file):
+    """
+    Begins to open core_file, dumped by exe, as a process whose threads,
+    stacks and expressions can be inspected but that can't be run. Returns
+    a waitable for the process.
+    """
+    if not os.path.exists(exe):
+      raise DebuggerException("%s does not exist" % exe)
+    if not os.path.exists(core_file):
+      raise DebuggerException("%s does not exist" % core_file)
+    backend = self._get_backend_for_new_process()
+    return backend.begin_open_core(exe, core_file)
+
+  def _check_can_run(self, thread):
+    if thread.process and thread.process.core_file:
+      raise DebuggerException("%s is from a core dump and can't be run" % thread)
+
+  def _can_resume_backend(self, backend):
+    """Whether backend has a live process to resume, rather than just cores."""
+    for proc in backend.processes:
+      if not proc.core_file:
+        return True
+    return False
   
   # launchable process list
   @property
@@ -192,6 +301,14 @@ class Debugger(DebuggerBase):
   # Process status control --- needs to push to threads
   @property
   def status(self):
+    if self._non_stop and len(self.threads) != 0:
+      # break when the thread the user is looking at is stopped, or if none is, when any is
+      if self._active_thread:
+        return self._active_thread.status
+      for thr in self._threads:
+        if thr.status == STATUS_BREAK:
+          return STATUS_BREAK
+      return STATUS_RUNNING
     if len(self.threads) != 0:
       # return STATUS_RUNNING until all backend report break status [this is to deal with the "interrupting" case]
       all_break = True
@@ -222,33 +339,56 @@ class Debugger(DebuggerBase):
     self._status_changed.fire()
 
   def begin_interrupt(self):
-    if self.status != STATUS_RUNNING:
+    if self._non_stop:
+      if len([t for t in self._threads if t.status == STATUS_RUNNING]) == 0:
+        raise DebuggerException("Cannot interrupt when no threads are running")
+    elif self.status != STATUS_RUNNING:
       raise DebuggerException("Cannot resume when status != STATUS_RUNNING")
 
-    wait = CounterWaitable(len(self._backends),0)
-    for backend in self._backends:
+    backends = [b for b in self._backends if self._can_resume_backend(b)] # cores never run
+    wait = CounterWaitable(len(backends),0)
+    for backend in backends:
       w = backend.begin_interrupt()
       w.when_done(lambda v: wait.dec(1))
     return wait
 
+  def _on_begin_interrupt(self,requesting_thread):
+    if not self._non_stop:
+      return self.begin_interrupt()
+    if requesting_thread.status != STATUS_RUNNING:
+      raise DebuggerException("Cannot interrupt %s, it is not running" % requesting_thread)
+    return requesting_thread._backend.begin_interrupt_thread(requesting_thread)
+
   # resume was requested for a specific thread
   # resume the other backends as well
   def _on_begin_resume(self,requesting_thread):
+    self._check_can_run(requesting_thread)
+    if self._non_stop:
+      # just this thread
+      if requesting_thread.status != STATUS_BREAK:
+        raise DebuggerException("Cannot resume %s, it is not stopped" % requesting_thread)
+      return requesting_thread._backend.begin_resume(requesting_thread)
     if self.status != STATUS_BREAK:
       raise DebuggerException("Cannot resume when status != STATUS_BREAK")
     log2("_on_begin_resume(%s)", requesting_thread)
-    wait = CounterWaitable(len(self._backends),0)
+    others = [b for b in self._backends if b != requesting_thread._backend and self._can_resume_backend(b)]
+    wait = CounterWaitable(len(others) + 1,0)
     w0 = requesting_thread._backend.begin_resume(requesting_thread)
     w0.when_done(lambda v: wait.dec())
-    for backend in self._backends:
-      if backend != requesting_thread._backend:
-        w = backend.begin_resume_nonspecific(self)
-        w.when_done(lambda v: wait.dec())
+    for backend in others:
+      w = backend.begin_resume_nonspecific(self)
+      w.when_done(lambda v: wait.dec())
     return wait
 
   def _perform_begin_step(self,stepping_thread,step_action_cb):
     """General purpose mechanism for executing the various step commands."""
+    self._check_can_run(stepping_thread)
 
+    if self._non_stop:
+      # the other threads carry on as they are
+      if stepping_thread.status != STATUS_BREAK:
+        raise DebuggerException("Cannot step %s, it is not stopped" % stepping_thread)
+      return step_action_cb()
     if self.status != STATUS_BREAK:
       raise DebuggerException("Cannot step when status != STATUS_BREAK")
     log2("_perform_begin_step(%s)", stepping_thread)
@@ -256,7 +396,7 @@ class Debugger(DebuggerBase):
     # the begin_resume_nonspecific will wait until the backend goes to resume
     w0 = step_action_cb()
     for backend in self._backends:
-      if backend != stepping_thread._backend:
+      if backend != stepping_thread._backend and self._can_resume_backend(backend):
         backend.begin_resume_nonspecific(self)
 
     def is_done():
@@ -281,9 +421,25 @@ class Debugger(DebuggerBase):
   def _on_begin_step_out(self,requesting_thread):
     return self._perform_begin_step(requesting_thread, lambda: requesting_thread._backend.begin_step_out(requesting_thread))
 
+  def _on_begin_explore_calls(self, requesting_thread, max_depth, calls_cb):
+    # unlike a step, the other backends stay stopped: this is for looking, not running
+    if self._non_stop:
+      raise DebuggerException("Can only explore calls in all-stop mode")
+    if self.status != STATUS_BREAK:
+      raise DebuggerException("Cannot explore calls when status != STATUS_BREAK")
+    self._check_can_run(requesting_thread)
+    return requesting_thread._backend.begin_explore_calls(requesting_thread, max_depth, calls_cb)
+
   def _on_backend_breakpoint_hit(self, hit_backend, breakpoint):
     # stop all the other backends...
     log1("Debugger._on_backend_breakpoint_hit(%s,%s)", hit_backend, breakpoint)
+    if self._non_stop:
+      # only the thread that hit it stopped, and that is all there is to wait for
+      breakpoint.on_hit.fire()
+      return
+    if self._sample:
+      self._sample.breakpoint_hits.append((hit_backend, breakpoint))
+      return
     for backend in self._backends:
       if backend == hit_backend:
         continue
@@ -312,6 +468,12 @@ class Debugger(DebuggerBase):
       import traceback
       traceback.print_stack(limit=4)
       print "\n"
+    if self._non_stop:
+      self._on_backend_thread_status_changed(backend_that_changed)
+      return
+    if self._sample:
+      self._on_backend_status_changed_while_sampling()
+      return
     if backend_that_changed.status == GDB_STATUS_BREAK:
       if backend_that_changed.thread_that_stopped != None:
         log1("Thread stopped with a thread_that_stopped.")
@@ -327,13 +489,35 @@ class Debugger(DebuggerBase):
       self._fire_status_changed()
       self._active_frame_changed.fire()
 
+  def _on_backend_thread_status_changed(self, backend):
+    """
+    Non-stop version of _on_backend_status_changed: one or more of backend's
+    threads stopped or started. Nothing else is interrupted. A thread that
+    stopped becomes active unless the active thread is stopped too, so as not
+    to yank the user away from what they're looking at.
+    """
+    thr = backend.thread_that_stopped
+    if thr and thr.status == STATUS_BREAK:
+      if self._active_thread == None or self._active_thread.status != STATUS_BREAK:
+        log1("Debugger: %s stopped, making it active", thr)
+        self.active_thread = thr
+    self._fire_status_changed()
+    self._active_frame_changed.fire()
+
   def _run_on_status_break(self,cb):
     self._pending_on_status_break_callbacks.append(cb)
 
-  def _on_backend_symbols_changed(self,backend_that_changed):
-    log1("Debugger._on_backend_symbols_changed")
-    rebind = self._temporarily_unbind_all_breakpoints()
-    rebind()
+  def _on_backend_symbols_changed(self,backend_that_changed,changes):
+    log1("Debugger._on_backend_symbols_changed: %i events, all=%s", changes.num_events, changes.all)
+    self._last_rebind_stats = DynObject({"symbol_events" : 0, "full_rebinds" : 0, "inserted" : 0, "refreshed" : 0, "untouched" : 0})
+    self._count_rebind_work("symbol_events", changes.num_events)
+    if changes.all:
+      self._count_rebind_work("full_rebinds", 1)
+      self._count_rebind_work("inserted", len(self._breakpoints) * len(self._backends))
+      rebind = self._temporarily_unbind_all_breakpoints()
+      rebind().wait() # a single round trip, and launches and attaches then complete with their breakpoints set
+    else:
+      self._update_breakpoints_for_library_changes(backend_that_changed, changes)
 
   # ptys
   @property
@@ -406,6 +590,7 @@ class Debugger(DebuggerBase):
   @active_thread.setter
   def active_thread(self, thread):
     log2("Active thread set to %s", thread)
+    old_status = self.status
     if self._active_thread != None:
       self._active_thread.changed.remove_listener(self._active_thread_somehow_changed)
     self._active_thread = thread
@@ -413,6 +598,8 @@ class Debugger(DebuggerBase):
       self._active_thread.process.last_active_thread = self._active_thread
       self._active_thread.changed.add_listener(self._active_thread_somehow_changed)
     self._active_frame_changed.fire()
+    if self.status != old_status: # in non-stop mode, status follows the active thread
+      self._fire_status_changed()
   def _set_active_thread_when_stopped(self, thread):
     if self._set_active_thread_pending:
       return
@@ -462,14 +649,95 @@ class Debugger(DebuggerBase):
         log2("Setting active thread to None")
         self.active_thread = None
     self._fire_status_changed()
+  def get_unique_stacks(self, max_frames=UNIQUE_STACKS_MAX_FRAMES):
+    """
+    Groups the stacks of every thread in every process by identical frames,
+    like pstack aggregation. Returns StackGroups, most populous first. This
+    bypasses the per-thread call stacks so that it stays fast with thousands
+    of threads. In non-stop mode, only stopped threads are included.
+    """
+    if self.status != STATUS_BREAK and not self._non_stop:
+      raise DebuggerException("Can only collect stacks when stopped.")
+    thread_stacks = []
+    for backend in self._backends:
+      stacks = backend.get_all_thread_stacks(max_frames)
+      for thr in backend.threads:
+        if stacks.has_key(thr.backend_id):
+          thread_stacks.append((thr, stacks[thr.backend_id]))
+    return group_unique_stacks(thread_stacks)
+
+  def begin_sample_stacks(self, max_frames=UNIQUE_STACKS_MAX_FRAMES):
+    """
+    Stops every backend just long enough to list the stacks of all their
+    threads, one batch per backend, and resumes them. The stop and resume
+    aren't reported through status_changed. Returns a waitable for a list of
+    (thread, frames). If a breakpoint is hit meanwhile, everything stays
+    stopped and the hit is reported as usual.
+    """
+    if self._non_stop:
+      raise DebuggerException("Can only sample stacks in all-stop mode.")
+    if self.status != STATUS_RUNNING or self._sample:
+      raise DebuggerException("Can only sample stacks when running.")
+    self._sample = DynObject({"max_frames" : max_frames,
+                              "done" : CallbackDrivenWaitable(),
+                              "finishing" : False,
+                              "breakpoint_hits" : []})
+    done = self._sample.done
+    for backend in self._backends:
+      if backend.status == GDB_STATUS_RUNNING:
+        backend.begin_interrupt()
+    self._on_backend_status_changed_while_sampling()
+    return done
+
+  def _on_backend_status_changed_while_sampling(self):
+    if self._sample.finishing:
+      return
+    for backend in self._backends:
+      if backend.status != GDB_STATUS_BREAK:
+        return
+    # let a breakpoint hit reported with the stop come in before deciding whether to resume
+    self._sample.finishing = True
+    MessageLoop.add_message(self._finish_sample)
+
+  def _finish_sample(self):
+    sample = self._sample
+    thread_stacks = []
+    try:
+      for backend in self._backends:
+        stacks = backend.get_all_thread_stacks(sample.max_frames)
+        for thr in backend.threads:
+          if stacks.has_key(thr.backend_id):
+            thread_stacks.append((thr, stacks[thr.backend_id]))
+    except DebuggerException, e:
+      log1("Debugger: could not sample stacks: %s", e)
+    if len(sample.breakpoint_hits) == 0:
+      for backend in self._backends:
+        if len(backend.processes):
+          backend.begin_resume_nonspecific(None)
+      self._sample = None
+    else:
+      # stay stopped, reporting it the way it would have been without the sample
+      self._sample = None
+      for backend,bp in sample.breakpoint_hits:
+        self._on_backend_status_changed(backend)
+      for backend,bp in sample.breakpoint_hits:
+        self._on_backend_breakpoint_hit(backend, bp)
+    sample.done.set_done(thread_stacks)
+
   # breakpoint logic
   ###########################################################################
   def _init_breakpoints(self):
     self._breakpoints = BindingList()
+    self._breakpoint_bind_progress = Event()
+    self._adding_breakpoints_in_bulk = False
+    self._last_rebind_stats = DynObject({"symbol_events" : 0, "full_rebinds" : 0, "inserted" : 0, "refreshed" : 0, "untouched" : 0})
+    self._total_rebind_stats = DynObject({"symbol_events" : 0, "full_rebinds" : 0, "inserted" : 0, "refreshed" : 0, "untouched" : 0})
     def on_added(idx,b):
       log2("Breakpoint %s added", b)
+      if self._adding_breakpoints_in_bulk:
+        return # begin_add_breakpoints binds them all at once
       was_running = False
-      if self.status == STATUS_RUNNING:
+      if self._must_interrupt_to_change_breakpoints():
         log1("Breakpoint added while runnign. Interrupting teporarily...")
         self.begin_interrupt().wait()
         was_running = True
@@ -481,7 +749,7 @@ class Debugger(DebuggerBase):
     def on_deleted(idx,b):
       log2("Breakpoint %s deleted", b)
       was_running = False
-      if self.status == STATUS_RUNNING:
+      if self._must_interrupt_to_change_breakpoints():
         log1("Breakpoint deleted while runnign. Interrupting teporarily...")
         self.begin_interrupt().wait()
         was_running = True
@@ -494,24 +762,172 @@ class Debugger(DebuggerBase):
     self._breakpoints.item_deleted.add_listener(on_deleted)
 
   def _temporarily_unbind_all_breakpoints(self):
-    """Unbinds all breakpoints and returns a function to rebind them."""
+    """Unbinds all breakpoints and returns a function to rebind them, which returns a waitable for the inserts."""
     log2("Unbinding %i breakpoints", len(self._breakpoints))
     bps = list(self._breakpoints)
     for b in bps:
       b._set_debugger(None)
     def rebind():
       log2("Rebinding %i breakpoints", len(bps))
-      for b in bps:
-        b._set_debugger(self)
+      return self._bind_breakpoints(bps)
     return rebind
 
-  def _on_breakpoint_needs_update(self,b):
+  def _bind_breakpoints(self, bps):
+    """
+    Binds unbound breakpoints to this debugger, inserting them on each
+    backend in one pipelined batch instead of a round trip per breakpoint.
+    Results are applied to the breakpoints as replies arrive, and
+    breakpoint_bind_progress fires with (num_done, num_total) as they do.
+    Returns a waitable that completes once all replies are in.
+    """
+    for b in bps:
+      b._set_debugger(self, update=False)
+    return self._insert_breakpoints(list(self._backends), bps)
+
+  def _insert_breakpoints(self, backends, bps):
+    done = CallbackDrivenWaitable()
+    total = len(bps) * len(backends)
+    if total == 0:
+      done.set_done(None)
+      return done
+    generations = [b._bind_generation for b in bps]
+    num_done = BoxedObject(0)
+    def make_on_result(backend):
+      def on_result(i, res, exc):
+        b = bps[i]
+        if b._bind_generation == generations[i]:
+          b._set_backend_breakpoint(backend, res, exc)
+          self._on_breakpoint_changed(b)
+        elif res:
+          # unbound while the insert was in flight
+          backend.delete_breakpoint(res.id)
+        num_done.set(num_done.get() + 1)
+        self._breakpoint_bind_progress.fire(num_done.get(), total)
+        if num_done.get() == total:
+          done.set_done(None)
+      return on_result
+    for backend in backends:
+      backend.begin_new_breakpoints([b.location for b in bps],
+                                    [b._make_hit_cb(backend) for b in bps],
+                                    make_on_result(backend),
+                                    [b._get_dprintf() for b in bps],
+                                    [b._get_condition() for b in bps])
+    return done
+
+  def _update_breakpoints_for_library_changes(self, backend, changes):
+    """
+    Libraries came or went without processes changing. gdb re-resolves the
+    breakpoints it has on its own, so only breakpoints it failed to insert
+    are retried, and location lists are re-read only if a library was loaded
+    or one that held a breakpoint location was unloaded.
+    """
+    unresolved = []
+    resolved = []
+    for b in self._breakpoints:
+      if b._get_debugger() != self or not b._backend_breakpoints.has_key(backend):
+        continue # still being inserted
+      if b._backend_breakpoints[backend].valid:
+        resolved.append(b)
+      else:
+        unresolved.append(b)
+    if len(unresolved):
+      self._count_rebind_work("inserted", len(unresolved))
+      self._insert_breakpoints([backend], unresolved)
+
+    def in_unloaded_library(b):
+      for lib in changes.unloaded:
+        if lib.ranges == None:
+          return True
+        for l in b._backend_breakpoints[backend].location_list:
+          if not l.has_pc:
+            continue
+          for lo,hi in lib.ranges:
+            if lo <= l.prog_ctr < hi:
+              return True
+      return False
+    if len(changes.loaded) == 0:
+      affected = [b for b in resolved if in_unloaded_library(b)]
+    else:
+      affected = resolved
+    self._count_rebind_work("untouched", len(resolved) - len(affected))
+    if len(affected) == 0:
+      return
+
+    def on_listed(locations):
+      for b in affected:
+        bp = b._backend_breakpoints.get(backend)
+        if not bp or not bp.valid or not locations.has_key(bp.id):
+          continue # unbound or deleted while break-list was in flight
+        if [str(l) for l in locations[bp.id]] == [str(l) for l in bp.location_list]:
+          self._count_rebind_work("untouched", 1)
+          continue
+        self._count_rebind_work("refreshed", 1)
+        bp.location_list = locations[bp.id]
+        self._on_breakpoint_changed(b)
+    backend.begin_list_breakpoint_locations().when_done(on_listed)
+
+  def _count_rebind_work(self, counter, n):
+    setattr(self._last_rebind_stats, counter, getattr(self._last_rebind_stats, counter) + n)
+    setattr(self._total_rebind_stats, counter, getattr(self._total_rebind_stats, counter) + n)
+
+  @property
+  def breakpoint_rebind_stats(self):
+    """
+    Breakpoint work caused by symbol changes, as DynObjects for the last
+    change and for the session: symbol_events (gdb notifications coalesced
+    into one stop), full_rebinds, inserted, refreshed (location lists that
+    changed) and untouched.
+    """
+    return DynObject({"last" : self._last_rebind_stats, "total" : self._total_rebind_stats})
+
+  def _must_interrupt_to_change_breakpoints(self):
+    # in non-stop mode gdb takes breakpoint commands while threads run
+    return self.status == STATUS_RUNNING and not self._non_stop
+
+  def begin_add_breakpoints(self, bps):
+    """
+    Adds many breakpoints at once, e.g. when restoring a saved set. They are
+    appended to breakpoints immediately and inserted in the background; see
+    breakpoint_bind_progress. Returns a waitable for the insertion.
+    """
+    was_running = False
+    if self._must_interrupt_to_change_breakpoints():
+      log1("Breakpoints added while running. Interrupting temporarily...")
+      self.begin_interrupt().wait()
+      was_running = True
+    self._adding_breakpoints_in_bulk = True
+    try:
+      for b in bps:
+        self._breakpoints.append(b)
+    finally:
+      self._adding_breakpoints_in_bulk = False
+    done = self._bind_breakpoints([b for b in bps if b._get_debugger() == None])
+    if was_running:
+      # gdb handles commands in order, so the inserts land before the resume
+      log1("Resuming.")
+      self.active_thread.begin_resume()
+    return done
+
+  @property
+  def logpoint_log(self):
+    """The LogpointLog that output of Logpoints in breakpoints goes to."""
+    return self._logpoint_log
+
+  @property
+  def breakpoint_bind_progress(self):
+    """Fires (num_done, num_total) as replies to a bulk breakpoint insert arrive."""
+    return self._breakpoint_bind_progress
+
+  def _on_breakpoint_needs_update(self,b,update_cb=None):
+    """Runs update_cb, by default re-inserting b, with the backends stopped if need be."""
+    if not update_cb:
+      update_cb = b._update
     was_running = False
-    if self.status == STATUS_RUNNING:
+    if self._must_interrupt_to_change_breakpoints():
       log1("Breakpoint added while runnign. Interrupting teporarily...")
       self.begin_interrupt().wait()
       was_running = True
-    b._update()
+    update_cb()
     if was_running:
       log1("Resuming.")
       self.active_thread.begin_resume()
@@ -528,10 +944,82 @@ class Debugger(DebuggerBase):
   def breakpoints(self):
     return self._breakpoints
 
+  # watches
+  ###########################################################################
+  def _init_watches(self):
+    self._watches = BindingList()
+    self._watch_varobjs = {} # (backend, variable object name) -> Watch, including children
+    def on_added(idx,w):
+      w._set_debugger(self)
+      self._update_watches()
+    def on_deleted(idx,w):
+      w._set_debugger(None)
+    self._watches.item_added.add_listener(on_added)
+    self._watches.item_deleted.add_listener(on_deleted)
+    self._active_frame_changed.add_listener(self._update_watches)
+
+  def _update_watches(self):
+    """
+    Brings the watches up to date with the active frame. Watches that aren't
+    bound to the active thread's backend yet are created there; the rest are
+    refreshed with a single update that reports only what changed.
+    """
+    if len(self._watches) == 0 or self.status != STATUS_BREAK or not self.active_thread:
+      return
+    thr = self.active_thread
+    backend = thr._backend
+    frame = thr.active_frame_number
+
+    have_bound = False
+    for w in self._watches:
+      if w._backend != None and w._backend != backend:
+        w._unbind()
+      if w._backend == None:
+        w._bind(backend, thr)
+      else:
+        have_bound = True
+    if not have_bound:
+      self._watches.changed.fire()
+      return
+
+    try:
+      changes = backend.update_varobjs(thr, frame)
+    except DebuggerException, e:
+      log1("Updating watches failed, recreating them: %s", e.message)
+      for w in self._watches:
+        w._unbind(delete = False)
+        w._bind(backend, thr)
+      self._watches.changed.fire()
+      return
+    for c in changes:
+      w = self._watch_varobjs.get((backend, c.name))
+      if w:
+        w._apply_change(c)
+    self._watches.changed.fire()
+
+  def _forget_watches_on_backend(self, backend):
+    for w in self._watches:
+      if w._backend == backend:
+        w._unbind(delete = False)
+
+  @property
+  def watches(self):
+    """BindingList of root Watch objects, kept current at each stop."""
+    return self._watches
+
   def _eval_direct(self):
     """Symbol used to force direct eval."""
     raise Exception("Should never be called directly.")
 
+  def begin_evaluate_expressions(self, exprs):
+    """
+    Evaluates a list of expressions in the active thread's active frame in
+    one batch. See DThread.begin_evaluate_expressions.
+    """
+    if self.active_thread == None:
+      raise DebuggerException("No thread to evaluate expressions in")
+    return self.active_thread.begin_evaluate_expressions(exprs)
+
   # simple command interpreter
   def begin_interpreter_exec(self, expr, cb, squash_exceptions=True):
     # Directly evaluate commands that start with *
@@ -601,11 +1089,20 @@ class Debugger(DebuggerBase):
     def info_threads(*args):
       s = ""
       for thread in self.threads:
-        f0 = thread.call_stack[thread.active_frame_number]
+        f0 = thread.active_frame
         s += "%3s %s\n" % (thread.frontend_id, f0)
       return s
     immed("info threads", info_threads)
 
+    def info_unique_stacks(*args):
+      s = ""
+      for g in self.get_unique_stacks():
+        s += "%i thread(s): %s\n" % (g.count, ", ".join([str(t.frontend_id) for t in g.threads]))
+        for f in g.frames:
+          s += "  %s\n" % f
+      return s
+    immed("info unique-stacks", info_unique_stacks) # not "info stacks", gdb has "info stack"
+
     def thread(arg0 = None, arg1 = None):
       if arg0 == None:
         return str(self.active_thread)
@@ -681,6 +1178,11 @@ class Debugger(DebuggerBase):
       return s
     immed("info breakpoints", info_breakpoints)
 
+    # libraries
+    def sharedlibrary(*args):
+      return "Loaded symbols for %i libraries" % self.load_library_symbols(" ".join(args))
+    immed("sharedlibrary", sharedlibrary) # so we know which libraries have symbols
+
     # Disallowed commands. Things that you shouldn't muck with because it will
     # break assumptions in the heart of debugger
     def _disallowed(*args):
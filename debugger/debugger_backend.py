@@ -26,25 +26,50 @@ class DebuggerBackend(object):
     iv.expect_get_property("threads")
     iv.expect_get_property("main_thread")
     iv.expect_get_property("thread_that_stopped")
+    iv.expect_get_set_property("non_stop")
+
+    iv.expect_get_set_property("lazy_solib_symbols")
+    iv.expect_get_property("libraries")
+    iv.expect_method("load_library_symbols(self, names)")
 
     iv.expect_method("begin_launch_suspended(self, cmdline)")
     iv.expect_method("begin_attach_to_pid(self, pid, was_launched_hint)")
+    iv.expect_method("begin_open_core(self, exe, core_file)")
 
     iv.expect_method("kill_process(self, proc)")
     iv.expect_method("detach_process(self, proc)")
 
     iv.expect_method("begin_resume(self, thr)")
     iv.expect_method("begin_interrupt(self)")
+    iv.expect_method("begin_interrupt_thread(self, thr)")
     iv.expect_method("begin_step_over(self, thread)")
     iv.expect_method("begin_step_into(self, thread)")
     iv.expect_method("begin_step_out(self, thread)")
+    iv.expect_method("begin_explore_calls(self, thread, max_depth, calls_cb)")
+    iv.expect_method("cancel_explore_calls(self)")
 
-    iv.expect_method("new_breakpoint(self, location, hit_cb)")
+    iv.expect_method("new_breakpoint(self, location, hit_cb, dprintf=None, condition=None)")
+    iv.expect_method("begin_new_breakpoints(self, locations, hit_cbs, result_cb, dprintfs=None, conditions=None)")
+    iv.expect_get_set_property("logpoint_log")
+    iv.expect_method("begin_list_breakpoint_locations(self)")
     iv.expect_method("enable_breakpoint(self, id)")
     iv.expect_method("disable_breakpoint(self, id)")
+    iv.expect_method("set_breakpoint_condition(self, id, expression)")
+    iv.expect_method("set_breakpoint_ignore_count(self, id, count)")
+    iv.expect_method("get_breakpoint_hit_count(self, id)")
     iv.expect_method("delete_breakpoint(self, id)")
 
     iv.expect_method("get_call_stack(self, thr)")
     iv.expect_method("get_frame(self, thr, frame)")
+    iv.expect_method("get_frames(self, thr, low, high)")
+    iv.expect_method("get_call_stack_depth(self, thr)")
+    iv.expect_method("get_top_frames(self)")
+    iv.expect_method("get_all_thread_stacks(self, max_frames)")
+
+    iv.expect_method("create_varobj(self, thr, frame, expr)")
+    iv.expect_method("update_varobjs(self, thr, frame)")
+    iv.expect_method("list_varobj_children(self, name, low, high)")
+    iv.expect_method("delete_varobj(self, name)")
 
     iv.expect_method("get_expr_value_async(self, thr, expr, cb)")
+    iv.expect_method("begin_evaluate_expressions(self, thr, frame, exprs)")
@@ -113,6 +113,13 @@ class DProcess(object):
   def compilation_directory(self):
     return self._backend_info.compilation_directory
 
+  @property
+  def core_file(self):
+    """The core dump this process was opened from, or None for a live process. Cores can't be run."""
+    if self._backend_info == None:
+      return None
+    return self._backend_info.core_file
+
   @property
   def status(self):
     all_break = True
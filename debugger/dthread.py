@@ -14,6 +14,134 @@
 from . import *
 from util import *
 
+CALL_STACK_PAGE_SIZE = 64
+
+class CallStack(object):
+  """
+  List-like view of a thread's call stack for a single stop. Frames are fetched
+  from the backend a page at a time, as they're indexed, and the depth is
+  asked for separately so that len() doesn't need the frames themselves.
+
+  A CallStack is only valid for the stop it was created in: once the thread
+  resumes, fetching anything new from it raises a DebuggerException.
+  """
+  def __init__(self, thread, epoch):
+    self._thread = thread
+    self._epoch = epoch
+    self._depth = None
+    self._pages = {} # page number -> list of frames
+    self._top_frame = None # frame zero, when it came from a snapshot rather than a page
+
+  def _check_epoch(self):
+    if self._thread._stop_epoch != self._epoch:
+      raise DebuggerException("Call stack is from a previous stop of %s" % self._thread)
+
+  def __len__(self):
+    if self._depth == None:
+      self._check_epoch()
+      self._depth = self._thread._backend.get_call_stack_depth(self._thread)
+    return self._depth
+
+  def _ensure_fetched(self, low, high):
+    """Makes sure frames [low,high) are fetched, using a single backend request."""
+    first_page = low / CALL_STACK_PAGE_SIZE
+    last_page = (high - 1) / CALL_STACK_PAGE_SIZE
+    missing = [p for p in range(first_page, last_page + 1) if not self._pages.has_key(p)]
+    if len(missing) == 0:
+      return
+    self._check_epoch()
+    fetch_low = missing[0] * CALL_STACK_PAGE_SIZE
+    fetch_high = (missing[-1] + 1) * CALL_STACK_PAGE_SIZE
+    frames = self._thread._backend.get_frames(self._thread, fetch_low, fetch_high - 1)
+    for p in range(missing[0], missing[-1] + 1):
+      if self._pages.has_key(p):
+        continue
+      start = p * CALL_STACK_PAGE_SIZE - fetch_low
+      self._pages[p] = frames[start:start + CALL_STACK_PAGE_SIZE]
+    if len(frames) < fetch_high - fetch_low:
+      # a short read tells us the depth for free
+      self._depth = fetch_low + len(frames)
+
+  def __getitem__(self, i):
+    if isinstance(i, slice):
+      indices = range(*i.indices(len(self))) # in slice order, which runs backwards for a negative step
+      if len(indices) == 0:
+        return []
+      self._ensure_fetched(min(indices), max(indices) + 1)
+      return [self._pages[j / CALL_STACK_PAGE_SIZE][j % CALL_STACK_PAGE_SIZE] for j in indices]
+    if i < 0:
+      i += len(self)
+    if i < 0 or (self._depth != None and i >= self._depth):
+      raise IndexError("call stack index out of range")
+    if i == 0 and self._top_frame and not self._pages.has_key(0):
+      return self._top_frame
+    self._ensure_fetched(i, i + 1)
+    page = self._pages[i / CALL_STACK_PAGE_SIZE]
+    if i % CALL_STACK_PAGE_SIZE >= len(page):
+      raise IndexError("call stack index out of range")
+    return page[i % CALL_STACK_PAGE_SIZE]
+
+  def __iter__(self):
+    i = 0
+    while True:
+      try:
+        f = self[i]
+      except IndexError:
+        return
+      yield f
+      i += 1
+
+  @property
+  def fetched_frames(self):
+    """Frames fetched so far, in order. Never talks to the backend."""
+    res = []
+    if self._top_frame and not self._pages.has_key(0):
+      res.append(self._top_frame)
+    for p in sorted(self._pages.keys()):
+      res.extend(self._pages[p])
+    return res
+
+  @property
+  def has_top_frame(self):
+    return self._top_frame != None or self._pages.has_key(0)
+
+  @property
+  def fetched_frame_count(self):
+    """Number of frames fetched contiguously from the top of the stack."""
+    p = 0
+    while self._pages.has_key(p) and len(self._pages[p]) == CALL_STACK_PAGE_SIZE:
+      p += 1
+    n = p * CALL_STACK_PAGE_SIZE
+    if self._pages.has_key(p):
+      n += len(self._pages[p])
+    elif n == 0 and self._top_frame:
+      n = 1
+    return n
+
+  def fetch_more(self, count = CALL_STACK_PAGE_SIZE):
+    """Fetches up to count frames past fetched_frame_count."""
+    low = self.fetched_frame_count
+    high = low + count
+    if self._depth != None:
+      high = min(high, self._depth)
+    if high > low:
+      self._ensure_fetched(low, high)
+
+  def __str__(self):
+    return "CallStack(%s)" % ", ".join([str(f) for f in self.fetched_frames])
+
+def _snapshot_top_frames(backend):
+  """
+  Fills in frame zero for every stopped thread on the backend with a single
+  request, rather than one request per thread.
+  """
+  frames = backend.get_top_frames()
+  for thr in backend.threads:
+    if thr.status == STATUS_BREAK and frames.has_key(thr.backend_id):
+      cs = thr.call_stack
+      if not cs.has_top_frame:
+        cs._top_frame = frames[thr.backend_id]
+
 class DThread(object):
   def __init__(self, backend, backend_id, process):
     self._backend = backend
@@ -23,7 +151,7 @@ class DThread(object):
 
     self._status = STATUS_RUNNING
 
-    self._active_frame = None # frame zero of call stack; this is an optimization to avoid fetching full call stack all the time
+    self._stop_epoch = 0 # bumped whenever the thread's state changes, invalidating its CallStack
     self._call_stack = None
     self._active_frame_number = 0
     self._changed = Event() # something changed wrt this thread
@@ -55,6 +183,12 @@ class DThread(object):
       raise DebuggerException("Can't control thread directly until it is bound to a Debugger.")
     return self._process._debugger._on_begin_resume(self)
 
+  def begin_interrupt(self):
+    """Stops this thread. Only non-stop mode leaves the other threads running."""
+    if self._process._debugger == None:
+      raise DebuggerException("Can't control thread directly until it is bound to a Debugger.")
+    return self._process._debugger._on_begin_interrupt(self)
+
   def begin_step_over(self):
     if self._process._debugger == None:
       raise DebuggerException("Can't control thread directly until it is bound to a Debugger.")
@@ -70,34 +204,65 @@ class DThread(object):
       raise DebuggerException("Can't control thread directly until it is bound to a Debugger.")
     return self._process._debugger._on_begin_step_out(self)
 
+  def begin_explore_calls(self, max_depth, calls_cb):
+    """
+    Finds the functions this thread's current function calls by stepping
+    through it until it returns, all within the backend. calls_cb gets
+    batches of (caller, callee) names. See GdbBackend.begin_explore_calls.
+    """
+    if self._process._debugger == None:
+      raise DebuggerException("Can't control thread directly until it is bound to a Debugger.")
+    return self._process._debugger._on_begin_explore_calls(self, max_depth, calls_cb)
+
+  def cancel_explore_calls(self):
+    self._backend.cancel_explore_calls()
+
+  # expressions
+  def begin_evaluate_expressions(self, exprs, frame = None):
+    """
+    Evaluates a list of expressions in frame, the active frame by default,
+    in a single batch. Returns a waitable for a list parallel to exprs of
+    DynObjects with valid, and value, a string as gdb printed it, or error.
+    """
+    if frame == None:
+      frame = self._active_frame_number
+    return self._backend.begin_evaluate_expressions(self, frame, exprs)
+
   # call stack
   def _reset_state(self):
     self._active_frame_number = 0
+    self._stop_epoch += 1
     self._call_stack = None
-    self._active_frame = None
 
   @property
   def call_stack(self):
+    """A lazily-paged CallStack for the current stop."""
     if self._call_stack == None:
-      self._active_frame = None # make active_frame use call stack now
-      self._call_stack = self._backend.get_call_stack(self)
+      self._call_stack = CallStack(self, self._stop_epoch)
     return self._call_stack
 
   @property
-  def active_frame(self):
-    if self._call_stack:
-      return self.call_stack[0]
+  def top_frame(self):
+    """
+    Frame zero. The first thread to ask for it after a stop fetches frame zero
+    of every stopped thread on the backend at once.
+    """
+    cs = self.call_stack
+    if not cs.has_top_frame and self._status == STATUS_BREAK:
+      _snapshot_top_frames(self._backend)
+    return cs[0]
 
-    if self._active_frame == None:
-      self._active_frame = self._backend.get_frame(self,self._active_frame_number)
-    return self._active_frame
+  @property
+  def active_frame(self):
+    if self._active_frame_number == 0:
+      return self.top_frame
+    return self.call_stack[self._active_frame_number]
 
   # active frame
   def set_active_frame_number(self, f):
     if type(f) != int:
       raise DebuggerException("Not an int")
     self._active_frame_number = f
-    self._active_frame = None
     self._changed.fire()
   active_frame_number = property(lambda self: self._active_frame_number, set_active_frame_number)
 
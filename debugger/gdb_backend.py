@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import os
+import errno
 import code
 import thread as pythread
 import threading
@@ -19,6 +20,7 @@ import weakref
 import time
 import re
 import Queue
+import signal
 import sys
 import pty
 import subprocess
@@ -35,6 +37,8 @@ from debugger_backend import *
 from dprocess import *
 from dthread import *
 from dpty import *
+from symbol_index_cache import SymbolIndexCache
+from logpoint import LogpointLog, LOGPOINT_OUTPUT_MARKER
 
 _active_gdb_backends = []
 
@@ -48,6 +52,14 @@ _gdb_backend_id = 1
 _debug_window = None
 _debug_slave_file = None
 
+_WATCHER_READ_SIZE = 65536
+
+# gdb-side half of begin_explore_calls, and the prefix of the calls it reports
+_EXPLORE_CALLS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gdb_explore_calls.py")
+_EXPLORE_OUTPUT_MARKER = "ndbg-call:"
+_EXPLORE_BATCH_SIZE = 32
+_result_record_re = re.compile("^(\d+)\^(.[a-z]+),?(.*)$")
+
 def gdb_toggle_enable_debug_window():
   global _debug_window
   global _debug_slave_file
@@ -85,7 +97,12 @@ class GdbBackend(DebuggerBackend):
   def supports_multiple_processes():
     return False # right now, gdb7.2 supports multiple process but will only run one at a time
 
-  def __init__(self):
+  def __init__(self, wait_for_init=True):
+    """
+    Starts gdb. If wait_for_init is False, returns as soon as gdb is spawned
+    and the init commands are sent; init_waitable completes once gdb has
+    answered them. The backend must not be used before then.
+    """
     DebuggerBackend.__init__(self)
     global _gdb_backend_id
     self._id = _gdb_backend_id
@@ -100,6 +117,7 @@ class GdbBackend(DebuggerBackend):
     # init
     self._initialized = True
     _active_gdb_backends.append(weakref.ref(self)) # add cleanup here because we have a thread
+    self._logpoint_log = LogpointLog() # written to by the watcher thread
     self._init_gdb()
 
     # state vars --- minimal but needed before we can run commands
@@ -107,22 +125,49 @@ class GdbBackend(DebuggerBackend):
     self._status_changed = Event()
     self._symbols_changed = Event()
     self._symbols_changed_posted = False
+    self._pending_symbol_changes = None
+    self._libraries = {} # library id -> DynObject(name, ranges, symbols_loaded)
+    self._lazy_solib_symbols = False
+    self._non_stop = False
     self._num_running_messages = 0
-
-    # do feature detection
-    self._init_and_determine_gdb_features()
+    self._exploring = None # the begin_explore_calls in progress
+    self._explore_script_loaded = False
+
+    # do feature detection and apply our settings in a single round trip
+    init_cmds = ["gdb-version",
+                 "interpreter-exec console \"set width 9999\"",
+                 "interpreter-exec console \"set breakpoint pending off\"",
+                 "interpreter-exec console \"set interactive-mode off\"",
+                 "interpreter-exec console \"set inferior-events on\"",
+                 "interpreter-exec console \"set dprintf-style gdb\""]
+    self._symbol_index_cache = SymbolIndexCache.get_default()
+    if self._symbol_index_cache:
+      init_cmds.extend(self._symbol_index_cache.get_gdb_init_commands())
+    self._init_waitable = CallbackDrivenWaitable()
+    self._init_waitable.set_check_for_abort_cb(lambda: self._run == False)
+    init_resps = []
+    def on_init_resp(resp):
+      init_resps.append(resp)
+      if len(init_resps) != len(init_cmds):
+        return
+      try:
+        self._init_and_determine_gdb_features(init_resps[0])
+      except Exception, e:
+        self._init_waitable.abort(e)
+        return
+      log1("GdbBackend Init complete")
+      self._init_waitable.set_done(self)
+    self._run_cmds_async(init_cmds, [on_init_resp for c in init_cmds])
 
     # get going
     self._first_inferior_free = True
     self._init_procs_and_threads()
     self._init_breakpoints()
     self._ptys = BindingList()
+    if wait_for_init:
+      self._init_waitable.wait()
 
-    resp = self._run_cmd("interpreter-exec console \"set width 9999\"")
-    resp = self._run_cmd("interpreter-exec console \"set breakpoint pending off\"")
-    resp = self._run_cmd("interpreter-exec console \"set interactive-mode off\"")
-    resp = self._run_cmd("interpreter-exec console \"set inferior-events on\"")
-    log1("GdbBackend Init complete")
+  init_waitable = property(lambda self: self._init_waitable)
 
   def __str__(self):
     return "GdbBackend #%s" % self._id
@@ -143,14 +188,13 @@ class GdbBackend(DebuggerBackend):
       _debug_slave_file.flush()
 
 
-  def _determine_gdb_version(self):
+  def _determine_gdb_version(self, resp):
     # determine version --- for some stuff, its just going to be easier doign version-based features
-    resp = self._run_cmd("gdb-version")
     resp.expect_done()
     return GdbVersion.parse_from_version_lines(resp.gdblines)
 
-  def _init_and_determine_gdb_features(self):
-    ver = self._determine_gdb_version()
+  def _init_and_determine_gdb_features(self, version_resp):
+    ver = self._determine_gdb_version(version_resp)
 
     # We don't secondary process creation right now because Gdb's wont run more than
     # one inferior at once.
@@ -184,21 +228,193 @@ class GdbBackend(DebuggerBackend):
   status = property(lambda self: self._status)
   status_changed = property(lambda self: self._status_changed)
 
-  """Symbols changed is a utils.Event with signatre cb(GdbBackend)
-  fired when symbols change. You should recreate breakpoitns when this
-  happens."""
+  """Symbols changed is a utils.Event with signature cb(GdbBackend, changes)
+  fired when symbols change. Changes that happen while running are
+  coalesced into one event at the next stop. changes.all is set when
+  processes came or went, in which case breakpoints should be recreated;
+  otherwise changes.loaded and changes.unloaded list the shared libraries,
+  as DynObjects with name and ranges=[(from,to)] (ranges may be None),
+  and num_events counts the gdb notifications that were coalesced."""
   symbols_changed = property(lambda self: self._symbols_changed)
 
-  def _on_symbols_changed(self):
+  def _on_symbols_changed(self, loaded=None, unloaded=None):
+    """loaded and unloaded are lists of libraries; with neither, everything may have changed."""
+    if self._pending_symbol_changes == None:
+      self._pending_symbol_changes = DynObject({"all" : False, "loaded" : [], "unloaded" : [], "num_events" : 0})
+    changes = self._pending_symbol_changes
+    if loaded:
+      changes.num_events += len(loaded)
+      changes.loaded.extend(loaded)
+    elif unloaded:
+      changes.num_events += len(unloaded)
+      changes.unloaded.extend(unloaded)
+    else:
+      changes.num_events += 1
+      changes.all = True
     if self._status == GDB_STATUS_RUNNING:
-      def fire():
-        self._symbols_changed_posted = False
-        self._symbols_changed.fire(self)
       if not self._symbols_changed_posted:
         self._symbols_changed_posted = True
-        self._run_when_stopped(fire)
+        self._run_when_stopped(self._fire_symbols_changed)
+    else:
+      self._fire_symbols_changed()
+
+  def _fire_symbols_changed(self):
+    self._symbols_changed_posted = False
+    changes = self._pending_symbol_changes
+    self._pending_symbol_changes = None
+    if changes:
+      self._symbols_changed.fire(self, changes)
+
+  def _get_library(self, resp, loaded):
+    name = getattr(resp, "id", None)
+    if not loaded:
+      if self._libraries.has_key(name):
+        return self._libraries.pop(name)
+      return DynObject({"name" : name, "ranges" : None, "symbols_loaded" : False})
+    ranges = None
+    if hasattr(resp, "ranges"):
+      ranges = [(getattr(r, "from"), r.to) for r in resp.ranges]
+    # gdb says not to trust the symbols-loaded field, and it's mostly 0: it
+    # read the symbols just now unless we told it not to
+    lib = DynObject({"name" : name, "ranges" : ranges,
+                     "symbols_loaded" : not self._lazy_solib_symbols})
+    self._libraries[name] = lib
+    return lib
+
+  @property
+  def logpoint_log(self):
+    """The LogpointLog that output of dprintfs inserted by begin_new_breakpoints goes to."""
+    return self._logpoint_log
+  @logpoint_log.setter
+  def logpoint_log(self, log):
+    self._logpoint_log = log
+
+  # Shared library symbols
+  ###########################################################################
+  @property
+  def lazy_solib_symbols(self):
+    """
+    When set, gdb doesn't read symbols for shared libraries as they load.
+    They are read only for libraries that listed frames are in, that hold a
+    breakpoint address, or that are passed to load_library_symbols. Set it
+    before launching or attaching.
+    """
+    return self._lazy_solib_symbols
+  @lazy_solib_symbols.setter
+  def lazy_solib_symbols(self, lazy):
+    if lazy == self._lazy_solib_symbols:
+      return
+    resp = self._run_cmd("interpreter-exec console \"set auto-solib-add %s\"" % (lazy and "off" or "on"))
+    resp.expect_done()
+    self._lazy_solib_symbols = lazy
+
+  @property
+  def non_stop(self):
+    """
+    Whether threads stop and resume individually, rather than all of them
+    whenever one stops. Can only be changed while there are no processes.
+    """
+    return self._non_stop
+
+  @non_stop.setter
+  def non_stop(self, non_stop):
+    if non_stop == self._non_stop:
+      return
+    if len(self._processes):
+      raise DebuggerException("Can only change non-stop mode when there are no processes")
+    val = non_stop and "on" or "off"
+    resps = self._run_cmds(["gdb-set mi-async %s" % val, "gdb-set non-stop %s" % val])
+    if resps[0].code != "done": # gdbs before 7.8 call it target-async
+      self._run_cmd("gdb-set target-async %s" % val)
+    if resps[1].code != "done":
+      raise DebuggerException(getattr(resps[1], "msg", "Could not set non-stop mode"))
+    self._non_stop = non_stop
+
+  def _check_stopped(self, thr=None):
+    """Raises unless thr is stopped. In all-stop mode, or without a thread, the backend must be stopped."""
+    if self._non_stop and thr:
+      stopped = thr.status == STATUS_BREAK
+    elif self._non_stop:
+      stopped = len(self._threads) == 0 or len([t for t in self._threads if t.status == STATUS_BREAK]) != 0
     else:
-      self._symbols_changed.fire(self)
+      stopped = self._status == GDB_STATUS_BREAK
+    if not stopped:
+      raise DebuggerException("Only valid in breakpoint mode.")
+
+  def _update_non_stop_status(self):
+    """In non-stop mode the backend is running while any of its threads are. Returns whether that changed."""
+    status = GDB_STATUS_BREAK
+    for thr in self._threads:
+      if thr.status == STATUS_RUNNING:
+        status = GDB_STATUS_RUNNING
+        break
+    changed = status != self._status
+    self._status = status
+    return changed
+
+  def _set_thread_statuses(self, thrs, status):
+    """Sets the status of thrs without firing events. Returns whether anything changed."""
+    changed = False
+    for thr in thrs:
+      if thr.status != status:
+        thr._set_status(status)
+        changed = True
+    return self._update_non_stop_status() or changed
+
+  @property
+  def libraries(self):
+    """The loaded shared libraries, as DynObjects with name, ranges and symbols_loaded."""
+    return list(self._libraries.values())
+
+  def load_library_symbols(self, names):
+    """Reads symbols for the named libraries, in one round trip. Returns how many were newly loaded."""
+    libs = [self._libraries[n] for n in set(names) if self._libraries.has_key(n) and not self._libraries[n].symbols_loaded]
+    if len(libs) == 0:
+      return 0
+    def quote_regex(name):
+      return re.sub(r"([.\[\]*^$+?(){}|\\])", r"\\\\\1", name)
+    cmds = ["interpreter-exec console \"sharedlibrary ^%s$\"" % quote_regex(l.name) for l in libs]
+    cmds.append("interpreter-exec console \"info sharedlibrary\"") # what actually got read
+    resps = self._run_cmds(cmds)
+    read = {}
+    if resps[-1].code == "done":
+      read = parse_info_sharedlibrary(resps[-1].gdblines)
+    loaded = []
+    for lib,resp in zip(libs,resps):
+      if resp.code == "done" and read.get(lib.name, True):
+        lib.symbols_loaded = True
+        loaded.append(lib)
+      else:
+        log1("Could not load symbols for %s: %s", lib.name, getattr(resp, "msg", "not read"))
+    log1("Loaded symbols for %i libraries", len(loaded))
+    if len(loaded):
+      self._on_symbols_changed(loaded=loaded)
+    return len(loaded)
+
+  def _load_symbols_for_mi_frames(self, mi_frames):
+    """
+    In lazy mode, reads symbols for the libraries that frames without them
+    are in. Returns True if any were read, meaning the frames should be
+    listed again.
+    """
+    if not self._lazy_solib_symbols:
+      return False
+    names = [getattr(f, "from") for f in mi_frames if hasattr(f, "from")]
+    return self.load_library_symbols(names) != 0
+
+  def _load_symbols_for_addresses(self, addrs):
+    if not self._lazy_solib_symbols:
+      return
+    names = []
+    for lib in self._libraries.values():
+      if lib.symbols_loaded or not lib.ranges:
+        continue
+      for a in addrs:
+        if len([1 for lo,hi in lib.ranges if lo <= a < hi]):
+          names.append(lib.name)
+          break
+    self.load_library_symbols(names)
+
   ptys = property(lambda self: self._ptys)
 
   def shutdown(self, force=False):
@@ -242,6 +458,11 @@ class GdbBackend(DebuggerBackend):
   # Command channel type behaviors...
   def _init_gdb(self):
     self._run = True
+    self._watcher_stats = DynObject({"records" : 0,
+                                     "bytes" : 0,
+                                     "batches" : 0,
+                                     "busy_time" : 0.0,
+                                     "max_queue_depth" : 0})
     cmdline = "gdb -n --interpreter mi3"
     args = shlex.split(cmdline)
     self.gdb = subprocess.Popen(args,stdin=subprocess.PIPE,stdout=subprocess.PIPE,stderr=subprocess.STDOUT)
@@ -283,88 +504,187 @@ class GdbBackend(DebuggerBackend):
     log2("%s Shutdown done.", self)
 
   def _watcher(self, input):
+    """
+    Reads gdb's output in large chunks and hands everything received
+    between two (gdb) prompts to the main thread as a single message.
+    """
     log2("GdbBackend #%i: Stdin watcher thread running...", self._id)
+    fd = input.fileno()
+    partial = ""
     pending_commands  = []
+    records = []
+    traced_lines = []
     gdblines = []
     while self._run:
-      l = input.readline()
-      l=re.sub('\n$',"",l)
-      if get_loglevel() >= 3 or _debug_slave_file:
-        MessageLoop.add_message(self._trace, "     GDB%i<: %s", self._id, l) # push to messageloop to keep logical ordering
-
-      if l == "": # not sure how these arise but don't freak out for the time being
-        continue;
-
-      # output delimiter
-      if l == "(gdb) ":
-        # run any command responses we got... we defer these so we send any
-        # exec messages first (e.gg. running)
-        for c in pending_commands:
-          MessageLoop.add_message(c[0],c[1],c[2],c[3],c[4])
-        pending_commands = []
-        gdblines = []
-        continue
-
-      # GDB CLI stream
-      if l.startswith("~"):
-        actual_line = l[2:-1] # always is the string ~"...\n"
-        actual_line = actual_line.replace("\\n", "") # eek
-        actual_line = actual_line.replace("\\t", "\t")
-        actual_line = actual_line.replace('\\"', '"')
-        gdblines.append(actual_line)
-        continue
-
-      # Target output
-      if l.startswith("@"):
-        # we don't recieve this right now... :(
-        continue
-
-      # GDB debug messages
-      if l.startswith("&"):
-        continue
-
-      # exec-async-output
-      if l.startswith("*"):
-        MessageLoop.add_message(self._on_exec_message, l)
-        continue
-
-      # status-async-output
-      if l.startswith("+"):
-        continue
-
-      # notify-async-output
-      if l.startswith("="):
-        MessageLoop.add_message(self._on_notify_message, l)
-        continue
+      try:
+        chunk = os.read(fd, _WATCHER_READ_SIZE)
+      except OSError, e:
+        if e.errno == errno.EINTR:
+          continue
+        raise
+      if chunk == "":
+        log2("GdbBackend #%i: gdb closed its output", self._id)
+        break
+      start_time = time.time()
+      lines = (partial + chunk).split("\n")
+      partial = lines.pop() # incomplete last line, if any
+      trace = get_loglevel() >= 3 or _debug_slave_file
+      num_records = 0
+      for l in lines:
+        if trace:
+          traced_lines.append(l) # traced via the messageloop to keep logical ordering
+
+        if l == "": # not sure how these arise but don't freak out for the time being
+          continue;
+        num_records += 1
+
+        # output delimiter
+        if l == "(gdb) ":
+          # run any command responses we got... we defer these so we send any
+          # exec messages first (e.gg. running)
+          self._post_watcher_batch(records, traced_lines, pending_commands)
+          records = []
+          traced_lines = []
+          pending_commands = []
+          gdblines = []
+          continue
+
+        c = l[0]
+
+        # GDB CLI stream
+        if c == "~":
+          # always is the string ~"...\n", but one write of several lines can come as one record
+          pieces = l[2:-1].split("\\n")
+          if len(pieces) > 1 and pieces[-1] == "":
+            del pieces[-1]
+          rest = []
+          for actual_line in pieces:
+            actual_line = actual_line.replace("\\t", "\t")
+            actual_line = actual_line.replace('\\"', '"')
+            if actual_line.startswith(LOGPOINT_OUTPUT_MARKER):
+              # logpoint output goes straight to the log, without a trip through the main thread
+              id,sep,text = actual_line[len(LOGPOINT_OUTPUT_MARKER):].partition(":")
+              if id.isdigit():
+                self._logpoint_log.append(int(id), text)
+                continue
+            if actual_line.startswith(_EXPLORE_OUTPUT_MARKER):
+              # collect the calls found into one record per batch of output
+              caller,sep,callee = actual_line[len(_EXPLORE_OUTPUT_MARKER):].partition("\t")
+              if len(records) and records[-1][0] == self._on_explore_calls_found:
+                records[-1][1].append((caller, callee))
+              else:
+                records.append((self._on_explore_calls_found, [(caller, callee)]))
+              continue
+            rest.append(actual_line)
+          if len(rest):
+            gdblines.append("".join(rest))
+          continue
+
+        # gdb reports every hit count change, which for logpoints means every hit
+        if l.startswith("=breakpoint-modified,"):
+          continue
+
+        # Target output [we don't recieve this right now... :(],
+        # GDB debug messages and status-async-output
+        if c == "@" or c == "&" or c == "+":
+          continue
+
+        # exec-async-output
+        if c == "*":
+          records.append((self._on_exec_message, l))
+          continue
+
+        # notify-async-output
+        if c == "=":
+          records.append((self._on_notify_message, l))
+          continue
+
+        # command response
+        m = _result_record_re.match(l)
+        if m:
+          # an actual response...
+          id = int(m.group(1))
+          code = m.group(2)
+          resp = m.group(3)
+          pending_commands.append((id, code, resp, gdblines))
+          continue
+
+        print "********* unrecognized: [%s] *****" % l
+
+      # don't sit on async output while waiting for the next prompt
+      if len(records) or len(traced_lines):
+        self._post_watcher_batch(records, traced_lines, [])
+        records = []
+        traced_lines = []
+      self._watcher_stats.records += num_records
+      self._watcher_stats.bytes += len(chunk)
+      self._watcher_stats.busy_time += time.time() - start_time
+    log2("GdbBackend #%i: Stdin watcher thread exiting", self._id)
 
-      # command response
-      m = re.match("^(\d+)\^(.[a-z]+),?(.*)$",l)
-      if m:
-        # an actual response...
-        id = int(m.group(1))
-        code = m.group(2)
-        resp = m.group(3)
-        pending_commands.append([self._on_cmd_complete, id, code, resp, gdblines])
-        continue
+  def _post_watcher_batch(self, records, traced_lines, commands):
+    depth = MessageLoop.get_pending_message_count()
+    if depth > self._watcher_stats.max_queue_depth:
+      self._watcher_stats.max_queue_depth = depth
+    self._watcher_stats.batches += 1
+    MessageLoop.add_message(self._on_watcher_batch, records, traced_lines, commands)
+
+  def _on_watcher_batch(self, records, traced_lines, commands):
+    for l in traced_lines:
+      self._trace("     GDB%i<: %s", self._id, l)
+    for handler,l in records:
+      MessageLoop._run_cb(handler, l)
+    for c in commands:
+      MessageLoop._run_cb(self._on_cmd_complete, *c)
 
-      print "********* unrecognized: [%s] *****" % l
-    log2("GdbBackend #%i: Stdin watcher thread exiting", self._id)
+  @property
+  def watcher_stats(self):
+    """
+    Throughput counters for the gdb output watcher: records and bytes read,
+    batches posted to the main thread, records_per_sec while processing
+    output, and the deepest main-thread message queue seen when posting.
+    """
+    stats = self._watcher_stats
+    if stats.busy_time:
+      records_per_sec = stats.records / stats.busy_time
+    else:
+      records_per_sec = 0
+    return DynObject({"records" : stats.records,
+                      "bytes" : stats.bytes,
+                      "batches" : stats.batches,
+                      "records_per_sec" : records_per_sec,
+                      "max_queue_depth" : stats.max_queue_depth,
+                      "queue_depth" : MessageLoop.get_pending_message_count()})
 
   # cmd running system
-  def _run_cmd_async(self,c,cb = None): # cb gets run on main thread via MessageLoop.run_once()
-    if c.startswith("-"):
-      raise DebuggerException("Commands may not start with hyphen.")
-
-    cmd = "%i-%s" % (self._cmdNum, c)
-    if cb == None:
-      cb = lambda x: 0
-    self._pendingCommands[self._cmdNum] = cb
-    self.gdb.stdin.write(cmd + "\n")
+  def _run_cmds_async(self,cmds,cbs = None): # cbs get run on main thread via MessageLoop.run_once()
+    """
+    Sends a batch of commands to gdb in a single write. cbs, if given, is a
+    list parallel to cmds; each cb is called with its command's response as
+    the tokened replies arrive.
+    """
+    for c in cmds:
+      if c.startswith("-"):
+        raise DebuggerException("Commands may not start with hyphen.")
+
+    lines = []
+    for i in range(len(cmds)):
+      cb = None
+      if cbs:
+        cb = cbs[i]
+      if cb == None:
+        cb = lambda x: 0
+      cmd = "%i-%s" % (self._cmdNum, cmds[i])
+      self._pendingCommands[self._cmdNum] = cb
+      lines.append(cmd)
+      self._cmdNum += 1
+    self.gdb.stdin.write("\n".join(lines) + "\n")
     self.gdb.stdin.flush()
     self._trace("");
-    self._trace("*****GDB%i>: %s", self._id,cmd)
+    for cmd in lines:
+      self._trace("*****GDB%i>: %s", self._id,cmd)
 
-    self._cmdNum += 1
+  def _run_cmd_async(self,c,cb = None): # cb gets run on main thread via MessageLoop.run_once()
+    self._run_cmds_async([c],[cb])
 
   def _on_cmd_complete(self,cmdNum,code,resp,gdblines):
     if not self._pendingCommands.has_key(cmdNum):
@@ -373,18 +693,32 @@ class GdbBackend(DebuggerBackend):
     del self._pendingCommands[cmdNum]
     res = GdbMiResponse(code,resp)
     setattr(res,"gdblines",gdblines)
+    res._mi_results = resp # the unparsed results, for when the parsed ones lose something
     cb(res)
 
   def _run_cmd(self,c):
-    recvd = []
-    def on_result(res):
-      recvd.append(res)
-    self._run_cmd_async(c,on_result);
-    MessageLoop.run_while(lambda: len(recvd) == 0 and self._run)
-    if len(recvd):
-      return recvd[0]
-    else:
-      return GdbMiResponse("exited","")
+    return self._run_cmds([c])[0]
+
+  def _run_cmds(self,cmds):
+    """
+    Pipelines cmds to gdb and blocks until all of their responses have
+    arrived, costing one round trip instead of len(cmds). Returns the
+    responses in the same order as cmds.
+    """
+    recvd = {}
+    def make_on_result(i):
+      def on_result(res):
+        recvd[i] = res
+      return on_result
+    self._run_cmds_async(cmds,[make_on_result(i) for i in range(len(cmds))])
+    MessageLoop.run_while(lambda: len(recvd) != len(cmds) and self._run)
+    ret = []
+    for i in range(len(cmds)):
+      if recvd.has_key(i):
+        ret.append(recvd[i])
+      else:
+        ret.append(GdbMiResponse("exited",""))
+    return ret
 
   def _run_cmd_async_with_waitable(self, c, cb = None):
     waitable = CallbackDrivenWaitable()
@@ -396,6 +730,19 @@ class GdbBackend(DebuggerBackend):
     self._run_cmd_async(c,on_result);
     return waitable
 
+  def _run_cmds_async_with_waitables(self, cmds):
+    """
+    Pipelines cmds to gdb in a single write and returns a list of waitables,
+    one per command, that complete with the command's response.
+    """
+    waitables = []
+    for c in cmds:
+      waitable = CallbackDrivenWaitable()
+      waitable.set_check_for_abort_cb(lambda: self._run == False)
+      waitables.append(waitable)
+    self._run_cmds_async(cmds,[w.set_done for w in waitables])
+    return waitables
+
   ###########################################################################
   # Processes and Threads
   ###########################################################################
@@ -465,6 +812,7 @@ class GdbBackend(DebuggerBackend):
       log1("Added process pid=%s inferior=%s", resp.pid,self._cur_inferior)
       proc = DProcess(self, resp.id)
       proc._gdb_inferior = self._cur_inferior
+      proc._gdb_pid = int(resp.pid)
       self._new_process = proc
     elif resp.code == "thread-group-created": # issued by gdb7.1 only, id is the pid
       log1("Added process pid=%s inferior=%s", resp.id,self._cur_inferior)
@@ -504,6 +852,8 @@ class GdbBackend(DebuggerBackend):
         assert proc.backend_info # the process is complete... remove with event
         proc.threads.remove(thr)
         self._threads.remove(thr)
+        if self._non_stop and self._update_non_stop_status():
+          self._status_changed.fire(self)
 
     elif resp.code == "thread-group-exited":
       if self._creating_process:
@@ -527,11 +877,13 @@ class GdbBackend(DebuggerBackend):
         self._on_symbols_changed()
 
     elif resp.code == "library-loaded":
+      lib = self._get_library(resp, True)
       if not self._creating_process:
-        self._on_symbols_changed()
+        self._on_symbols_changed(loaded=[lib])
     elif resp.code == "library-unloaded":
+      lib = self._get_library(resp, False)
       if not self._creating_process:
-        self._on_symbols_changed()
+        self._on_symbols_changed(unloaded=[lib])
     else:
       print "Unrecognized notify: %s resp=[%s]" % (resp.code, str(resp))
 
@@ -545,16 +897,27 @@ class GdbBackend(DebuggerBackend):
         t = self._threads[threads]
         return [t]
       else:
-        ids = threads.split(" ")
-        return [self._threads[x] for x in ids]
+        if type(threads) == list: # non-stop mode lists them
+          ids = threads
+        else:
+          ids = threads.split(" ")
+        ids = [int(x) for x in ids]
+        return [self._threads[x] for x in ids if self._threads.has_key(x)]
 
   def _run_when_stopped(self,cb):
-    if self._status == GDB_STATUS_RUNNING:
+    if self._status == GDB_STATUS_RUNNING and not self._non_stop: # non-stop gdb takes commands while running
       self._run_when_stopped_queue.append(cb)
     else:
       cb()
 
   def _on_exec_message(self, l):
+    if self._exploring:
+      # every step taken while exploring would be a stop and resume for the
+      # ui to chew on; only the final stop gets reported
+      if l.startswith("*stopped"):
+        self._exploring.last_stopped = l
+      return
+
     m = re.match("\*running,(.+)", l)
     if m:
       resp = GdbMiResponse('running', m.group(1))
@@ -565,13 +928,16 @@ class GdbBackend(DebuggerBackend):
       self._last_seen_thread_during_stop = None
 
       # set changed
-      changed = self._status != GDB_STATUS_RUNNING
       thrs = self._conv_mi_threads_to_list(resp.thread_id)
-      if changed:
-        log2("%i: Set status to running", self._id)
-        self._status = GDB_STATUS_RUNNING
-        for thr in thrs:
-          thr._set_status(STATUS_RUNNING)
+      if self._non_stop:
+        changed = self._set_thread_statuses(thrs, STATUS_RUNNING)
+      else:
+        changed = self._status != GDB_STATUS_RUNNING
+        if changed:
+          log2("%i: Set status to running", self._id)
+          self._status = GDB_STATUS_RUNNING
+          for thr in thrs:
+            thr._set_status(STATUS_RUNNING)
 
       # track the num_running_messages... we use this for waiting on running
       self._num_running_messages += 1
@@ -622,12 +988,15 @@ class GdbBackend(DebuggerBackend):
       else:
         thrs = []
 
-      changed = self._status != GDB_STATUS_BREAK
-      if changed:
-        log2("%i Set status to break.", self._id)
-        self._status = GDB_STATUS_BREAK
-        for thr in thrs:
-          thr._set_status(STATUS_BREAK) # set but dont fire events
+      if self._non_stop:
+        changed = self._set_thread_statuses(thrs, STATUS_BREAK)
+      else:
+        changed = self._status != GDB_STATUS_BREAK
+        if changed:
+          log2("%i Set status to break.", self._id)
+          self._status = GDB_STATUS_BREAK
+          for thr in thrs:
+            thr._set_status(STATUS_BREAK) # set but dont fire events
 
       # run everythign in the stopped queue before we fire status_changed
       tmp = self._run_when_stopped_queue
@@ -685,6 +1054,7 @@ class GdbBackend(DebuggerBackend):
     # do it asynchronously. We will return a waitable so the UI can be
     # productive in the meantime.
     log1("Loading symbosl for prog=%s", prog)
+    index_token = self._begin_symbol_load(prog)
     symbols_loaded = self._run_cmd_async_with_waitable("file-exec-and-symbols %s" % prog)
 
     # switch status [passively] to running here...
@@ -695,19 +1065,19 @@ class GdbBackend(DebuggerBackend):
     totally_done = CallbackDrivenWaitable()
     def on_symbols_loaded(resp):
       log1("Symbols loaded. Launching...")
+      self._end_symbol_load(index_token, resp.code == "done")
       if resp.code != "done":
         self._ptys.remove(dpty)
         self._status = GDB_STATUS_BREAK
         totally_done.abort(DebuggerException("Error: %s" % resp.msg))
         return
-      resp = self._run_cmd("exec-arguments %s" % args)
-      resp.expect_done()
-
       # listen for process add
       self._creating_process = True
 
-      # get the program going....
-      bkpt = self._run_cmd("break-insert main")
+      # set the arguments and get the program going....
+      resp,bkpt = self._run_cmds(["exec-arguments %s" % args,
+                                  "break-insert main"])
+      resp.expect_done()
       bkpt.expect_done()
 
       waitable_for_status_break = self._make_status_break_waitable()
@@ -773,6 +1143,20 @@ class GdbBackend(DebuggerBackend):
     symbols_loaded.when_done(on_symbols_loaded)
     return totally_done
 
+  @property
+  def symbol_index_cache(self):
+    """The SymbolIndexCache gdb was told to use, or None."""
+    return self._symbol_index_cache
+
+  def _begin_symbol_load(self, path):
+    if not self._symbol_index_cache:
+      return None
+    return self._symbol_index_cache.begin_load(path)
+
+  def _end_symbol_load(self, token, succeeded):
+    if token:
+      self._symbol_index_cache.end_load(token, succeeded)
+
   def begin_attach_to_pid(self,pid,was_launched_hint):
     print "****: %s" % was_launched_hint
     if self._status == GDB_STATUS_RUNNING:
@@ -801,7 +1185,9 @@ class GdbBackend(DebuggerBackend):
     # _make_status_break_waitable because that intrinsic expects us to
     # get a "*running" message whereas in the attach case, we won't!
     aborted = BoxedObject(False)
+    index_token = self._begin_symbol_load("/proc/%i/exe" % pid)
     def on_cmd_done(resp):
+      self._end_symbol_load(index_token, resp.code != "error")
       if resp.code == "error":
         log0("Error during attach: %s", resp)
         aborted.set(True)
@@ -846,11 +1232,9 @@ class GdbBackend(DebuggerBackend):
         # this is an ndbg launcher
         log1("Detected an app launched by ndbg_launcher.")
 
-        log1("Unblocking")
-        resp = self._run_cmd("interpreter-exec console \"call __is_ndbg_launcher_waiting=0\"")
-
-        log1("Catching exec")
-        resp = self._run_cmd("interpreter-exec console \"tcatch exec\"")
+        log1("Unblocking and catching exec")
+        self._run_cmds(["interpreter-exec console \"call __is_ndbg_launcher_waiting=0\"",
+                        "interpreter-exec console \"tcatch exec\""])
 
         # send a raw continue command --> this will continue and load the new library
         # eventually we will go to stopped, which will put is in the new process w00t
@@ -938,32 +1322,117 @@ class GdbBackend(DebuggerBackend):
     attached.when_done(finalize_attach)
     return totally_done
 
+  def begin_open_core(self, exe, core_file):
+    """
+    Begins to open core_file, dumped by exe, as a process that can be
+    inspected but not run. Nothing is read per thread: stacks are only
+    fetched when asked for, so large cores open quickly. Returns a waitable
+    for the process.
+    """
+    if self._status == GDB_STATUS_RUNNING:
+      raise DebuggerException("Expected break or not-running status")
+    if len(self.processes) == 1 and self._allow_multiple_processes == False:
+      raise Exception("Your version of GDB does not support multiple processes. Use debugger.Debugger to hide this fact from you.")
+    def quote(s):
+      return '"%s"' % s.replace('\\', '\\\\').replace('"', '\\"')
+
+    inf = self._alloc_inferior()
+    self._set_inferior(inf)
+    self._creating_process = True
+
+    # symbols, core and the source of the crashing frame in one round trip;
+    # the threads arrive as thread-created notifications along the way
+    index_token = self._begin_symbol_load(exe)
+    totally_done = CallbackDrivenWaitable()
+    resps = []
+    def on_symbols_loaded(resp):
+      self._end_symbol_load(index_token, resp.code == "done")
+      resps.append(resp)
+    def on_source(resp):
+      resps.append(resp)
+      finalize_open(*resps)
+    def finalize_open(symbols_resp, core_resp, source_resp):
+      self._creating_process = False
+      proc = self._new_process
+      self._new_process = None
+      if symbols_resp.code == "error" or core_resp.code == "error" or not proc:
+        del self._new_threads[:]
+        self._free_inferior(inf)
+        if symbols_resp.code == "error":
+          totally_done.abort(DebuggerException("Could not load %s: %s" % (exe, symbols_resp.msg)))
+        elif core_resp.code == "error":
+          totally_done.abort(DebuggerException("Could not open %s: %s" % (core_file, core_resp.msg)))
+        else:
+          totally_done.abort(DebuggerException("A processes wasn't created. This is kind of a problem."))
+        return
+
+      info = DynObject()
+      info.pid = proc._gdb_pid
+      info.target_exe = os.path.abspath(exe)
+      info.target_cwd = os.path.dirname(os.path.abspath(core_file))
+      info.full_cmdline = [exe]
+      for l in core_resp.gdblines:
+        m = re.match("^Core was generated by `(.*)'\\.$", l)
+        if m:
+          info.full_cmdline = shlex.split(m.group(1))
+      info.compilation_directory = None
+      for l in source_resp.gdblines:
+        m = re.match("^Compilation directory is (.+)$",l)
+        if m:
+          info.compilation_directory = m.group(1)
+      info.inferior = inf
+      info.core_file = os.path.abspath(core_file)
+      proc._set_backend_info(info, False)
+
+      for t in self._new_threads:
+        t._set_status(STATUS_BREAK)
+        proc.threads.append(t)
+      self.processes.add(proc)
+      for t in self._new_threads:
+        self._threads.add(t)
+      if len(self._new_threads):
+        self._thread_that_stopped = self._new_threads[0] # the one that took the signal
+      del self._new_threads[:]
+
+      self._status_changed.fire(self)
+      self._on_symbols_changed()
+      totally_done.set_done(proc)
+
+    self._run_cmds_async(["file-exec-and-symbols %s" % quote(exe),
+                          "target-select core %s" % quote(core_file),
+                          "interpreter-exec console \"info source\""],
+                         [on_symbols_loaded, resps.append, on_source])
+    return totally_done
+
   def _get_process_info(self,proc):
     out = DynObject()
     # select a thread from the process so interpreter-exec gets a decent thread
     #thr = list(proc.threads)[0]
     #self._run_cmd_async("thread-select %s" % thr.backend_id, lambda x: None )
 
+    # the pid and the depth of the stack come back in one batch...
+    proc_resp, where_resp, thread_resp = self._run_cmds(["interpreter-exec console \"info proc\"",
+                                                         "interpreter-exec console \"where\"",
+                                                         "interpreter-exec console \"thread 1\""])
+
     # figure out pid
-    resp = self._run_cmd("interpreter-exec console \"info proc\"")
-    procInfo = parse_loose_dict(resp.gdblines)
+    procInfo = parse_loose_dict(proc_resp.gdblines)
     pid = int(procInfo.process)
     out.target_cwd = str(procInfo.cwd)
     out.target_exe = str(procInfo.exe)
 
     # figure out cdir
-    resp = self._run_cmd("interpreter-exec console \"where\"")
-    resp.expect_done()
-#    print "last is %s" % resp.gdblines[-1];
-    m = re.match("#(\d+)", resp.gdblines[-1])
+    where_resp.expect_done()
+    thread_resp.expect_done()
+#    print "last is %s" % where_resp.gdblines[-1];
+    m = re.match("#(\d+)", where_resp.gdblines[-1])
     assert m
     last_frame_number = int(m.group(1))
 #    print "last_frame is %i" % last_frame_number
-    resp = self._run_cmd("interpreter-exec console \"thread 1\"")
+    resp, source_resp = self._run_cmds(["interpreter-exec console \"frame %i\"" % last_frame_number,
+                                        "interpreter-exec console \"info source\""])
     resp.expect_done()
-    resp = self._run_cmd("interpreter-exec console \"frame %i\"" % last_frame_number)
-    resp.expect_done()
-    resp = self._run_cmd("interpreter-exec console \"info source\"")
+    resp = source_resp
     resp.expect_done()
     found = False
     for l in resp.gdblines:
@@ -983,6 +1452,7 @@ class GdbBackend(DebuggerBackend):
 
     # remember the inferior
     out.inferior = self._cur_inferior
+    out.core_file = None
 
     # we're done
     return out
@@ -999,7 +1469,11 @@ class GdbBackend(DebuggerBackend):
     inf = proc.backend_info.inferior
     self._set_inferior(inf)
 
-    resp = self._run_cmd("interpreter-exec console \"kill inferior %i\"" % inf)
+    if proc.core_file:
+      # there's nothing to kill, just the core to let go of
+      resp = self._run_cmd("interpreter-exec console \"detach inferior %i\"" % inf)
+    else:
+      resp = self._run_cmd("interpreter-exec console \"kill inferior %i\"" % inf)
     self._killing_process = False
 
     # error handling for failed exit
@@ -1050,6 +1524,9 @@ class GdbBackend(DebuggerBackend):
     log2("Kill process %s complete", proc)
 
   def detach_process(self, proc):
+    if proc.core_file:
+      self.kill_process(proc)
+      return
     resp = self._run_cmd("interpreter-exec console \"detach inferior %i\"" % proc.inferior)
     # target-detach pid
 
@@ -1073,6 +1550,8 @@ class GdbBackend(DebuggerBackend):
     If you are counting on the debugger going to running, then make sure you wait on the returned object.
     E.g. begin_resume.wait()
     """
+    if self._non_stop:
+      return self._begin_resume_non_stop(thr)
     if self._status != GDB_STATUS_BREAK:
       raise DebuggerException("GdbBackend %s: Cannot resume when status is already %s" % (self._id, self._status))
 
@@ -1095,17 +1574,50 @@ class GdbBackend(DebuggerBackend):
 
     return PollWhileTrueWaitable(lambda: self._num_running_messages == orig_num_runnings)
 
+  def _begin_resume_non_stop(self, thr):
+    """Resumes thr, or every stopped thread if thr is None, leaving the others as they are."""
+    if thr:
+      if thr.status != STATUS_BREAK:
+        raise DebuggerException("GdbBackend %s: Cannot resume %s, it is already running" % (self._id, thr))
+      thrs = [thr]
+      cmd = "exec-continue --thread %s" % thr.backend_id
+    else:
+      thrs = [t for t in self._threads if t.status == STATUS_BREAK]
+      cmd = "exec-continue --all"
+    orig_num_runnings = self._num_running_messages
+    if self._set_thread_statuses(thrs, STATUS_RUNNING):
+      self._status_changed.fire(self)
+      for t in thrs:
+        t._fire_changed()
+    self._run_cmd_async(cmd, lambda res: 1)
+    return PollWhileTrueWaitable(lambda: self._num_running_messages == orig_num_runnings)
+
+  def begin_interrupt_thread(self, thr):
+    """Stops just thr in non-stop mode. In all-stop mode this is the same as begin_interrupt."""
+    if not self._non_stop:
+      return self.begin_interrupt()
+    log2("%i: begin_interrupt_thread %s", self._id, thr)
+    self._run_cmd_async("exec-interrupt --thread %s" % thr.backend_id, lambda res: 1)
+    return PollWhileTrueWaitable(lambda: thr.status == STATUS_RUNNING)
+
   def begin_interrupt(self):
+    if self._non_stop:
+      log2("%i: begin_interrupt, non-stop", self._id)
+      self._run_cmd_async("exec-interrupt --all", lambda res: 1)
+      return PollWhileTrueWaitable(lambda: self._status == GDB_STATUS_RUNNING)
     if self._stop_pending:
       log2("%i: begin_interrupt and _stop_pending", self._id)
       return PollWhileTrueWaitable(lambda: self._status == GDB_STATUS_RUNNING)
     log2("%i: begin_interrupt", self._id)
-    self._stop_pending = True
     for proc in self._processes:
       if proc.backend_info == None:
 	raise DebuggerException("Cannot interrupt %s, not running." % proc)
-      else:
-        os.system("kill -INT %s" % proc.backend_info.pid)
+    # a core's pid is the one it was dumped with, which some other process may have now
+    live = [proc for proc in self._processes if not proc.core_file]
+    if len(live):
+      self._stop_pending = True
+    for proc in live:
+      os.kill(proc.backend_info.pid, signal.SIGINT)
     return PollWhileTrueWaitable(lambda: self._status == GDB_STATUS_RUNNING)
 
   def _make_status_break_waitable(self,chatty=False): # waits on NEXT break -- if we're break already, it doesn't count
@@ -1120,8 +1632,21 @@ class GdbBackend(DebuggerBackend):
 
     return PollUntilTrueWaitable(check_break)
 
+  def _begin_step_non_stop(self, thread, cmd):
+    """Steps only thread. The waitable completes once it stops again."""
+    if thread.status != STATUS_BREAK:
+      raise DebuggerException("GdbBackend %s: Cannot step %s, it is running" % (self._id, thread))
+    orig_num_runnings = self._num_running_messages
+    if self._set_thread_statuses([thread], STATUS_RUNNING):
+      self._status_changed.fire(self)
+      thread._fire_changed()
+    self._run_cmd_async("%s --thread %s" % (cmd, thread.backend_id), lambda res: 1)
+    return PollUntilTrueWaitable(lambda: self._num_running_messages != orig_num_runnings and thread.status == STATUS_BREAK)
+
   def begin_step_over(self,thread ):
     log2("%i: begin_step_over", self._id)
+    if self._non_stop:
+      return self._begin_step_non_stop(thread, "exec-next")
     w = self._make_status_break_waitable()
     changed = self._status != GDB_STATUS_RUNNING
     self._status = GDB_STATUS_RUNNING
@@ -1132,6 +1657,8 @@ class GdbBackend(DebuggerBackend):
 
   def begin_step_into(self, thread):
     log2("%i: begin_step_into", self._id)
+    if self._non_stop:
+      return self._begin_step_non_stop(thread, "exec-step")
     w = self._make_status_break_waitable()
     changed = self._status != GDB_STATUS_RUNNING
     self._status = GDB_STATUS_RUNNING
@@ -1142,6 +1669,8 @@ class GdbBackend(DebuggerBackend):
 
   def begin_step_out(self, thread):
     log2("%i: begin_step_out", self._id)
+    if self._non_stop:
+      return self._begin_step_non_stop(thread, "exec-finish")
     w = self._make_status_break_waitable()
     changed = self._status != GDB_STATUS_RUNNING
     self._status = GDB_STATUS_RUNNING
@@ -1152,6 +1681,60 @@ class GdbBackend(DebuggerBackend):
 
 
 
+  def begin_explore_calls(self, thread, max_depth, calls_cb):
+    """
+    Steps through thread's current function until it returns, gdb-side, to
+    find what it calls. Functions deeper than max_depth frames, counting the
+    current one as 1, or without source are stepped over. calls_cb is given
+    lists of newly found (caller, callee) function names as they stream in.
+    The steps aren't reported; status goes to running and back just once.
+    """
+    self._check_stopped(thread)
+    if self._exploring:
+      raise DebuggerException("Already exploring calls")
+    cmds = []
+    cbs = []
+    if not self._explore_script_loaded:
+      def on_loaded(res):
+        if res.code == "error":
+          log0("%i: Could not load %s: %s", self._id, _EXPLORE_CALLS_SCRIPT, res.msg)
+      cmds.append("interpreter-exec console \"source %s\"" % _EXPLORE_CALLS_SCRIPT.replace('\\', '\\\\').replace('"', '\\"'))
+      cbs.append(on_loaded)
+      self._explore_script_loaded = True
+    w = CallbackDrivenWaitable()
+    w.set_check_for_abort_cb(lambda: self._run == False)
+    def on_done(res):
+      exploring = self._exploring
+      self._exploring = None
+      if res.code == "error":
+        log1("%i: Exploring calls failed: %s", self._id, res.msg)
+      stopped = exploring.last_stopped
+      if stopped == None: # it didn't get as far as a step
+        stopped = '*stopped,reason="end-stepping-range",thread-id="%i",stopped-threads="all"' % thread.backend_id
+      self._on_exec_message(stopped)
+      w.set_done(exploring.num_calls)
+    cmds.append("interpreter-exec --thread %i console \"python ndbg_explore_calls('%s', %i, %i)\"" % (thread.backend_id, _EXPLORE_OUTPUT_MARKER, max_depth, _EXPLORE_BATCH_SIZE))
+    cbs.append(on_done)
+
+    self._exploring = DynObject({"calls_cb" : calls_cb, "last_stopped" : None, "num_calls" : 0})
+    changed = self._status != GDB_STATUS_RUNNING
+    self._status = GDB_STATUS_RUNNING
+    if changed:
+      self._status_changed.fire(self)
+    self._run_cmds_async(cmds, cbs)
+    return w
+
+  def cancel_explore_calls(self):
+    """Stops a begin_explore_calls early, leaving the thread wherever it got to."""
+    if self._exploring:
+      os.kill(self.gdb.pid, signal.SIGINT)
+
+  def _on_explore_calls_found(self, calls):
+    if not self._exploring:
+      return
+    self._exploring.num_calls += len(calls)
+    self._exploring.calls_cb(calls)
+
   # program execution
   ###########################################################################
   def _init_breakpoints(self):
@@ -1159,45 +1742,159 @@ class GdbBackend(DebuggerBackend):
     pass
 
   """Should return an object with an id and location_list=list(Locations)"""
-  def new_breakpoint(self,location,hit_cb):
+  def new_breakpoint(self,location,hit_cb,dprintf=None,condition=None):
+    results = []
+    self.begin_new_breakpoints([location], [hit_cb], lambda i,res,exc: results.append((res,exc)), [dprintf], [condition]).wait()
+    res,exc = results[0]
+    if exc:
+      raise exc
+    return res
+
+  def begin_new_breakpoints(self,locations,hit_cbs,result_cb,dprintfs=None,conditions=None):
+    """
+    Inserts breakpoints at all of locations in one pipelined batch. hit_cbs
+    is parallel to locations. result_cb(i, res, exc) is called as each reply
+    arrives, with res being what new_breakpoint would have returned for
+    locations[i] or exc the DebuggerException it would have raised. Returns a
+    waitable that completes once every location has been reported.
+
+    dprintfs, if given, is also parallel to locations. Where it has an
+    object with id, format and args, a dprintf is inserted instead, whose
+    output goes to logpoint_log under that id.
+
+    conditions, if given, is parallel to locations too. Where it has an
+    object with expression (None for none) and ignore_count, gdb evaluates
+    those on each hit itself and only stops when they're satisfied.
+    """
+    done = CallbackDrivenWaitable()
+    done.set_check_for_abort_cb(lambda: self._run == False)
+    remaining = BoxedObject(len(locations))
+    def report(i, res, exc):
+      result_cb(i, res, exc)
+      remaining.set(remaining.get() - 1)
+      if remaining.get() == 0:
+        done.set_done(None)
+    if len(locations) == 0:
+      done.set_done(None)
+      return done
+    self._load_symbols_for_addresses([l.prog_ctr for l in locations if l.has_pc])
+
+    cmds = []
+    idxs = []
+    for i in range(len(locations)):
+      dprintf = None
+      if dprintfs:
+        dprintf = dprintfs[i]
+      condition = None
+      if conditions:
+        condition = conditions[i]
+      cmd = self._get_break_insert_cmd(locations[i], dprintf, condition)
+      if cmd == None:
+        report(i, None, DebuggerException("Don't know how to create bkpt for %s" % locations[i]))
+        continue
+      cmds.append(cmd)
+      idxs.append(i)
+    def make_on_resp(i):
+      def on_resp(resp):
+        if resp.code != "done":
+          report(i, None, DebuggerException(getattr(resp, "msg", "Could not insert breakpoint: %s" % resp.code)))
+          return
+        self._breakpoint_map_id_to_hit_cb[resp.bkpt.number] = hit_cbs[i]
+        self._get_breakpoint_locations(resp.bkpt, lambda res,exc: report(i, res, exc))
+      return on_resp
+    if len(cmds):
+      self._run_cmds_async(cmds, [make_on_resp(i) for i in idxs])
+    return done
+
+  def begin_list_breakpoint_locations(self):
+    """
+    Re-reads where gdb has placed all breakpoints, e.g. after a library load
+    made gdb re-resolve them, with a single break-list. Returns a waitable
+    whose value maps breakpoint id to its list of Locations.
+    """
+    def parse(resp):
+      if resp.code != "done":
+        raise DebuggerException(getattr(resp, "msg", "Could not list breakpoints: %s" % resp.code))
+      res = {}
+      for b in resp.BreakpointTable.body:
+        if type(b.number) == str: # a location of a compound breakpoint, mi2 style
+          res[int(b.number.split(".")[0])].append(parse_location(b))
+        elif getattr(b, "addr", "<PENDING>") == "<PENDING>": # its library was unloaded, or it isn't a code breakpoint
+          res[b.number] = []
+        elif b.addr == "<MULTIPLE>":
+          res[b.number] = [parse_location(l) for l in getattr(b, "locations", [])]
+        else:
+          res[b.number] = [parse_location(b)]
+      return res
+    done = CallbackDrivenWaitable()
+    done.set_check_for_abort_cb(lambda: self._run == False)
+    def on_resp(resp):
+      try:
+        done.set_done(parse(resp))
+      except DebuggerException, e:
+        done.abort(e)
+    self._run_cmd_async("break-list", on_resp)
+    return done
+
+  def _get_break_insert_cmd(self, location, dprintf=None, condition=None):
+    def escape(s):
+      return s.replace('\\', '\\\\').replace('"', '\\"')
     if location.has_pc:
-      bcmd = "break-insert *%s"% location.prog_ctr
+      loc = "*%s"% location.prog_ctr
     elif location.has_file_location:
-      bcmd = "break-insert %s:%i" % (location.filename, location.line_num)
+      loc = "%s:%i" % (location.filename, location.line_num)
     elif location.has_identifier:
-      bcmd = "break-insert %s" % (location.identifier)
+      loc = location.identifier
     else:
-      raise DebuggerException("Don't know how to create bkpt for %s" % location)
-
-    # create it
-    resp = self._run_cmd(bcmd)
-
-    # parse response...
-    if resp.code == "error":
-      raise DebuggerException(resp.msg)
-
-    # remember cb
-    self._breakpoint_map_id_to_hit_cb[resp.bkpt.number] = hit_cb
+      return None
+    opts = ""
+    if condition:
+      if condition.expression != None:
+        opts += '-c "%s" ' % escape(condition.expression)
+      if condition.ignore_count:
+        opts += "-i %i " % condition.ignore_count
+    if not dprintf:
+      return "break-insert %s%s" % (opts, loc)
+    format = '"%s%i:%s\\n"' % (LOGPOINT_OUTPUT_MARKER, dprintf.id, escape(dprintf.format))
+    args = ['"%s"' % escape(a) for a in dprintf.args]
+    return "dprintf-insert %s%s %s %s" % (opts, loc, format, " ".join(args))
+
+  def _get_breakpoint_locations(self, bkpt, cb):
+    """Calls cb(res, exc) with the id and location_list of a newly inserted bkpt."""
+    if bkpt.addr != "<MULTIPLE>":
+      cb(DynObject({"id" : bkpt.number,
+                    "location_list" : [parse_location(bkpt)] }), None)
+      return
+    if hasattr(bkpt, "locations"): # mi3 lists the locations inline
+      cb(DynObject({"id" : bkpt.number,
+                    "location_list" : [parse_location(x) for x in bkpt.locations]}), None)
+      return
 
-    # is it a compound breakpoint?
-    if resp.bkpt.addr == "<MULTIPLE>":
-      hinfo = self._run_cmd("break-info %i" % resp.bkpt.number)
-      cinfo = self._run_cmd("interpreter-exec console \"info breakpoint %i\"" % resp.bkpt.number)
-      bps = parse_multiple_breakpoint_info(hinfo,cinfo.gdblines)
+    # older gdbs need a second query to list the locations of a compound breakpoint
+    resps = []
+    def on_info(resp):
+      resps.append(resp)
+      if len(resps) != 2:
+        return
+      hinfo,cinfo = resps
+      try:
+        bps = parse_multiple_breakpoint_info(hinfo,cinfo.gdblines)
+      except DebuggerException, e:
+        cb(None, e)
+        return
       if bps[0].type != "breakpoint":
-        raise DebuggerException("Unexpected response.")
-      real_bps = bps[1:]
+        cb(None, DebuggerException("Unexpected response."))
+        return
       locations = []
-      for b in real_bps:
+      for b in bps[1:]:
         l = parse_console_style_location(b.addr)
         log1("Got %s", l)
         locations.append(l)
-      return DynObject({"id" : resp.bkpt.number,
-                        "location_list" : locations})
-    else:
-      l = parse_location(resp.bkpt)
-      return DynObject({"id" : resp.bkpt.number,
-                        "location_list" : [l] })
+      cb(DynObject({"id" : bkpt.number,
+                    "location_list" : locations}), None)
+    self._run_cmds_async(["break-info %i" % bkpt.number,
+                          "interpreter-exec console \"info breakpoint %i\"" % bkpt.number],
+                         [on_info, on_info])
 
   def enable_breakpoint(self,id):
     resp = self._run_cmd("break-enable % i" % id)
@@ -1205,6 +1902,26 @@ class GdbBackend(DebuggerBackend):
   def disable_breakpoint(self,id):
     resp = self._run_cmd("break-disable %i" % id)
 
+  def set_breakpoint_condition(self,id,expression):
+    """Makes breakpoint id stop only when expression is true. None for always."""
+    if expression == None:
+      resp = self._run_cmd("break-condition %i" % id)
+    else:
+      resp = self._run_cmd("break-condition %i %s" % (id, expression))
+    if resp.code != "done":
+      raise DebuggerException(getattr(resp, "msg", "Could not set condition %s" % expression))
+
+  def set_breakpoint_ignore_count(self,id,count):
+    resp = self._run_cmd("break-after %i %i" % (id, count))
+    if resp.code != "done":
+      raise DebuggerException(getattr(resp, "msg", "Could not set ignore count"))
+
+  def get_breakpoint_hit_count(self,id):
+    resp = self._run_cmd("break-info %i" % id)
+    if resp.code != "done":
+      raise DebuggerException(getattr(resp, "msg", "Could not get breakpoint %i" % id))
+    return int(getattr(resp.BreakpointTable.body[0], "times", 0))
+
   def _on_breakpoint_hit(self,resp):
     if self._breakpoint_map_id_to_hit_cb.has_key(resp.bkptno):
       self._breakpoint_map_id_to_hit_cb[resp.bkptno]()
@@ -1217,20 +1934,72 @@ class GdbBackend(DebuggerBackend):
   # State accessors - always done with a thread
   ###########################################################################
   def get_call_stack(self,thr):
-    if self._status != GDB_STATUS_BREAK:
-      raise DebuggerException("Only valid in breakpoint mode.")
+    self._check_stopped(thr)
     resp = self._run_cmd("stack-list-frames --thread %s" % thr.backend_id)
+    if self._load_symbols_for_mi_frames(resp.stack):
+      resp = self._run_cmd("stack-list-frames --thread %s" % thr.backend_id)
     return [parse_stack_frame(x) for x in resp.stack]
   def get_frame(self,thr,frame):
-    if self._status != GDB_STATUS_BREAK:
-      raise DebuggerException("Only valid in breakpoint mode.")
     assert type(frame) == int
-    resp = self._run_cmd("stack-list-frames --thread %s %i %i" % (thr.backend_id, frame, frame))
-    if not hasattr(resp, "stack"):
-      import pdb; pdb.set_trace()
-
-    assert len(resp.stack) == 1
-    return parse_stack_frame(resp.stack[0])
+    frames = self.get_frames(thr,frame,frame)
+    if len(frames) != 1:
+      raise DebuggerException("No frame %i on thread %s" % (frame, thr.backend_id))
+    return frames[0]
+  def get_frames(self,thr,low,high):
+    """Frames low through high inclusive. Returns fewer if the stack is shallower."""
+    self._check_stopped(thr)
+    assert type(low) == int and type(high) == int
+    cmd = "stack-list-frames --thread %s %i %i" % (thr.backend_id, low, high)
+    resp = self._run_cmd(cmd)
+    if resp.code == "error":
+      if low > 0: # gdb errors when low is past the bottom of the stack
+        return []
+      raise DebuggerException("Could not list frames: %s" % resp.msg)
+    if self._load_symbols_for_mi_frames(resp.stack):
+      resp = self._run_cmd(cmd)
+    return [parse_stack_frame(x) for x in resp.stack]
+  def get_top_frames(self):
+    """Frame zero of every stopped thread, keyed by backend id, using one thread-info."""
+    self._check_stopped()
+    resp = self._run_cmd("thread-info")
+    if resp.code == "error":
+      raise DebuggerException("Could not get thread info: %s" % resp.msg)
+    if self._load_symbols_for_mi_frames([t.frame for t in resp.threads if hasattr(t, "frame")]):
+      resp = self._run_cmd("thread-info")
+    res = {}
+    for t in resp.threads:
+      if hasattr(t, "frame") and getattr(t, "state", "stopped") == "stopped":
+        res[t.id] = parse_stack_frame(t.frame)
+    return res
+  def get_all_thread_stacks(self,max_frames):
+    """
+    Up to max_frames frames of every thread, keyed by backend id. All the
+    stack listings are written to gdb in one go and the replies are read
+    back in one pass, rather than a round trip per thread.
+    """
+    self._check_stopped()
+    ids = [t.backend_id for t in self._threads if not self._non_stop or t.status == STATUS_BREAK]
+    cmds = ["stack-list-frames --thread %s 0 %i" % (id, max_frames - 1) for id in ids]
+    resps = self._run_cmds(cmds)
+    mi_frames = []
+    for resp in resps:
+      if resp.code == "done":
+        mi_frames.extend(resp.stack)
+    if self._load_symbols_for_mi_frames(mi_frames):
+      resps = self._run_cmds(cmds)
+    res = {}
+    for id,resp in zip(ids,resps):
+      if resp.code == "done":
+        res[id] = [parse_stack_frame(x) for x in resp.stack]
+      else:
+        log1("Could not list frames for thread %s: %s", id, getattr(resp, "msg", resp.code))
+    return res
+  def get_call_stack_depth(self,thr):
+    self._check_stopped(thr)
+    resp = self._run_cmd("stack-info-depth --thread %s" % thr.backend_id)
+    if resp.code == "error":
+      raise DebuggerException("Could not get stack depth: %s" % resp.msg)
+    return int(resp.depth)
 
   def begin_interpreter_exec_async(self,thr,expr,cb):
     if expr == "debug":
@@ -1261,13 +2030,108 @@ class GdbBackend(DebuggerBackend):
   def get_expr_value_async(self,thr,expr,cb):
     cmd = "data-evaluate-expression --thread %s --frame %i %s" % (thr.backend_id,thr.active_frame_number, expr)
     def cleanup_result(resp):
-      res = DynObject()
-      if resp.code == "done":
-        res.valid = True
-        res.value = resp.value
-      else:
-        res.valid = False
-        res.error = resp.msg
-      cb(res)
+      cb(self._conv_expr_value(resp))
     w = self._run_cmd_async_with_waitable(cmd,cleanup_result)
     return w
+
+  def begin_evaluate_expressions(self, thr, frame, exprs):
+    """
+    Evaluates each of exprs in the given frame of thr. The evaluations are
+    written to gdb in one go and their replies read back in one pass. Returns
+    a waitable for a list parallel to exprs of DynObjects with valid, and
+    value or error: an expression that fails doesn't affect the others.
+    Values are strings, as gdb printed them.
+    """
+    self._check_stopped(thr)
+    w = CallbackDrivenWaitable()
+    w.set_check_for_abort_cb(lambda: self._run == False)
+    if len(exprs) == 0:
+      w.set_done([])
+      return w
+    results = [None for e in exprs]
+    remaining = BoxedObject(len(exprs))
+    def make_on_result(i):
+      def on_result(resp):
+        results[i] = self._conv_expr_value(resp)
+        remaining.set(remaining.get() - 1)
+        if remaining.get() == 0:
+          w.set_done(results)
+      return on_result
+    cmds = []
+    for expr in exprs:
+      quoted_expr = expr.replace('\\', '\\\\')
+      quoted_expr = quoted_expr.replace('"', '\\"')
+      cmds.append("data-evaluate-expression --thread %s --frame %i \"%s\"" % (thr.backend_id, frame, quoted_expr))
+    self._run_cmds_async(cmds, [make_on_result(i) for i in range(len(exprs))])
+    return w
+
+  def _conv_expr_value(self, resp):
+    res = DynObject()
+    if resp.code == "done":
+      res.valid = True
+      # values are gdb's text, but the MI parser turns bare numbers into ints, 0x ones too
+      res.value = resp.value
+      if type(res.value) != str:
+        m = re.match(r'value="([^"]*)"$', getattr(resp, "_mi_results", ""))
+        res.value = m and m.group(1) or str(res.value)
+    else:
+      res.valid = False
+      res.error = resp.msg
+    return res
+
+  # Variable objects
+  ###########################################################################
+  def create_varobj(self,thr,frame,expr):
+    """Creates a floating variable object for expr, evaluated in the given frame at each update."""
+    self._check_stopped(thr)
+    quoted_expr = expr.replace('\\', '\\\\')
+    quoted_expr = quoted_expr.replace('"', '\\"')
+    resp = self._run_cmd("var-create --thread %s --frame %i - @ \"%s\"" % (thr.backend_id, frame, quoted_expr))
+    if resp.code == "error":
+      raise DebuggerException(resp.msg)
+    return DynObject({"name" : resp.name,
+                      "value" : getattr(resp, "value", None),
+                      "type" : getattr(resp, "type", None),
+                      "num_children" : resp.numchild})
+
+  def update_varobjs(self,thr,frame):
+    """
+    Re-evaluates every variable object in the given frame. Returns only the
+    ones that changed, as DynObjects of name, value, in_scope, and
+    new_type/new_num_children when those changed.
+    """
+    self._check_stopped(thr)
+    resp = self._run_cmd("var-update --thread %s --frame %i --all-values *" % (thr.backend_id, frame))
+    if resp.code == "error":
+      raise DebuggerException(resp.msg)
+    res = []
+    for c in resp.changelist:
+      change = DynObject({"name" : c.name,
+                          "value" : getattr(c, "value", None),
+                          "in_scope" : getattr(c, "in_scope", "true")})
+      if getattr(c, "type_changed", "false") == "true":
+        change.new_type = c.new_type
+        change.new_num_children = c.new_num_children
+      elif hasattr(c, "new_num_children"):
+        change.new_num_children = c.new_num_children
+      res.append(change)
+    return res
+
+  def list_varobj_children(self,name,low,high):
+    """Children low through high-1 of a variable object, with values."""
+    self._check_stopped()
+    resp = self._run_cmd("var-list-children --all-values %s %i %i" % (name, low, high))
+    if resp.code == "error":
+      raise DebuggerException(resp.msg)
+    if not hasattr(resp, "children"):
+      return []
+    return [DynObject({"name" : c.name,
+                       "expression" : c.exp,
+                       "value" : getattr(c, "value", None),
+                       "type" : getattr(c, "type", None),
+                       "num_children" : c.numchild}) for c in resp.children]
+
+  def delete_varobj(self,name):
+    resp = self._run_cmd("var-delete %s" % name)
+    if resp.code == "error":
+      raise DebuggerException(resp.msg)
@@ -0,0 +1,107 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import traceback
+
+from util import *
+from . import *
+from gdb_backend import GdbBackend
+
+class GdbBackendPool(object):
+  """
+  Keeps a number of GdbBackends spawned and initialized ahead of time so that
+  launching or attaching doesn't have to wait for gdb to start. Backends taken
+  from the pool are replaced in the background.
+  """
+  def __init__(self, size, backend_factory = None):
+    self._size = size
+    self._backend_factory = backend_factory or (lambda: GdbBackend(wait_for_init=False))
+    self._backends = [] # initializing or ready, oldest first
+    self._refill_pending = False
+    self._refill_failed = False
+    self._shutdown = False
+    self._stats = DynObject({"hits" : 0, "misses" : 0, "created" : 0})
+    self._schedule_refill()
+
+  @property
+  def size(self):
+    return self._size
+  @size.setter
+  def size(self, size):
+    self._size = size
+    while len(self._backends) > self._size:
+      self._backends.pop().shutdown(force=True)
+    self._schedule_refill()
+
+  @property
+  def stats(self):
+    """hits and misses of take(), and the number of backends created for the pool."""
+    return DynObject({"hits" : self._stats.hits,
+                      "misses" : self._stats.misses,
+                      "created" : self._stats.created,
+                      "available" : len(self._backends)})
+
+  def take(self):
+    """Returns an initialized backend, from the pool if it has one."""
+    backend = None
+    while backend == None and len(self._backends):
+      # prefer one that is already initialized; otherwise the oldest is closest to being done
+      candidates = [b for b in self._backends if b.init_waitable.is_done]
+      if len(candidates) == 0:
+        candidates = self._backends
+      b = candidates[0]
+      self._backends.remove(b)
+      try:
+        b.init_waitable.wait()
+        backend = b
+      except Exception, e:
+        log1("GdbBackendPool: discarding %s, it failed to initialize: %s", b, e)
+        b.shutdown(force=True)
+    if backend:
+      self._stats.hits += 1
+    else:
+      self._stats.misses += 1
+      backend = GdbBackend()
+    self._schedule_refill()
+    return backend
+
+  def shutdown(self):
+    self._shutdown = True
+    for b in self._backends:
+      try:
+        b.shutdown(force=True)
+      except:
+        traceback.print_exc()
+    del self._backends[:]
+
+  def _schedule_refill(self):
+    if self._refill_pending or self._shutdown or self._refill_failed:
+      return
+    if len(self._backends) >= self._size:
+      return
+    self._refill_pending = True
+    MessageLoop.add_message(self._refill)
+
+  def _refill(self):
+    self._refill_pending = False
+    if self._shutdown:
+      return
+    while len(self._backends) < self._size:
+      try:
+        b = self._backend_factory()
+      except Exception, e:
+        log0("GdbBackendPool: could not start a backend, not refilling: %s", e)
+        self._refill_failed = True # don't keep trying to spawn something that won't start
+        return
+      self._stats.created += 1
+      self._backends.append(b)
@@ -0,0 +1,78 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Runs inside gdb, not ndbg: GdbBackend.begin_explore_calls sources this and
+# calls ndbg_explore_calls. Stepping from here costs no round trips to ndbg,
+# which only hears about the calls found, a batch at a time.
+import os
+import gdb
+
+def _function_name(frame):
+  f = frame.function()
+  if f:
+    return f.print_name
+  return frame.name()
+
+def _has_source(frame):
+  symtab = frame.find_sal().symtab
+  return symtab != None and os.path.exists(symtab.fullname())
+
+def _write_edges(marker, edges):
+  gdb.write("".join(["%s%s\t%s\n" % (marker, caller, callee) for caller,callee in edges]))
+  gdb.flush()
+
+def ndbg_explore_calls(marker, max_depth, batch_size):
+  """
+  Steps through the selected thread's current function until it returns,
+  writing every caller/callee pair seen within max_depth frames of it as a
+  marker-prefixed "caller<tab>callee" line. Functions without source, or
+  that deep, are stepped out of rather than into.
+  """
+  start = gdb.newest_frame()
+  seen = set()
+  batch = []
+  last = start
+  try:
+    while True:
+      out = gdb.execute("step", to_string=True)
+      if "SIGINT" in out: # ndbg cancelled us
+        break
+      frame = gdb.newest_frame()
+      if frame == last:
+        continue # still in the same function
+      last = frame
+      names = []
+      f = frame
+      while f != None and f != start:
+        names.append(_function_name(f))
+        f = f.older()
+      if f == None:
+        break # start returned
+      names.append(_function_name(start))
+      if frame != start and (len(names) > max_depth or not _has_source(frame)):
+        gdb.execute("finish", to_string=True)
+        last = None
+        if len(names) > max_depth:
+          continue
+      for i in range(1, len(names)):
+        edge = (names[i], names[i-1])
+        if edge[0] and edge[1] and edge not in seen:
+          seen.add(edge)
+          batch.append(edge)
+      if len(batch) >= batch_size:
+        _write_edges(marker, batch)
+        batch = []
+  except (gdb.error, KeyboardInterrupt):
+    pass # the process exited, or we were interrupted
+  _write_edges(marker, batch)
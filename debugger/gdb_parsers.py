@@ -62,7 +62,7 @@ def parse_location(resp):
   return Location(id=id,filename=filename,line_num=line_num,prog_ctr=prog_ctr)
 
 def parse_stack_frame(frame):
-  return StackFrame(frame.level,parse_location(frame))
+  return StackFrame(frame.level,parse_location(frame),getattr(frame,"from",None))
 
 
 class GdbMiInnerResponse(object):
@@ -78,76 +78,81 @@ class GdbMiInnerResponse(object):
     vals = ["%s=%s" % (x,tostr(getattr(self,x))) for x in keys]
     return "{%s}" % ",".join(vals)
 
+_int_re = re.compile('\d+$')
+_hex_re = re.compile('0x[0-9a-fA-F]+$')
+
 def _parse_bare_string(v):
-    m= re.match('\d+$',v)
-    if m:
+    if _int_re.match(v):
       value = int(v)
+    elif _hex_re.match(v):
+      value = int(v,16)
     else:
-      m = re.match('0x[0-9a-fA-F]+$',v)
-      if m:
-        value  = int(v,16)
-      else:
-        v = v.replace("\\\"","\"")
-        value = v
+      value = v.replace("\\\"","\"")
     return value
 
-def _parse_single_item(rest,key_required=True):
-  qi = rest.find('=')
+# The MI parser walks a single cursor over the line rather than re-slicing the
+# remainder at every token, so large replies (stack-list-frames, thread-info,
+# var-list-children) parse in one linear pass.
+def _parse_mi_key(l, i):
+  qi = l.find('=', i)
   if qi == -1:
-    if key_required:
-      raise Exception("zomg no key found, rest=%s" % rest)
-    key = ""
-  else:
-    key = rest[:qi]
-    rest = rest[qi+1:]
-  key = key.replace("-","_") # replace dashes with underscores
-  
-#  print "key=%s,rest=%s" % (key,rest)
-  value = None
-  if rest[0] == '"':
-    rest = rest[1:]
-    qi = rest.find('"')
-    while rest[qi-1] == "\\": #its escaped, find another
-      qi = rest.find('"',qi+1)
-    v = rest[:qi]
-    value = _parse_bare_string(v)
-    rest = rest[qi+1:]
-  elif rest[0] == '{':
-    rest = rest[1:]
+    raise Exception("zomg no key found, rest=%s" % l[i:])
+  return (l[i:qi].replace("-","_"), qi + 1)
+
+def _parse_mi_value(l, i):
+  c = l[i]
+  if c == '"':
+    start = i + 1
+    qi = l.find('"', start)
+    while qi > start and l[qi-1] == "\\": # its escaped, find another
+      qi = l.find('"', qi+1)
+    if qi == -1:
+      raise Exception("barf: unterminated string: %s" % l[i:])
+    return (_parse_bare_string(l[start:qi]), qi + 1)
+  elif c == '{':
+    i += 1
     value = GdbMiInnerResponse()
     while True:
-      if rest[0] == '}':
-        rest = rest[1:]
-        break
-      elif rest[0] == ',':
-        rest = rest[1:]
-        continue
+      c = l[i]
+      if c == '}':
+        return (value, i + 1)
+      elif c == ',':
+        i += 1
       else:
-        (subkey,subvalue,subrest) = _parse_single_item(rest)
-        setattr(value,subkey,subvalue)
-        rest = subrest
-  elif rest[0] == '[':
-    rest = rest[1:]
+        key, i = _parse_mi_key(l, i)
+        subvalue, i = _parse_mi_value(l, i)
+        setattr(value,key,subvalue)
+  elif c == '[':
+    i += 1
     value = []
     while True:
-      if rest[0] == ']':
-        rest = rest[1:]
-        break
-      elif rest[0] == ',':
-        rest = rest[1:]
-        continue
-      elif rest[0] == '{':
-        rest="anon=%s" % rest
-        (subkey,subvalue,subrest) = _parse_single_item(rest,key_required=False)
-        value.append(subvalue)
-        rest = subrest
+      c = l[i]
+      if c == ']':
+        return (value, i + 1)
+      elif c == ',':
+        i += 1
       else:
-        (subkey,subvalue,subrest) = _parse_single_item(rest,key_required=False)
+        if c != '"' and c != '{' and c != '[':
+          i = _parse_mi_key(l, i)[1] # list items may be keyed; the key is dropped
+        subvalue, i = _parse_mi_value(l, i)
         value.append(subvalue)
-        rest = subrest
   else:
-    raise Exception("barf: %s", rest)
-  return (key,value,rest)
+    raise Exception("barf: %s", l[i:])
+
+def _parse_mi_results(obj, l):
+  """Parses a comma separated list of key=value results from l onto obj."""
+  i = 0
+  n = len(l)
+  while i < n:
+    key, i = _parse_mi_key(l, i)
+    value, i = _parse_mi_value(l, i)
+    setattr(obj,key,value)
+    if i == n:
+      break
+    elif l[i] == ',':
+      i += 1
+    else:
+      raise Exception("Zomg dont know what to do! %s" % l[i:])
 
 
 class GdbMiResponse(GdbMiInnerResponse):
@@ -155,22 +160,7 @@ class GdbMiResponse(GdbMiInnerResponse):
     GdbMiInnerResponse.__init__(self)
     self.code = code
     if l:
-      rest = l
-    else:
-      rest = ""
-    while len(rest) > 0:
-      #    print "PR rest=%s" % rest
-      (key,value,rest) = _parse_single_item(rest)
-      #    print "got key=%s,value=%s,rest=%s" % (key,value,rest)
-      setattr(self,key,value)
-      if len(rest) == 0:
-        break
-      elif rest[0] == ',':
-        rest = rest[1:]
-        continue
-      else:
-        raise Exception("Zomg dont know what to do! %s" % rest)
-    #  print "DONE: %s\n" % result
+      _parse_mi_results(self, l)
   def expect_done(self,err_msg=None):
     self.expect('done',err_msg)
   def expect(self,code,err_msg=None):
@@ -216,6 +206,20 @@ def parse_multiple_breakpoint_info(hresp,clines):
 
   return ret
 
+_info_sharedlibrary_re = re.compile(r"^\s*(?:0x[0-9a-fA-F]+\s+0x[0-9a-fA-F]+\s+)?(Yes|No)(?: \(\*\))?\s+(\S.*?)\s*$")
+
+def parse_info_sharedlibrary(clines):
+  """
+  Library name -> whether gdb has read its symbols, from the console
+  output of info sharedlibrary. "Yes (*)" is read, just without debug info.
+  """
+  res = {}
+  for l in clines:
+    m = _info_sharedlibrary_re.match(l)
+    if m:
+      res[m.group(2)] = m.group(1) == "Yes"
+  return res
+
 def parse_console_style_location(l):
   # phase 1, rip out the program counter
   prog_ctr = None
@@ -0,0 +1,115 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from collections import deque
+import threading
+import time
+
+from util import *
+from . import *
+from breakpoint import Breakpoint
+
+LOGPOINT_LOG_SIZE = 10000
+
+# prefixed to every logpoint's output so the backend's reader thread can
+# route it to the log without involving the main thread
+LOGPOINT_OUTPUT_MARKER = "ndbg-log:"
+
+class Logpoint(Breakpoint):
+  """
+  A breakpoint that gdb handles itself with dprintf: on every hit it prints
+  format with args (C expressions) and the process keeps running. Output
+  goes to the debugger's logpoint_log.
+  """
+  def __init__(self, location, format, args = [], condition = None, ignore_count = 0, hit_threshold = 0):
+    self._format = format
+    self._args = list(args)
+    Breakpoint.__init__(self, location, condition, ignore_count, hit_threshold)
+
+  @property
+  def format(self):
+    return self._format
+
+  @property
+  def args(self):
+    return list(self._args)
+
+  @property
+  def hit_count(self):
+    """Number of times this logpoint printed, counted as its output is read."""
+    if not self._debugger:
+      return 0
+    return self._debugger.logpoint_log.get_hit_count(self.id)
+
+  def __repr__(self):
+    return "Logpoint(%r, %r, %r%s)" % (self._location, self._format, self._args, self._get_condition_repr())
+
+  def _get_dprintf(self):
+    return DynObject({"id" : self.id, "format" : self._format, "args" : self._args})
+
+class LogpointLog(object):
+  """
+  Bounded buffer of logpoint output. append is called on backend reader
+  threads; everything else on the main thread. Readers poll
+  num_appended to find out whether there is anything new.
+  """
+  def __init__(self, size = LOGPOINT_LOG_SIZE):
+    self._lock = threading.Lock()
+    self._entries = deque(maxlen=size)
+    self._hit_counts = {}
+    self._num_appended = 0
+
+  def append(self, id, text):
+    self._lock.acquire()
+    try:
+      self._entries.append((time.time(), id, text))
+      self._hit_counts[id] = self._hit_counts.get(id, 0) + 1
+      self._num_appended += 1
+    finally:
+      self._lock.release()
+
+  @property
+  def size(self):
+    return self._entries.maxlen
+
+  @property
+  def num_appended(self):
+    """Total entries ever appended, including ones that have since fallen out of the buffer."""
+    return self._num_appended
+
+  def get_entries(self, since = 0):
+    """
+    Returns (num_appended, entries) where entries are the (time, id, text)
+    tuples appended after the first since entries that are still buffered.
+    """
+    self._lock.acquire()
+    try:
+      n = self._num_appended
+      entries = list(self._entries)
+    finally:
+      self._lock.release()
+    num_new = min(n - since, len(entries))
+    if num_new <= 0:
+      return (n, [])
+    return (n, entries[-num_new:])
+
+  def get_hit_count(self, id):
+    return self._hit_counts.get(id, 0)
+
+  def clear(self):
+    self._lock.acquire()
+    try:
+      self._entries.clear()
+      self._hit_counts.clear()
+    finally:
+      self._lock.release()
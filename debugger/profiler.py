@@ -0,0 +1,210 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import time
+
+from util import *
+from . import *
+
+PROFILER_DEFAULT_RATE = 20 # samples per second
+PROFILER_MAX_FRAMES = 128
+
+def _frame_name(frame):
+  l = frame.location
+  if l.has_identifier:
+    return l.identifier
+  if frame.library:
+    return "?? (%s)" % os.path.basename(frame.library)
+  if l.has_pc:
+    return "0x%x" % l.prog_ctr
+  return "??"
+
+class CallTreeNode(object):
+  """
+  A function in a sampled call tree. count is the number of samples where it
+  was on the stack under its parent; self_count those where it was on top.
+  """
+  def __init__(self, name, parent = None):
+    self._name = name
+    self._parent = parent
+    self._children = {} # name -> CallTreeNode
+    self._count = 0
+    self._self_count = 0
+
+  name = property(lambda self: self._name)
+  parent = property(lambda self: self._parent)
+  count = property(lambda self: self._count)
+  self_count = property(lambda self: self._self_count)
+
+  @property
+  def children(self):
+    """Callees, most sampled first."""
+    res = self._children.values()
+    res.sort(lambda x,y: cmp(y._count, x._count) or cmp(x._name, y._name))
+    return res
+
+  @property
+  def path(self):
+    """Names from the root's first child down to this node."""
+    res = []
+    n = self
+    while n._parent:
+      res.append(n._name)
+      n = n._parent
+    res.reverse()
+    return res
+
+  def _add_stack(self, names):
+    """Adds a sample of the stack names, outermost frame first."""
+    self._count += 1
+    node = self
+    for name in names:
+      child = node._children.get(name)
+      if child == None:
+        child = CallTreeNode(name, node)
+        node._children[name] = child
+      child._count += 1
+      node = child
+    node._self_count += 1
+
+  def __str__(self):
+    return "%s (%i)" % (self._name, self._count)
+
+class Profiler(object):
+  """
+  A sampling profiler: while started, interrupts the debugger rate times a
+  second, grabs every thread's stack and resumes straight away, building up
+  a call tree of where the threads spend their time.
+  """
+  def __init__(self, debugger, rate = PROFILER_DEFAULT_RATE, max_frames = PROFILER_MAX_FRAMES):
+    self._debugger = debugger
+    self._rate = rate
+    self._max_frames = max_frames
+    self._running = False
+    self._sample_pending = False # a sample is scheduled or in flight
+    self._changed = Event()
+    self.reset()
+
+  @property
+  def rate(self):
+    """Samples per second to aim for."""
+    return self._rate
+  @rate.setter
+  def rate(self, rate):
+    if rate <= 0:
+      raise DebuggerException("Sample rate must be positive")
+    self._rate = rate
+
+  running = property(lambda self: self._running)
+  call_tree = property(lambda self: self._root)
+
+  @property
+  def changed(self):
+    """Fires after every sample, and when the profiler starts, stops or is reset."""
+    return self._changed
+
+  @property
+  def stats(self):
+    """
+    num_samples, num_stacks (thread stacks sampled), and how long the
+    target was stopped per sample, mean_pause and max_pause, in seconds.
+    """
+    mean_pause = 0.0
+    if self._num_samples:
+      mean_pause = self._total_pause / self._num_samples
+    return DynObject({"num_samples" : self._num_samples,
+                      "num_stacks" : self._root.count,
+                      "mean_pause" : mean_pause,
+                      "max_pause" : self._max_pause})
+
+  def reset(self):
+    self._root = CallTreeNode("<all>")
+    self._num_samples = 0
+    self._total_pause = 0.0
+    self._max_pause = 0.0
+    self._changed.fire()
+
+  def start(self):
+    if self._running:
+      return
+    if len(self._debugger.processes) == 0:
+      raise DebuggerException("Nothing to profile")
+    if self._debugger.non_stop:
+      raise DebuggerException("Profiling needs all-stop mode")
+    self._running = True
+    if self._debugger.status == STATUS_BREAK:
+      self._debugger.active_thread.begin_resume()
+    self._changed.fire()
+    if not self._sample_pending:
+      self._schedule_sample(0)
+
+  def stop(self):
+    if not self._running:
+      return
+    self._running = False
+    self._changed.fire()
+
+  def _schedule_sample(self, delay):
+    self._sample_pending = True
+    MessageLoop.add_delayed_message(self._take_sample, delay)
+
+  def _take_sample(self):
+    if not self._running:
+      self._sample_pending = False
+      return
+    if self._debugger.status != STATUS_RUNNING:
+      # a breakpoint, or the process exited
+      log1("Profiler: debugger stopped, stopping profiling")
+      self._sample_pending = False
+      self.stop()
+      return
+    start = time.time()
+    try:
+      w = self._debugger.begin_sample_stacks(self._max_frames)
+    except DebuggerException, e:
+      log0("Profiler: could not sample: %s", e)
+      self._sample_pending = False
+      self.stop()
+      return
+    w.when_done(lambda thread_stacks: self._on_sample(start, thread_stacks))
+
+  def _on_sample(self, start, thread_stacks):
+    pause = time.time() - start
+    self._sample_pending = False
+    self._num_samples += 1
+    self._total_pause += pause
+    self._max_pause = max(self._max_pause, pause)
+    for thr,frames in thread_stacks:
+      names = [_frame_name(f) for f in frames]
+      names.reverse()
+      self._root._add_stack(names)
+    self._changed.fire()
+    if self._running:
+      period = 1.0 / self._rate
+      self._schedule_sample(int(max(0, period - pause) * 1000))
+
+  def get_collapsed_stacks(self):
+    """
+    The call tree as collapsed stacks, one "outer;...;inner count" line per
+    stack, as read by flame graph tools.
+    """
+    lines = []
+    def visit(node, prefix):
+      for c in node.children:
+        path = prefix + [c.name.replace(";", ":")]
+        if c.self_count:
+          lines.append("%s %i" % (";".join(path), c.self_count))
+        visit(c, path)
+    visit(self._root, [])
+    return "".join([l + "\n" for l in lines])
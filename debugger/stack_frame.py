@@ -15,11 +15,12 @@ import re
 from . import *
 
 class StackFrame:
-  def __init__(self,frame_number,location):
+  def __init__(self,frame_number,location,library=None):
     if type(frame_number) != int:
       raise Exception("Invalid type")
     self.frame_number = frame_number
     self.location = location
+    self.library = library # the shared library the frame is in, when gdb says
   def __str__(self):
     return "#%s %s" % (self.frame_number, str(self.location))
 
@@ -0,0 +1,216 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import json
+import struct
+import time
+
+from util import *
+
+_SHT_NOTE = 7
+_NT_GNU_BUILD_ID = 3
+
+def read_build_id(path):
+  """Returns the GNU build-id of an ELF file as a hex string, or None."""
+  try:
+    f = open(path, "rb")
+  except IOError:
+    return None
+  try:
+    ident = f.read(16)
+    if len(ident) != 16 or ident[:4] != "\x7fELF":
+      return None
+    is_64 = ident[4] == "\x02"
+    endian = ident[5] == "\x02" and ">" or "<"
+    if is_64:
+      f.seek(0x28)
+      shoff, = struct.unpack(endian + "Q", f.read(8))
+      f.seek(0x3A)
+      shentsize, shnum = struct.unpack(endian + "HH", f.read(4))
+      shdr_fmt = endian + "IIQQQQ"
+    else:
+      f.seek(0x20)
+      shoff, = struct.unpack(endian + "I", f.read(4))
+      f.seek(0x2E)
+      shentsize, shnum = struct.unpack(endian + "HH", f.read(4))
+      shdr_fmt = endian + "IIIIII"
+    hdr_size = struct.calcsize(shdr_fmt)
+    for i in range(shnum):
+      f.seek(shoff + i * shentsize)
+      name, type, flags, addr, offset, size = struct.unpack(shdr_fmt, f.read(hdr_size))
+      if type != _SHT_NOTE:
+        continue
+      f.seek(offset)
+      notes = f.read(size)
+      pos = 0
+      while pos + 12 <= len(notes):
+        namesz, descsz, ntype = struct.unpack(endian + "III", notes[pos:pos+12])
+        pos += 12
+        nname = notes[pos:pos+namesz]
+        pos += (namesz + 3) & ~3
+        desc = notes[pos:pos+descsz]
+        pos += (descsz + 3) & ~3
+        if ntype == _NT_GNU_BUILD_ID and nname.rstrip("\0") == "GNU":
+          return desc.encode("hex")
+    return None
+  except (struct.error, IOError):
+    return None
+  finally:
+    f.close()
+
+def _find_executable(prog):
+  if os.path.exists(prog):
+    return prog
+  for d in os.environ.get("PATH", "").split(os.pathsep):
+    p = os.path.join(d, prog)
+    if os.path.exists(p):
+      return p
+  return None
+
+class SymbolIndexCache(object):
+  """
+  A directory of gdb symbol indices, keyed by build-id, that gdb reads and
+  writes through its index-cache. Loads of a binary whose index is already
+  present skip the DWARF scan. The directory is kept under max_size bytes by
+  evicting the least recently used indices, and load times are remembered so
+  that the time saved by hits can be reported.
+  """
+  _default = None
+
+  @staticmethod
+  def get_default():
+    return SymbolIndexCache._default
+
+  @staticmethod
+  def set_default(cache):
+    """Sets the cache that newly created GdbBackends use. None disables caching."""
+    SymbolIndexCache._default = cache
+
+  def __init__(self, directory, max_size):
+    self._directory = os.path.abspath(os.path.expanduser(directory))
+    self._max_size = max_size
+    if not os.path.exists(self._directory):
+      os.makedirs(self._directory)
+    self._metadata_file = os.path.join(self._directory, "ndbg_load_times.json")
+    self._load_times = {} # build-id -> seconds a load took without an index
+    try:
+      self._load_times = json.load(open(self._metadata_file))
+    except (IOError, ValueError):
+      pass
+    self._stats = DynObject({"hits" : 0, "misses" : 0, "time_saved" : 0.0})
+    self.evict()
+
+  directory = property(lambda self: self._directory)
+  max_size = property(lambda self: self._max_size)
+
+  @property
+  def stats(self):
+    """hits, misses and time_saved (seconds) for loads this session, and the cache's current size in bytes."""
+    return DynObject({"hits" : self._stats.hits,
+                      "misses" : self._stats.misses,
+                      "time_saved" : self._stats.time_saved,
+                      "size" : sum([s for p,s,t in self._list_index_files()])})
+
+  def get_gdb_init_commands(self):
+    quoted_dir = self._directory.replace('\\', '\\\\').replace('"', '\\"')
+    return ["interpreter-exec console \"set index-cache directory %s\"" % quoted_dir,
+            "interpreter-exec console \"set index-cache on\""]
+
+  def _list_index_files(self):
+    """(path, size, last use) for every index in the cache."""
+    res = []
+    for name in os.listdir(self._directory):
+      path = os.path.join(self._directory, name)
+      if path == self._metadata_file:
+        continue
+      try:
+        st = os.stat(path)
+      except OSError:
+        continue
+      res.append((path, st.st_size, max(st.st_mtime, st.st_atime)))
+    return res
+
+  def _get_index_files(self, build_id):
+    return [p for p,s,t in self._list_index_files() if os.path.basename(p).startswith(build_id + ".")]
+
+  def has_index(self, build_id):
+    return len(self._get_index_files(build_id)) != 0
+
+  def begin_load(self, path):
+    """
+    Call before gdb loads symbols for path. Returns a token to pass to
+    end_load once gdb is done.
+    """
+    token = DynObject({"path" : path, "build_id" : None, "was_cached" : False, "start_time" : time.time()})
+    exe = _find_executable(path)
+    if exe:
+      token.build_id = read_build_id(exe)
+    if token.build_id:
+      index_files = self._get_index_files(token.build_id)
+      token.was_cached = len(index_files) != 0
+      for p in index_files:
+        try:
+          os.utime(p, None) # mark as recently used for eviction
+        except OSError:
+          pass
+    return token
+
+  def end_load(self, token, succeeded):
+    if not succeeded or not token.build_id:
+      return
+    elapsed = time.time() - token.start_time
+    if token.was_cached:
+      self._stats.hits += 1
+      saved = 0.0
+      if self._load_times.has_key(token.build_id):
+        saved = max(0.0, self._load_times[token.build_id] - elapsed)
+      self._stats.time_saved += saved
+      log1("SymbolIndexCache: hit for %s (%s), loaded in %.1fs, saved %.1fs", token.path, token.build_id, elapsed, saved)
+    else:
+      self._stats.misses += 1
+      self._load_times[token.build_id] = elapsed
+      self._save_load_times()
+      log1("SymbolIndexCache: miss for %s (%s), loaded in %.1fs", token.path, token.build_id, elapsed)
+    self.evict()
+
+  def _save_load_times(self):
+    try:
+      f = open(self._metadata_file, "w")
+      json.dump(self._load_times, f)
+      f.close()
+    except IOError:
+      log0("SymbolIndexCache: could not write %s", self._metadata_file)
+
+  def evict(self):
+    """Removes least recently used indices until the cache fits in max_size."""
+    files = self._list_index_files()
+    total = sum([s for p,s,t in files])
+    if total <= self._max_size:
+      return
+    files.sort(lambda x,y: cmp(x[2], y[2]))
+    evicted_ids = set()
+    for path,size,t in files:
+      if total <= self._max_size:
+        break
+      try:
+        os.unlink(path)
+      except OSError:
+        continue
+      total -= size
+      evicted_ids.add(os.path.basename(path).split(".")[0])
+      log1("SymbolIndexCache: evicted %s", path)
+    for build_id in evicted_ids:
+      if self._load_times.has_key(build_id) and not self.has_index(build_id):
+        del self._load_times[build_id]
+    self._save_load_times()
@@ -0,0 +1,57 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+UNIQUE_STACKS_MAX_FRAMES = 256
+
+class StackGroup(object):
+  """A distinct call stack and the threads that are currently sitting in it."""
+  def __init__(self, frames):
+    self._frames = frames
+    self._threads = []
+
+  frames = property(lambda self: self._frames)
+  threads = property(lambda self: self._threads)
+  count = property(lambda self: len(self._threads))
+
+  def __str__(self):
+    if len(self._frames):
+      top = str(self._frames[0].location)
+    else:
+      top = "<no frames>"
+    return "%i thread(s) in %s" % (self.count, top)
+
+def _frame_key(frame):
+  # Ignore the program counter when there is something better to go on, so
+  # that threads stopped at different instructions of the same line group.
+  l = frame.location
+  if l.has_identifier or l.has_file_location:
+    return (l.identifier, l.filename, l.line_num)
+  return l.prog_ctr
+
+def group_unique_stacks(thread_stacks):
+  """
+  Groups (thread, frames) pairs by identical stacks. Returns a list of
+  StackGroups, most populous first.
+  """
+  groups = {}
+  order = []
+  for thr, frames in thread_stacks:
+    key = tuple([_frame_key(f) for f in frames])
+    g = groups.get(key)
+    if g == None:
+      g = StackGroup(frames)
+      groups[key] = g
+      order.append(g)
+    g._threads.append(thr)
+  order.sort(lambda x,y: cmp(y.count, x.count)) # stable, so ties keep thread order
+  return order
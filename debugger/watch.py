@@ -0,0 +1,170 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from . import *
+from util import *
+
+WATCH_CHILDREN_PAGE_SIZE = 100
+
+class Watch(object):
+  """
+  A watch expression, or one of its children, backed by a variable object on
+  a backend. Add root watches to Debugger.watches; the debugger keeps them
+  current at each stop, transferring only values that changed. Children are
+  fetched in pages as they are asked for.
+  """
+  def __init__(self, expression, _parent = None):
+    self._expression = expression
+    self._parent = _parent
+    self._changed = Event()
+
+    self._debugger = None
+    self._backend = None
+    self._name = None # variable object name on self._backend
+
+    self._value = None
+    self._type = None
+    self._num_children = 0
+    self._in_scope = True
+    self._error = ""
+    self._children = {} # index -> Watch
+
+  @property
+  def expression(self):
+    return self._expression
+
+  @property
+  def parent(self):
+    return self._parent
+
+  @property
+  def changed(self):
+    """Fired when the value, type or children of this watch change."""
+    return self._changed
+
+  @property
+  def valid(self):
+    """Whether the watch currently has a value. If not, check error."""
+    return self._name != None and self._in_scope
+
+  @property
+  def error(self):
+    if self._name != None and not self._in_scope:
+      return "Not in scope"
+    return self._error
+
+  value = property(lambda self: self._value)
+  type = property(lambda self: self._type)
+  num_children = property(lambda self: self._num_children)
+
+  def get_children(self, low = 0, high = None):
+    """Children low through high-1, fetching any missing pages from the backend."""
+    if high == None or high > self._num_children:
+      high = self._num_children
+    if low >= high:
+      return []
+    first_page = low / WATCH_CHILDREN_PAGE_SIZE
+    last_page = (high - 1) / WATCH_CHILDREN_PAGE_SIZE
+    for p in range(first_page, last_page + 1):
+      plow = p * WATCH_CHILDREN_PAGE_SIZE
+      if self._children.has_key(plow):
+        continue
+      phigh = min(plow + WATCH_CHILDREN_PAGE_SIZE, self._num_children)
+      children = self._backend.list_varobj_children(self._name, plow, phigh)
+      for i in range(len(children)):
+        c = children[i]
+        w = Watch(c.expression, self)
+        w._bind_to_varobj(self._debugger, self._backend, c)
+        self._children[plow + i] = w
+    return [self._children[i] for i in range(low, high) if self._children.has_key(i)]
+
+  def __str__(self):
+    if self.valid:
+      return "%s = %s" % (self._expression, self._value)
+    return "%s: %s" % (self._expression, self.error)
+
+  # Innards
+  def _get_debugger(self):
+    return self._debugger
+  def _set_debugger(self, val):
+    if self._debugger and val:
+      raise Exception("Can't set debugger. Already bound to one! You probably added this watch already.")
+    self._unbind()
+    self._debugger = val
+
+  def _bind(self, backend, thr):
+    """Creates the variable object for a root watch in thr's active frame."""
+    self._unbind()
+    try:
+      r = backend.create_varobj(thr, thr.active_frame_number, self._expression)
+    except DebuggerException, e:
+      log2("Could not create watch %s: %s", self._expression, e.message)
+      self._error = e.message
+      self._value = None
+      self._changed.fire()
+      return
+    self._bind_to_varobj(self._debugger, backend, r)
+    self._changed.fire()
+
+  def _bind_to_varobj(self, debugger, backend, varobj):
+    self._debugger = debugger
+    self._backend = backend
+    self._name = varobj.name
+    self._value = varobj.value
+    self._type = varobj.type
+    self._num_children = varobj.num_children
+    self._in_scope = True
+    self._error = ""
+    self._debugger._watch_varobjs[(backend, self._name)] = self
+
+  def _forget_children(self):
+    for c in self._children.values():
+      c._forget_children()
+      c._forget_varobj()
+    self._children.clear()
+
+  def _forget_varobj(self):
+    if self._name != None and self._debugger:
+      key = (self._backend, self._name)
+      if self._debugger._watch_varobjs.get(key) == self:
+        del self._debugger._watch_varobjs[key]
+    self._backend = None
+    self._name = None
+
+  def _unbind(self, delete = True):
+    """Drops the variable object, deleting it from the backend if delete is set and it still exists."""
+    if self._name == None:
+      return
+    self._forget_children()
+    if delete:
+      try:
+        self._backend.delete_varobj(self._name) # deletes the children as well
+      except DebuggerException, e:
+        log2("Could not delete variable object %s: %s", self._name, e.message)
+    self._forget_varobj()
+
+  def _apply_change(self, change):
+    """Applies one entry of a backend update_varobjs result."""
+    if change.in_scope == "invalid":
+      self._unbind()
+      self._error = "Expression is no longer valid"
+    else:
+      self._in_scope = change.in_scope == "true"
+      if change.value != None:
+        self._value = change.value
+      if hasattr(change, "new_type"):
+        self._type = change.new_type
+      if hasattr(change, "new_num_children"):
+        self._forget_children()
+        self._num_children = change.new_num_children
+    self._changed.fire()
@@ -95,10 +95,65 @@ def _first_run(settings):
   assert resp == gtk.RESPONSE_OK
   settings.Editor = dlg.editor # force it to a value, making it a user-specific setting
 
+def run_core_batch(options, args):
+  """
+  Opens each core in turn without the UI, printing its stacks and any --eval
+  expressions. Returns the exit status: non-zero if any core couldn't be opened.
+  """
+  if len(args) != 1:
+    print "Need the executable the cores were dumped by."
+    return 255
+  exe = args[0]
+  import debugger
+  MessageLoop.init_hooks()
+  d = debugger.Debugger()
+  num_failed = 0
+  try:
+    for core in options.cores:
+      print "==== %s" % core
+      try:
+        proc = d.begin_open_core(exe, core).wait()
+      except Exception, e:
+        print "Could not open %s: %s" % (core, e)
+        num_failed += 1
+        continue
+      crashed = d.active_thread
+      if options.all_threads:
+        threads = list(proc.threads)
+      else:
+        threads = [crashed]
+      for thr in threads:
+        print "Thread %s%s" % (thr.backend_id, thr == crashed and " (crashed)" or "")
+        for frame in thr.call_stack:
+          print "  %s" % frame
+      exprs = options.exprs or []
+      values = crashed.begin_evaluate_expressions(exprs).wait()
+      for expr,value in zip(exprs, values):
+        if value.valid:
+          print "%s = %s" % (expr, value.value)
+        else:
+          print "%s: %s" % (expr, value.error)
+      proc.kill()
+  finally:
+    d.shutdown()
+    MessageLoop.shutdown_hooks()
+  if num_failed:
+    print "Could not open %i of %i cores." % (num_failed, len(options.cores))
+    return 1
+  return 0
+
 def process_options(options, args):
   """Returns dict with keys that need to be applied to the settings object"""
   res = DynObject()
-  if options.exec_with_args:
+  if options.cores:
+    if len(args) != 1 or not exists(args[0]):
+      print "Need the executable the core was dumped by. Cannot continue"
+      return None
+    if not exists(options.cores[0]):
+      print "%s is not a file. Cannot continue" % options.cores[0]
+      return None
+    res.ExecCore = [args[0], options.cores[0]]
+  elif options.exec_with_args:
     if not exists(options.exec_with_args[0]):
       print "%s is not a file. Cannot continue" % options.exec_with_args[0]
       return None
@@ -186,10 +241,13 @@ def run_ui(options, args):
   # debuger init
   settings.register("ExecLaunch", list, None)
   settings.register("ExecAttach", int, -1)
+  settings.register("ExecCore", list, None)
   res = process_options(options, args)
   if not res:
     return
-  if hasattr(res,'ExecAttach'):
+  if hasattr(res,'ExecCore'):
+    settings.set_temporarily("ExecCore", res.ExecCore)
+  elif hasattr(res,'ExecAttach'):
     settings.set_temporarily("ExecAttach", res.ExecAttach)
   elif hasattr(res,'ExecLaunch'):
     settings.set_temporarily("ExecLaunch", res.ExecLaunch)
@@ -215,6 +273,11 @@ def main():
   parser.add_option("--args", dest="exec_with_args", action="callback", callback=handle_args, help="Specify program to run plus arguments")
   parser.add_option("-v", action="count", dest="verbosity", help="Increase the verbosity level. Specifying repeatedly increases more.")
 
+  parser.add_option("--core", action="append", dest="cores", help="Open a core dump of the executable given as the argument. With --batch, may be given repeatedly.")
+  parser.add_option("--batch", action="store_true", default=False, dest="batch", help="Print the crashed thread's stack from each --core, without the UI.")
+  parser.add_option("--all-threads", action="store_true", default=False, dest="all_threads", help="With --batch, print every thread's stack.")
+  parser.add_option("--eval", action="append", dest="exprs", help="With --batch, print the value of an expression in each core's crashed thread. May be given repeatedly.")
+
   parser.add_option("--sourceview", action="store_true", default=False, dest="sourceview", help="Enables use of SourceView as the editor component")
   parser.add_option("--gvim", action="store_true", default=False, dest="gvim", help="Enables use of GVimEditor as the editor component")
   parser.add_option("--emacs", action="store_true", default=False, dest="emacs", help="Enables use of EmacsEditor as the editor component")
@@ -238,14 +301,20 @@ def main():
   # test mode check
   if options.test or options.test_debug:
     run_tests(options,args)
+  elif options.batch:
+    if not options.cores:
+      print "--batch needs at least one --core."
+      return 255
+    return run_core_batch(options,args)
   elif options.launch_in_existing:
     launch_in_existing(options, args)
   else:
-    run_ui(options,args)
+    return run_ui(options,args)
 
 if __name__ == "__main__":
+  status = 255
   try:
-    main()
+    status = main() or 0
   except Exception, e:
     traceback.print_exc()
 
@@ -254,11 +323,11 @@ if __name__ == "__main__":
   threads.remove(threading.current_thread())
   if len(threads) == 0:
     log2("Exiting via sys.exit()")
-    sys.exit(0)
+    sys.exit(status)
   else:
     log1("Warning: threads are still running:")
     for t in threads:
       log1(" %s", t)
     log1("Exiting via os._exit")
-    os._exit(0) # do this so we truly exit... even if we have a lingering thread [eew]
+    os._exit(status) # do this so we truly exit... even if we have a lingering thread [eew]
 #  assert(False)
@@ -16,24 +16,120 @@ from util import *
 from collections import deque
 import re
 import os
+import stat
 import threading
 from .tagged_file import *
+from .file_index_cache import *
+from .directory_watcher import *
+from .file_search_index import *
+
+try:
+  from scandir import scandir # gives us d_type, sparing a stat per entry
+except ImportError:
+  scandir = None
+
+DATABASE_NUM_CRAWLERS = 4
+DATABASE_MAX_RESULTS = 100
+DATABASE_MAX_STREAMED_RESULTS = 1000
+DATABASE_STREAM_CHUNK_SIZE = 50
+DATABASE_INDEX_SAVE_DELAY = 2000 # ms after the crawl goes idle
+DATABASE_POLL_INTERVAL = 5000 # ms between checks for changes when inotify can't be used
+DATABASE_CHANGE_DELAY = 100 # ms to gather a burst of changes in before acting on them
+
+def _is_subpath(base, path):
+  return path == base or path.startswith(base.rstrip(os.sep) + os.sep)
+
+def _make_listing(mtime, subdirs, files):
+  return (mtime,
+          [os.path.basename(s) for s in subdirs],
+          [os.path.basename(f) for f in files])
+
+def _list_dir(dir, ignore_regex):
+  """
+  Splits the entries of dir not matching ignore_regex into subdirectories
+  and files, stat'ing as few of them as possible. Symlinks to directories
+  are left out: they're neither followed nor files.
+  """
+  subdirs = []
+  files = []
+  if scandir:
+    for ent in scandir(dir):
+      if ignore_regex and ignore_regex.match(ent.name):
+        continue
+      if ent.is_dir(follow_symlinks=False):
+        subdirs.append(ent.path)
+      elif ent.is_symlink() and ent.is_dir():
+        continue
+      else:
+        files.append(ent.path)
+    return subdirs, files
+
+  # Without d_type every entry needs an lstat. The link count of dir would
+  # say how many subdirectories there are, but not whether the rest has
+  # symlinks to directories in it, so it can't spare the stats of the rest.
+  for name in os.listdir(dir):
+    if ignore_regex and ignore_regex.match(name):
+      continue
+    path = os.path.join(dir, name)
+    mode = os.lstat(path).st_mode
+    if stat.S_ISDIR(mode):
+      subdirs.append(path)
+    elif stat.S_ISLNK(mode) and os.path.isdir(path):
+      continue
+    else:
+      files.append(path)
+  return subdirs, files
 
 class Database(object):
-  def __init__(self):
+  """
+  Every file under the search paths, found by crawling them on worker
+  threads and kept up to date as they change: through inotify when
+  pyinotify is around, otherwise by checking directory mtimes every
+  poll_interval ms.
+  """
+  def __init__(self, num_crawlers = DATABASE_NUM_CRAWLERS, index_dir = None,
+               use_inotify = True, poll_interval = DATABASE_POLL_INTERVAL):
     self._search_paths = set() # TODO(nduca) --- persist this?
     self._num_files = 0
     self._all_files_by_basename = {}
     self._all_files_by_filename = {}
+    self._search_index = FileSearchIndex(self._all_files_by_basename)
     self._ignores = set()
-    self._ignores_regexes = set()
+    self._ignore_regex = None # all the ignores in one regex, so each name is matched once
 
     self._num_lookups = 0
     self._total_lookup_duration = 0
+    self._latest_query_generation = -1
 
+    self._num_crawlers = num_crawlers
     self._worker_threads = []
-    self._pending_work_queue = deque()
+    self._pending_work_queue = deque() # shared by the workers; deque appends and pops are atomic
+    self._work_lock = threading.Lock()
+    self._num_busy_workers = 0
+    self._num_unsaved_listings = 0 # posted by the workers but not yet on the MessageLoop
+    self._generation = 0 # bumped on reset so results from before it are dropped
+    self._crawl_start_time = None
+    self._crawl_last_found_time = None
+    self._num_dirs_crawled = 0
+
+    self._index_cache = None
+    self._dirs = {} # search path -> {dir : (mtime, subdir names, file names)} as last listed
+    self._dirty_index_paths = set() # search paths whose listings changed since they were saved
+    self._index_save_pending = False
+    self.set_index_dir(index_dir)
+
+    self._watcher = None
+    if use_inotify and DirectoryWatcher.is_supported():
+      self._watcher = DirectoryWatcher(self._on_entry_changed, self._on_file_written, self._on_watch_overflowed)
+    self._watch_failed = False
+    self._poll_interval = poll_interval
+    self._polling = False
+    self._changed_dirs = set() # dirs the watcher saw change, to be listed again
+    self._written_files = set()
+    self._change_flush_pending = False
     self.reset()
+    if self._watcher == None:
+      self._start_polling()
 
   # worker thread system -- shoudl probably get pulled out
   ###########################################################################
@@ -44,31 +140,49 @@ class Database(object):
     del self._worker_threads[:]
 
     self._pending_work_queue.clear() # get rid of any work pending so the thread stops quicker
+    self._generation += 1
     self._num_files = 0
     self._all_files_by_basename.clear()
     self._all_files_by_filename.clear()
+    self._search_index.clear()
+    self._dirs.clear()
+    if self._watcher:
+      self._watcher.unwatch_all()
+    self._changed_dirs.clear()
+    self._written_files.clear()
+    self._crawl_start_time = None
+    self._crawl_last_found_time = None
+    self._num_dirs_crawled = 0
 
   def _walker_thread_step(self):
-    while True:
-      try:
-        cmd, args = self._pending_work_queue.popleft()
-        cmd(*args)
-        return True
-      except IndexError:
-        return False
+    try:
+      cmd, args = self._pending_work_queue.popleft()
+    except IndexError:
+      return False
+    self._work_lock.acquire()
+    self._num_busy_workers += 1
+    self._work_lock.release()
+    try:
+      cmd(*args)
+    finally:
+      self._work_lock.acquire()
+      self._num_busy_workers -= 1
+      self._work_lock.release()
+    return True
 
   def _finish_reset(self):
     for p in self._search_paths:
-      self._pending_work_queue.append((self._explore_path, self._search_paths))
+      self._dirs[p] = {}
+      self._add_work(self._explore_path, p, p, {})
 
-    log2("Restarting worker thread(s)")
-    for i in range(1):
-      wt = WellBehavedThread("ProgDB Worker", self._walker_thread_step)
+    log2("Restarting %i worker thread(s)", self._num_crawlers)
+    for i in range(self._num_crawlers):
+      wt = WellBehavedThread("ProgDB Worker %i" % i, self._walker_thread_step)
       wt.start()
       self._worker_threads.append(wt)
 
   def reset(self):
-    """Resets the memory of the database. Temporary fix until database watches directories for changes."""
+    """Forgets every file found and crawls the search paths again, without the index on disk."""
     self._begin_reset()
     self._finish_reset()
 
@@ -76,11 +190,17 @@ class Database(object):
     self._pending_work_queue.appendleft((cb,args))
 
   def _add_work(self, cb,*args): # to back of queue
+    if self._crawl_start_time == None:
+      self._crawl_start_time = time.time()
     self._pending_work_queue.append((cb,args))
 
   def shutdown(self):
     log2("Shutting down Database")
+    self._polling = False
+    self._save_index()
     self._begin_reset()
+    if self._watcher:
+      self._watcher.shutdown()
     log2("Shutdown done")
 
   # actual database logic
@@ -90,16 +210,55 @@ class Database(object):
     if type(ign) != str:
       raise Exception("ign should be a str")
     log1("Database: Adding ignore %s", ign)
-    if len(self._search_paths) == 0:
-      # no need to reset if we aren't doign anything yet
-      self._ignores.add(ign)
-      self._ignores_regexes.add(re.compile(ign))
+    regex = re.compile(ign) # fail here rather than on the workers
+    if ign in self._ignores:
       return
-    else:
-      self._begin_reset()
-      self._ignores.add(ign)
-      self._ignores_regexes.add(re.compile(ign))
-      self._finish_reset()
+    self._ignores.add(ign)
+    self._update_ignore_regex()
+    self._prune_ignored(regex)
+
+  def remove_ignore(self, ign):
+    if ign not in self._ignores:
+      return
+    log1("Database: Removing ignore %s", ign)
+    self._ignores.remove(ign)
+    self._update_ignore_regex()
+    # what it hid could be anywhere, so list everything again. Files already
+    # found stay findable meanwhile.
+    for root in self._dirs:
+      self._add_work(self._explore_path, root, root, {})
+
+  def _update_ignore_regex(self):
+    if len(self._ignores) == 0:
+      self._ignore_regex = None # an empty regex would match everything
+      return
+    # sorted, so the pattern can tell whether a saved index used the same ignores
+    self._ignore_regex = re.compile("|".join(["(?:%s)" % ign for ign in sorted(self._ignores)]))
+
+  def _prune_ignored(self, regex):
+    """Removes the files and dirs matching regex from the listings and the database."""
+    keep = lambda names: [n for n in names if not regex.match(n)]
+    for root, dirs in self._dirs.items():
+      pruned = False
+      for dir, (mtime, subdirs, files) in dirs.items():
+        if not dirs.has_key(dir):
+          continue # under a dir pruned already
+        ignored_subdirs = [n for n in subdirs if regex.match(n)]
+        ignored_files = [n for n in files if regex.match(n)]
+        if len(ignored_subdirs) == 0 and len(ignored_files) == 0:
+          continue
+        dirs[dir] = (mtime, keep(subdirs), keep(files))
+        for name in ignored_subdirs:
+          self._forget_dir(dirs, os.path.join(dir, name))
+        self._remove_files([os.path.join(dir, f) for f in ignored_files])
+        pruned = True
+      if pruned:
+        self._mark_index_dirty(root)
+
+  def _get_ignores_key(self):
+    if self._ignore_regex:
+      return self._ignore_regex.pattern
+    return ""
 
   def add_search_path(self, search_path):
     log1("Database: add_search_path(%s)", search_path)
@@ -108,57 +267,213 @@ class Database(object):
       log2("Database: %s is already in search path", path)
       return
 
-    def is_subpath(base, subpath):
-      return subpath.startswith(base)
-
     # if path is a subdir of an existing search path, ignore
     for existing_path in self._search_paths:
-      if is_subpath(path, existing_path):
+      if _is_subpath(existing_path, path):
         log2("Database: %s is a subpath of %s, already in the DB's search path", path, existing_path)
         return
 
-    # remove any existing paths that are subpaths of this path; reset if we do
-    search_paths_need_changing = False
-    new_search_paths = set()
-    for existing_path in self._search_paths:
-      if is_subpath(existing_path, path):
-        log2("Existing path %s is a subpath of new path %s", existing_path, path)
-        search_paths_need_changing = True
-      else:
-        new_search_paths.add(existing_path) # save this path in case we have to clobber search paths
-
-    if search_paths_need_changing:
-      log1("Existing search paths changed. Clobbering entire database and resetting...")
-      self._begin_reset()
-      self._search_paths = new_search_paths
-      self._finish_reset()
-    else:
+    if not os.path.isdir(path):
       self._search_paths.add(path)
-      if os.path.isdir(path):
-        self._add_work(self._explore_path, path)
-      else:
-        log1("Database: Not searching %s, is not dir", path)
+      log1("Database: Not searching %s, is not dir", path)
+      return
 
-  def find_files_matching(self,regex_str):
-    log2("Database: Finding files matching %s", regex_str)
+    # existing paths that are subpaths of this path get folded into it,
+    # keeping what was found under them
+    subsumed = [p for p in self._search_paths if _is_subpath(path, p)]
+    self._search_paths.add(path)
+    if len(subsumed) == 0:
+      cache = self._load_index(path)
+      self._add_work(self._explore_path, path, path, cache)
+      return
+    dirs = {}
+    for existing_path in subsumed:
+      log2("Existing path %s is a subpath of new path %s", existing_path, path)
+      self._search_paths.remove(existing_path)
+      dirs.update(self._dirs.pop(existing_path, {}))
+    self._dirs[path] = dirs
+    self._add_work(self._explore_path, path, path, dict(dirs))
+
+  def _get_search_path_for(self, dir):
+    for path in self._search_paths:
+      if _is_subpath(path, dir):
+        return path
+    return None
+
+  def set_index_dir(self, index_dir):
+    """
+    Keeps the listings crawled in index_dir, DATABASE_DEFAULT_INDEX_DIR
+    typically, or nowhere if None. Search paths added later start from what's
+    kept there rather than crawling from scratch; ones already added are
+    saved there as they are.
+    """
+    self._index_cache = None
+    if index_dir:
+      try:
+        self._index_cache = FileIndexCache(index_dir)
+      except OSError, e:
+        log0("Database: not keeping an index on disk: %s", e)
+        return
+      for path in self._dirs:
+        self._mark_index_dirty(path)
+
+  def _load_index(self, path):
+    """
+    Adds the files in path's index on disk to the database straight away,
+    returning its listings so the crawl only has to check them.
+    """
     start_time = time.time()
-    regex = re.compile(regex_str,flags=re.IGNORECASE)
-    res = []
-    MAX_RESULTS = 100
-    for basename in self._all_files_by_basename:
-      if regex.search(basename):
-        for tf in self._all_files_by_basename[basename]:
-          res.append(tf.filename)
-          if len(res) >= 100:
-            res.append("<TRUNCATED>")
-            break
-        if len(res) >= 100:
-          break
+    cache = None
+    if self._index_cache:
+      cache = self._index_cache.load(path, self._get_ignores_key())
+    if cache == None:
+      self._dirs[path] = {}
+      return {}
+    self._dirs[path] = dict(cache)
+    num_files_before = self._num_files
+    for dir, (mtime, subdirs, files) in cache.iteritems():
+      self._add_files([os.path.join(dir, f) for f in files])
+    log1("Database: loaded %i files under %s from its index in %0.3fs", self._num_files - num_files_before, path, time.time() - start_time)
+    return cache
+
+  def _mark_index_dirty(self, path):
+    self._dirty_index_paths.add(path)
+    if not self._index_save_pending and self._index_cache:
+      self._index_save_pending = True
+      MessageLoop.add_delayed_message(self._on_index_save_timer, DATABASE_INDEX_SAVE_DELAY)
+
+  def _on_index_save_timer(self):
+    if self.get_status() != "Idle.":
+      MessageLoop.add_delayed_message(self._on_index_save_timer, DATABASE_INDEX_SAVE_DELAY)
+      return
+    self._index_save_pending = False
+    self._save_index()
+
+  def _save_index(self):
+    if not self._index_cache:
+      return
+    for path in self._dirty_index_paths:
+      if self._dirs.has_key(path):
+        self._index_cache.save(path, self._get_ignores_key(), self._dirs[path])
+    self._dirty_index_paths.clear()
+
+  # keeping up with changes
+  ###########################################################################
+  def _watch(self, dir): # runs on a worker
+    if self._watcher == None or self._watch_failed:
+      return
+    if not self._watcher.watch_dir(dir):
+      self._watch_failed = True
+      log0("Database: could not watch %s, polling for changes instead", dir)
+      MessageLoop.add_message(self._start_polling)
+
+  def _on_entry_changed(self, dir, name):
+    if self._ignore_regex and self._ignore_regex.match(name):
+      return
+    self._changed_dirs.add(dir)
+    self._schedule_change_flush()
+
+  def _on_file_written(self, filename):
+    if self._all_files_by_filename.has_key(filename):
+      self._written_files.add(filename)
+      self._schedule_change_flush()
+
+  def _on_watch_overflowed(self):
+    self._revalidate()
+
+  def _schedule_change_flush(self):
+    if not self._change_flush_pending:
+      self._change_flush_pending = True
+      MessageLoop.add_delayed_message(self._flush_changes, DATABASE_CHANGE_DELAY)
+
+  def _flush_changes(self):
+    self._change_flush_pending = False
+    for dir in self._changed_dirs:
+      root = self._get_search_path_for(dir)
+      if root and self._dirs.has_key(root) and self._dirs[root].has_key(dir):
+        self._add_work(self._relist_dir, root, dir)
+    self._changed_dirs.clear()
+    for filename in self._written_files:
+      tf = self._all_files_by_filename.get(filename)
+      if tf and tf.get_tags() != None:
+        log1("Database: %s was written, tagging it again", filename)
+        tf.update()
+    self._written_files.clear()
+
+  def _start_polling(self):
+    if self._polling:
+      return
+    log1("Database: polling for changes every %i ms", self._poll_interval)
+    self._polling = True
+    MessageLoop.add_delayed_message(self._on_poll_timer, self._poll_interval)
+
+  def _on_poll_timer(self):
+    if not self._polling:
+      return
+    if self.get_status() == "Idle.":
+      self._revalidate()
+    MessageLoop.add_delayed_message(self._on_poll_timer, self._poll_interval)
+
+  def _revalidate(self):
+    """Lists again every dir whose mtime moved since it was last listed."""
+    for root, dirs in self._dirs.items():
+      self._add_work(self._explore_path, root, root, dict(dirs))
+
+  def find_files_matching(self, query):
+    """
+    The files best matching query, best first, as ranked by
+    FileSearchIndex.find. Ends in "<TRUNCATED>" if there were more.
+    """
+    log2("Database: Finding files matching %s", query)
+    start_time = time.time()
+    res, truncated = self._search_index.find(query, DATABASE_MAX_RESULTS)
+    if truncated:
+      res.append("<TRUNCATED>")
     duration = time.time() - start_time
     self._total_lookup_duration += duration
     self._num_lookups += 1
     return res
 
+  def find_files_streaming(self, query, generation):
+    """
+    find_files_matching as a generator, for RemoteClass.call_async_stream:
+    yields lists of up to DATABASE_STREAM_CHUNK_SIZE files, best first, the
+    last ending in "<TRUNCATED>" if there were more than
+    DATABASE_MAX_STREAMED_RESULTS. generation should grow with each query a
+    caller makes. Once a query with a later one comes in, this one has been
+    superseded and stops.
+    """
+    log2("Database: Streaming files matching %s, query %i", query, generation)
+    self._latest_query_generation = max(self._latest_query_generation, generation)
+    start_time = time.time()
+    chunk = []
+    num_found = 0
+    for filename in self._search_index.iter_find(query):
+      if num_found == DATABASE_MAX_STREAMED_RESULTS:
+        chunk.append("<TRUNCATED>")
+        break
+      chunk.append(filename)
+      num_found += 1
+      if len(chunk) < DATABASE_STREAM_CHUNK_SIZE:
+        continue
+      if start_time != None:
+        self._count_streamed_lookup(start_time)
+        start_time = None
+      yield chunk
+      chunk = []
+      if generation < self._latest_query_generation:
+        log2("Database: query %i was superseded", generation)
+        return
+    if start_time != None:
+      self._count_streamed_lookup(start_time)
+    if len(chunk):
+      yield chunk
+
+  def _count_streamed_lookup(self, start_time):
+    # a streamed lookup takes as long as its first chunk took; that's what the user waits on
+    self._total_lookup_duration += time.time() - start_time
+    self._num_lookups += 1
+
   def find_tags_in_file(self, filename):
     if self._all_files_by_filename.has_key(filename):
       tf = self._all_files_by_filename[filename]
@@ -166,6 +481,9 @@ class Database(object):
       if tf.get_tags() == None:
         log1("File %s exists, but tags need to be built", filename)
         tf.update()
+      elif tf.is_stale():
+        log1("File %s changed since it was tagged", filename)
+        tf.update()
       tags = tf.get_tags()
       log1("File %s exists. Returning %i tags", filename, len(tags))
       return tags
@@ -195,59 +513,153 @@ class Database(object):
     else:
       avg = 0
 
-    return "files: %i, averge lookup: %0.3f ms" % (self._num_files, avg * 1000)
+    return "files: %i, averge lookup: %0.3f ms, crawled %i dirs at %i files/s" % (self._num_files, avg * 1000, self._num_dirs_crawled, self.get_crawl_rate())
+
+  def get_crawl_rate(self):
+    """Files found per second, from the start of the crawl until the latest find."""
+    if self._crawl_start_time == None or self._crawl_last_found_time == None:
+      return 0
+    elapsed = self._crawl_last_found_time - self._crawl_start_time
+    if elapsed <= 0:
+      return 0
+    return self._num_files / elapsed
 
   def get_num_files(self):
     """Gets current number of known files. May change over time since the walker thread is constantly discovering new files."""
     return self._num_files
 
   def get_status(self):
-    if len(self._pending_directories) != 0:
+    if len(self._pending_work_queue) != 0 or self._num_busy_workers != 0 or self._num_unsaved_listings != 0:
       return "Searching..."
     else:
       return "Idle."
 
-  def _explore_path(self, dir):
+  def _explore_path(self, root, dir, cache): # runs on a worker
+    """
+    Lists dir, under the search path root, unless cache, the listings loaded
+    for root, has it at its current mtime. Its subdirectories get checked
+    either way.
+    """
+    generation = self._generation
+    ignore_regex = self._ignore_regex
+    log4("Exploring directory: %s", dir)
+    self._watch(dir) # before listing, so nothing slips between the two
     try:
-      ents = os.listdir(dir)
-      log4("Exploring directory: %s", dir)
-    except:
+      mtime = os.stat(dir).st_mtime # before listing, so a change made while we list shows up next time
+      cached = cache.get(dir)
+      if cached and cached[0] == mtime:
+        subdirs = [os.path.join(dir, name) for name in cached[1]]
+        files = None
+      else:
+        subdirs, files = _list_dir(dir, ignore_regex)
+    except OSError:
       log1("Error listing directory %s", dir)
       import traceback
       traceback.print_exc()
-      ents = []
-
-    # filter ents
-    orig_ents = ents
-    ents = []
-    for ent in orig_ents:
-      ignore = False
-      for ign in self._ignores_regexes:
-        if ign.match(ent):
-          ignore = True
-          break
-      if ignore:
-        log4("Ignoring %s", os.path.join(dir,ent))
-        continue
-      ents.append(ent)
-
-    # make ents absolute
-    ents = [os.path.join(dir,ent) for ent in ents]
+      return
 
-    newly_found_files = []
-    for ent in ents:
-      if os.path.isdir(ent):
-        self._add_work_front(self._explore_path, ent)
-      else:
-        newly_found_files.append(ent)
-    if len(newly_found_files):
-      MessageLoop.add_message(self._save_newly_found_files, newly_found_files)
+    # posted before the subdirs are queued, so dirs are always listed after their parent
+    if files != None:
+      listing = _make_listing(mtime, subdirs, files)
+      self._post_listing(generation, root, dir, listing, ignore_regex)
+    # depth first keeps the queue short; the other workers take what's left
+    for subdir in subdirs:
+      self._add_work_front(self._explore_path, root, subdir, cache)
+
+  def _relist_dir(self, root, dir): # runs on a worker
+    """Lists dir again after the watcher saw it change. Subdirs new to it get explored."""
+    generation = self._generation
+    ignore_regex = self._ignore_regex
+    log4("Listing changed directory: %s", dir)
+    try:
+      mtime = os.stat(dir).st_mtime
+      subdirs, files = _list_dir(dir, ignore_regex)
+    except OSError:
+      return # gone; listing its parent again forgets it
+    listing = _make_listing(mtime, subdirs, files)
+    self._post_listing(generation, root, dir, listing, ignore_regex, True)
+
+  def _post_listing(self, *args): # runs on a worker
+    self._work_lock.acquire()
+    self._num_unsaved_listings += 1
+    self._work_lock.release()
+    MessageLoop.add_message(self._on_dir_listed, *args)
+
+  def _on_dir_listed(self, generation, root, dir, listing, ignore_regex, explore_new_subdirs = False): # runs on MessageLoop
+    self._work_lock.acquire()
+    self._num_unsaved_listings -= 1
+    self._work_lock.release()
+    if generation != self._generation:
+      return # found before a reset
+    dirs = self._dirs.get(root)
+    if dirs == None:
+      return # root got folded into a new search path, whose crawl covers dir
+    if ignore_regex is not self._ignore_regex:
+      # the ignores changed while dir was listed
+      parent = dirs.get(os.path.dirname(dir))
+      if dir != root and (parent == None or os.path.basename(dir) not in parent[1]):
+        return # dir is ignored now
+      listing = self._filter_listing(listing)
+    self._num_dirs_crawled += 1
+    old = dirs.get(dir)
+    dirs[dir] = listing
+    self._mark_index_dirty(root)
+    old_subdirs = []
+    old_files = []
+    if old:
+      old_subdirs = old[1]
+      old_files = old[2]
+
+    for name in set(old_subdirs) - set(listing[1]):
+      self._forget_dir(dirs, os.path.join(dir, name))
+    old_files = set(old_files)
+    self._remove_files([os.path.join(dir, f) for f in old_files - set(listing[2])])
+    self._add_files([os.path.join(dir, f) for f in listing[2] if f not in old_files])
+    if explore_new_subdirs:
+      old_subdirs = set(old_subdirs)
+      for name in listing[1]:
+        if name not in old_subdirs:
+          self._add_work(self._explore_path, root, os.path.join(dir, name), {})
+
+  def _filter_listing(self, listing):
+    if self._ignore_regex == None:
+      return listing
+    keep = lambda names: [n for n in names if not self._ignore_regex.match(n)]
+    mtime, subdirs, files = listing
+    return (mtime, keep(subdirs), keep(files))
+
+  def _forget_dir(self, dirs, dir):
+    """Removes dir and everything under it."""
+    listing = dirs.pop(dir, None)
+    if listing == None:
+      return
+    if self._watcher:
+      self._watcher.unwatch_dir(dir)
+    self._remove_files([os.path.join(dir, f) for f in listing[2]])
+    for name in listing[1]:
+      self._forget_dir(dirs, os.path.join(dir, name))
 
-  def _save_newly_found_files(self, files): # runs on MessageLoop
+  def _remove_files(self, files):
+    for filename in files:
+      tf = self._all_files_by_filename.pop(filename, None)
+      if tf == None:
+        continue
+      basename = os.path.basename(filename)
+      tfs = self._all_files_by_basename[basename]
+      tfs.remove(tf)
+      if len(tfs) == 0:
+        del self._all_files_by_basename[basename]
+        self._search_index.name_removed(basename)
+      self._num_files -= 1
+
+  def _add_files(self, files):
+    if len(files) == 0:
+      return
+    self._crawl_last_found_time = time.time()
     log4("Saving %i new files", len(files))
     for filename in files:
-      # make sure we haven't discovered a file twice...
-      assert self._all_files_by_filename.has_key(filename) == False
+      if self._all_files_by_filename.has_key(filename):
+        continue # listed again after a change
 
       # store file in all_files_by_filename
       tf = TaggedFile(filename)
@@ -257,6 +669,7 @@ class Database(object):
       basename = os.path.basename(filename)
       if not self._all_files_by_basename.has_key(basename):
         self._all_files_by_basename[basename] = []
+        self._search_index.name_added(basename)
 
       self._all_files_by_basename[basename].append(tf)
 
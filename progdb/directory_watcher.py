@@ -0,0 +1,85 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+
+from util import *
+
+try:
+  import pyinotify
+except ImportError:
+  pyinotify = None
+
+class DirectoryWatcher(object):
+  """
+  Watches directories with inotify. entry_changed(dir, name) is called on
+  the MessageLoop when name is created, deleted or renamed in a watched dir,
+  file_written(filename) when a file in one is written and closed, and
+  overflowed() if the kernel dropped events, after which nothing watched can
+  be trusted.
+
+  Needs pyinotify; check is_supported first.
+  """
+  @staticmethod
+  def is_supported():
+    return pyinotify != None
+
+  def __init__(self, entry_changed, file_written, overflowed):
+    self._entry_changed = entry_changed
+    self._file_written = file_written
+    self._overflowed = overflowed
+    self._wm = pyinotify.WatchManager()
+    self._wds = {} # dir -> watch descriptor; WatchManager.get_wd is a linear search
+    self._mask = (pyinotify.IN_CREATE | pyinotify.IN_DELETE |
+                  pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO |
+                  pyinotify.IN_CLOSE_WRITE | pyinotify.IN_ONLYDIR | pyinotify.IN_DONT_FOLLOW)
+    self._notifier = pyinotify.ThreadedNotifier(self._wm, self._on_event)
+    self._notifier.daemon = True
+    self._notifier.start()
+
+  def _on_event(self, event): # runs on the notifier thread
+    if event.mask & pyinotify.IN_Q_OVERFLOW:
+      log0("DirectoryWatcher: inotify queue overflowed, changes were missed")
+      MessageLoop.add_message(self._overflowed)
+    elif event.mask & pyinotify.IN_IGNORED:
+      # the dir went away, taking its watch with it
+      if self._wds.get(event.path) == event.wd:
+        del self._wds[event.path]
+    elif event.mask & pyinotify.IN_CLOSE_WRITE:
+      MessageLoop.add_message(self._file_written, event.pathname)
+    else:
+      MessageLoop.add_message(self._entry_changed, event.path, event.name)
+
+  def watch_dir(self, dir):
+    """Returns False if dir couldn't be watched, typically because inotify ran out of watches. Thread safe."""
+    if self._wds.has_key(dir):
+      return True
+    wd = self._wm.add_watch(dir, self._mask, quiet=True).get(dir, -1)
+    if wd < 0:
+      return False
+    self._wds[dir] = wd
+    return True
+
+  def unwatch_dir(self, dir):
+    wd = self._wds.pop(dir, None)
+    if wd != None:
+      self._wm.rm_watch(wd, quiet=True)
+
+  def unwatch_all(self):
+    wds = self._wds.values()
+    self._wds.clear()
+    if len(wds):
+      self._wm.rm_watch(wds, quiet=True)
+
+  def shutdown(self):
+    self._notifier.stop()
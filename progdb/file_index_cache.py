@@ -0,0 +1,81 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+import marshal
+import os
+
+from util import *
+
+DATABASE_DEFAULT_INDEX_DIR = "~/.ndbg_cache/progdb"
+
+_INDEX_VERSION = 1
+
+class FileIndexCache(object):
+  """
+  Keeps the directory listings a Database crawled on disk, one file per
+  search path, so that the next run can load them rather than crawl again.
+  Listings are saved as {dir : (mtime, subdir names, file names)}: a
+  directory whose mtime hasn't moved has had nothing added, removed or
+  renamed in it, so only directories whose mtime did need listing again.
+
+  An index is only good for the ignores it was crawled with; loading with
+  different ones finds nothing.
+  """
+  def __init__(self, directory):
+    self._directory = os.path.abspath(os.path.expanduser(directory))
+    if not os.path.exists(self._directory):
+      os.makedirs(self._directory)
+
+  directory = property(lambda self: self._directory)
+
+  def _get_index_file(self, search_path):
+    return os.path.join(self._directory, "%s.idx" % hashlib.md5(search_path).hexdigest())
+
+  def load(self, search_path, ignores):
+    """The listings saved for search_path, or None if there are none for these ignores."""
+    filename = self._get_index_file(search_path)
+    try:
+      f = open(filename, "rb")
+    except IOError:
+      return None
+    try:
+      try:
+        version, path, saved_ignores, dirs = marshal.load(f)
+      except (EOFError, ValueError, TypeError):
+        log0("FileIndexCache: %s is corrupt, ignoring it", filename)
+        return None
+    finally:
+      f.close()
+    if version != _INDEX_VERSION or path != search_path or saved_ignores != ignores:
+      log1("FileIndexCache: index for %s is stale", search_path)
+      return None
+    return dirs
+
+  def save(self, search_path, ignores, dirs):
+    filename = self._get_index_file(search_path)
+    tmp_filename = "%s.%i.tmp" % (filename, os.getpid())
+    try:
+      f = open(tmp_filename, "wb")
+      try:
+        marshal.dump((_INDEX_VERSION, search_path, ignores, dirs), f)
+      finally:
+        f.close()
+      os.rename(tmp_filename, filename) # so a reader never sees half an index
+    except (IOError, OSError), e:
+      log0("FileIndexCache: could not write %s: %s", filename, e)
+      if os.path.exists(tmp_filename):
+        os.unlink(tmp_filename)
+      return
+    log2("FileIndexCache: saved %i dirs for %s", len(dirs), search_path)
+
@@ -0,0 +1,241 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import heapq
+import os
+import re
+
+from util import *
+
+_MIN_REBUILD_CHANGES = 1000
+_NARROW_MAX = 20000 # most matches kept for narrowing down the next query
+
+def _join(names):
+  """names, shortest first, each between newlines."""
+  names.sort(key=len)
+  return "\n%s\n" % "\n".join(names)
+
+def _fuzzy_pattern(query):
+  # "a[^b\n]*b" rather than "a[^\n]*?b": the same matches, without backtracking
+  res = [re.escape(query[0])]
+  for c in query[1:]:
+    res.append(r"[^%s\n]*%s" % (re.escape(c), re.escape(c)))
+  return "".join(res)
+
+def _separator_pattern(q):
+  """Matches q, in lower case, after a _, -, . or space."""
+  c = re.escape(q[0])
+  return r"%s(?<=[_\-. ]%s)%s" % (c, c, re.escape(q[1:]))
+
+def _camel_pattern(q):
+  """Matches q starting in upper case after a lower case letter, or None if q doesn't start with a letter."""
+  if not q[0].isalpha():
+    return None
+  c = q[0].upper()
+  rest = [ch.isalpha() and "[%s%s]" % (ch.lower(), ch.upper()) or re.escape(ch) for ch in q[1:]]
+  return r"%s(?<=[a-z]%s)%s" % (c, c, "".join(rest))
+
+def _is_word_start(name, i):
+  if i == 0:
+    return True
+  prev = name[i-1]
+  return prev in "_-. " or (prev.islower() and name[i].isupper())
+
+def _has_word_start(name, lower, q):
+  i = lower.find(q)
+  while i != -1:
+    if _is_word_start(name, i):
+      return True
+    i = lower.find(q, i + 1)
+  return False
+
+def _scan(names, text, regex):
+  """
+  Yields (len, name, span of the match) for each name in names, a string
+  from _join, where regex matches text, which is names or names.lower().
+  Shortest names come first.
+  """
+  m = regex.search(text)
+  while m:
+    start = text.rfind("\n", 0, m.start() + 1) + 1
+    end = text.find("\n", m.end())
+    name = names[start:end]
+    yield (len(name), name, m.end() - m.start())
+    m = regex.search(text, end)
+
+def _scan_literal(names, text, s):
+  """_scan for a plain string, which str.find finds a good deal faster than a regex would."""
+  pos = text.find(s)
+  while pos != -1:
+    start = text.rfind("\n", 0, pos + 1) + 1
+    end = text.find("\n", pos + len(s))
+    name = names[start:end]
+    yield (len(name), name, len(s))
+    pos = text.find(s, end)
+
+def _names_of(matches):
+  return (name for l,name,span in matches)
+
+class FileSearchIndex(object):
+  """
+  Finds files in files_by_basename, a basename -> [TaggedFile] dict kept by
+  the Database, for QuickOpen. A basename matches a query if it has the
+  query's characters in order, ignoring case. Basenames the query starts
+  come first, then ones it's in, at a word start first, then the rest, the
+  tighter the match the better. Shorter names win ties.
+
+  The basenames are kept in one newline separated string, shortest first.
+  Finding prefixes and substrings is then a string search in C whose
+  matches come out already ranked, so it stops as soon as enough are found,
+  and only queries without enough of those pay for a fuzzy regex scan. A
+  query that extends the last one can only match what that one did, so
+  when that was few enough names, only those are searched.
+  """
+  def __init__(self, files_by_basename):
+    self._files_by_basename = files_by_basename
+    self._names = _join([])
+    self._lower = self._names
+    self._added = [] # basenames added since _names was built
+    self._added_names = _join([])
+    self._added_lower = self._added_names
+    self._num_changes = 0 # adds and removes since _names was built
+    self._version = 0 # bumped on every change
+    self._dirty = True
+    self._last_query = None
+    self._last_matches = None # every basename _last_query matched
+
+  def name_added(self, name):
+    if "\n" in name:
+      return
+    self._added.append(name)
+    self._changed()
+
+  def name_removed(self, name):
+    # it stays in _names until the next rebuild; find skips it
+    self._changed()
+
+  def clear(self):
+    self._names = _join([])
+    self._lower = self._names
+    del self._added[:]
+    self._num_changes = 0
+    self._changed()
+
+  def _changed(self):
+    self._num_changes += 1
+    self._version += 1
+    self._dirty = True
+    self._last_query = None
+    self._last_matches = None
+
+  def _update(self):
+    if not self._dirty:
+      return
+    self._dirty = False
+    if self._num_changes < max(_MIN_REBUILD_CHANGES, len(self._files_by_basename) / 8):
+      self._added_names = _join(self._added)
+      self._added_lower = self._added_names.lower()
+      return
+    log2("FileSearchIndex: rebuilding after %i changes", self._num_changes)
+    self._names = _join([n for n in self._files_by_basename.iterkeys() if "\n" not in n])
+    self._lower = self._names.lower()
+    del self._added[:]
+    self._added_names = _join([])
+    self._added_lower = self._added_names
+    self._num_changes = 0
+
+  def _scan_all(self, pattern, lower = True, scan = _scan):
+    """scan over the built and the added names, merged."""
+    if scan == _scan:
+      pattern = re.compile(pattern)
+    if lower:
+      texts = (self._lower, self._added_lower)
+    else:
+      texts = (self._names, self._added_names)
+    return heapq.merge(scan(self._names, texts[0], pattern),
+                       scan(self._added_names, texts[1], pattern))
+
+  def _get_tiers(self, query):
+    """Yields, a tier at a time, the names matching query in the order they rank."""
+    version = self._version
+    q = query.lower()
+    fuzzy_pattern = _fuzzy_pattern(q)
+    if self._last_query != None and q.startswith(self._last_query):
+      log2("FileSearchIndex: narrowing %i matches of %s", len(self._last_matches), self._last_query)
+      candidates = [(len(n), n, n.lower()) for n in self._last_matches]
+      candidates.sort()
+      yield [n for l,n,lower in candidates if lower.startswith(q)]
+      yield [n for l,n,lower in candidates if _has_word_start(n, lower, q)]
+      yield [n for l,n,lower in candidates if q in lower]
+      fuzzy_regex = re.compile(fuzzy_pattern)
+      fuzzy = []
+      for l,n,lower in candidates:
+        m = fuzzy_regex.search(lower)
+        if m:
+          fuzzy.append((m.end() - m.start(), l, n))
+    else:
+      yield _names_of(self._scan_all("\n" + q, scan=_scan_literal))
+      word_starts = [self._scan_all(_separator_pattern(q))]
+      camel_pattern = _camel_pattern(q)
+      if camel_pattern:
+        word_starts.append(self._scan_all(camel_pattern, lower=False))
+      yield _names_of(heapq.merge(*word_starts))
+      yield _names_of(self._scan_all(q, scan=_scan_literal))
+      fuzzy = [(span, l, n) for l,n,span in self._scan_all(fuzzy_pattern)]
+    fuzzy.sort()
+    matches = [n for span,l,n in fuzzy]
+    # iter_find's caller can hold it between tiers while names come and go;
+    # matches found from before a change can't be narrowed into after it
+    if len(matches) <= _NARROW_MAX and version == self._version:
+      self._last_query = q
+      self._last_matches = matches
+    yield matches
+
+  def find(self, query, max_results):
+    """
+    Up to max_results filenames best matching query, and whether there were
+    more. If query has a / in it, what's after the last one is matched
+    against basenames and what's before against the rest of the path.
+    """
+    res = []
+    for filename in self.iter_find(query):
+      if len(res) == max_results:
+        return res, True
+      res.append(filename)
+    return res, False
+
+  def iter_find(self, query):
+    """
+    Yields the filenames matching query, best first, as find ranks them,
+    working out each tier only once the ones before it are used up.
+    """
+    self._update()
+    dir_regex = None
+    if "/" in query:
+      dir_query, query = query.rsplit("/", 1)
+      if dir_query:
+        dir_regex = re.compile(_fuzzy_pattern(dir_query), re.IGNORECASE)
+    if query == "":
+      return
+
+    seen = set()
+    for names in self._get_tiers(query):
+      for name in names:
+        if name in seen or not self._files_by_basename.has_key(name):
+          continue
+        seen.add(name)
+        # copied: files can come and go while a caller holds us between yields
+        for tf in list(self._files_by_basename[name]):
+          if dir_regex and not dir_regex.search(os.path.dirname(tf.filename)):
+            continue
+          yield tf.filename
@@ -20,14 +20,25 @@ class TaggedFile(object):
   def __init__(self, filename):
     self.filename = filename
     self._ctags = None
+    self._mtime = None # of the file when it was tagged
 
   def update(self):
     if os.path.exists(self.filename) == False:
       log0("%s has gone missing.", self.filename)
       return
 
+    self._mtime = os.stat(self.filename).st_mtime
     self._ctags = parse_ctags_from_source(self.filename)
 
+  def is_stale(self):
+    """True if the file has been written since it was tagged."""
+    if self._ctags == None:
+      return False
+    try:
+      return os.stat(self.filename).st_mtime != self._mtime
+    except OSError:
+      return False
+
   def get_tag(self, id):
     assert(self._ctags)
     return self._ctags[id]
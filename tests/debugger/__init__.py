@@ -11,4 +11,186 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from __future__ import absolute_import
+import unittest
 
+from debugger import *
+from util import *
+
+class FakeBackend(object):
+  """
+  Stands in for a GdbBackend in tests that don't need gdb. Every call is
+  recorded in requests as (method name, args...), a thread as its
+  backend_id. What it answers with is set on it by the test: stacks,
+  depth, values and pending_changes, locations and hit_counts. Breakpoint
+  inserts are held in pending until deliver() replies to the oldest.
+  """
+  def __init__(self, debugger = None, depth = 0, ready = True):
+    self.debugger = debugger
+    self.status = GDB_STATUS_RUNNING
+    self.thread_that_stopped = None
+    self.threads = []
+    self.processes = [DynObject({"core_file" : None})]
+    self.requests = []
+
+    self.depth = depth # of every thread's call stack; frames are their indices
+    self.stacks = {} # thread id -> frames, for get_all_thread_stacks
+    self.values = {} # expression -> (value, num_children) for varobjs
+    self.pending_changes = [] # varobj changes the next update reports
+    self.pending = [] # (locations, result_cb) of breakpoint inserts not yet replied to
+    self.locations = {} # breakpoint id -> locations, for begin_list_breakpoint_locations
+    self.hit_counts = {}
+    self._next_id = 1
+
+    self.init_waitable = CallbackDrivenWaitable()
+    self.is_shutdown = False
+    if ready:
+      self.init_waitable.set_done(self)
+
+  def _record(self, name, *args):
+    self.requests.append((name,) + args)
+
+  def calls(self, name):
+    """The arguments of every call to name, in order."""
+    return [r[1:] for r in self.requests if r[0] == name]
+
+  @property
+  def request_names(self):
+    return [r[0] for r in self.requests]
+
+  def shutdown(self, force = False):
+    self.is_shutdown = True
+
+  # threads and status
+  def add_thread(self, id, frames = None):
+    thr = DThread(self, id, DynObject({"_debugger" : self.debugger, "core_file" : None}))
+    self.threads.append(thr)
+    if frames != None:
+      self.stacks[id] = frames
+    if self.debugger:
+      self.debugger._on_backend_thread_added(thr)
+    return thr
+
+  def stop(self, thr):
+    """A thread stopping on its own, as in non-stop mode."""
+    thr._set_status(STATUS_BREAK)
+    self.thread_that_stopped = thr
+    self.debugger._on_backend_status_changed(self)
+
+  def begin_interrupt(self):
+    self._record("begin_interrupt")
+    self.status = GDB_STATUS_BREAK
+    self.debugger._on_backend_status_changed(self)
+    return CallbackDrivenWaitable()
+
+  def begin_interrupt_thread(self, thr):
+    self._record("begin_interrupt_thread", thr.backend_id)
+    return CallbackDrivenWaitable()
+
+  def begin_resume(self, thr):
+    self._record("begin_resume", thr.backend_id)
+    thr._set_status(STATUS_RUNNING)
+    self.thread_that_stopped = None
+    return CallbackDrivenWaitable()
+
+  def begin_resume_nonspecific(self, thr):
+    self._record("begin_resume_nonspecific")
+    self.status = GDB_STATUS_RUNNING
+    self.debugger._on_backend_status_changed(self)
+    return CallbackDrivenWaitable()
+
+  def begin_step_over(self, thr):
+    self._record("begin_step_over", thr.backend_id)
+    return CallbackDrivenWaitable()
+
+  # stacks
+  def get_top_frames(self):
+    self._record("get_top_frames")
+    return dict([(t.backend_id, "top%i" % t.backend_id) for t in self.threads])
+
+  def get_call_stack_depth(self, thr):
+    self._record("get_call_stack_depth")
+    return self.depth
+
+  def get_frames(self, thr, low, high):
+    self._record("get_frames", low, high)
+    return range(low, min(high + 1, self.depth))
+
+  def get_all_thread_stacks(self, max_frames):
+    self._record("get_all_thread_stacks", max_frames)
+    return self.stacks
+
+  # breakpoints
+  def begin_new_breakpoints(self, locations, hit_cbs, result_cb, dprintfs = None, conditions = None):
+    self._record("begin_new_breakpoints", locations, dprintfs, conditions)
+    self.pending.append((locations, result_cb))
+    return CallbackDrivenWaitable()
+
+  def deliver(self):
+    """Replies to the oldest pending insert. Locations with the identifier "bad" fail."""
+    locations, result_cb = self.pending.pop(0)
+    for i in range(len(locations)):
+      if locations[i].identifier == "bad":
+        result_cb(i, None, DebuggerException("No symbol"))
+      else:
+        result_cb(i, DynObject({"id" : self._next_id, "location_list" : [locations[i]]}), None)
+        self._next_id += 1
+
+  def delete_breakpoint(self, id):
+    self._record("delete_breakpoint", id)
+
+  def set_breakpoint_condition(self, id, expression):
+    self._record("set_breakpoint_condition", id, expression)
+    if expression == "bad":
+      raise DebuggerException("No symbol")
+
+  def set_breakpoint_ignore_count(self, id, count):
+    self._record("set_breakpoint_ignore_count", id, count)
+
+  def get_breakpoint_hit_count(self, id):
+    return self.hit_counts.get(id, 0)
+
+  def begin_list_breakpoint_locations(self):
+    self._record("begin_list_breakpoint_locations")
+    w = CallbackDrivenWaitable()
+    w.set_done(self.locations)
+    return w
+
+  # variable objects
+  def create_varobj(self, thr, frame, expr):
+    self._record("create_varobj", expr)
+    if not self.values.has_key(expr):
+      raise DebuggerException("No symbol \"%s\" in current context." % expr)
+    value, num_children = self.values[expr]
+    name = "var%i" % self._next_id
+    self._next_id += 1
+    return DynObject({"name" : name, "value" : value, "type" : "int", "num_children" : num_children})
+
+  def update_varobjs(self, thr, frame):
+    self._record("update_varobjs")
+    changes = self.pending_changes
+    self.pending_changes = []
+    return changes
+
+  def list_varobj_children(self, name, low, high):
+    self._record("list_varobj_children", name, low, high)
+    return [DynObject({"name" : "%s.%i" % (name, i), "expression" : "[%i]" % i,
+                       "value" : i * 10, "type" : "int", "num_children" : 0}) for i in range(low, high)]
+
+  def delete_varobj(self, name):
+    self._record("delete_varobj", name)
+
+class FakeBackendTestCase(unittest.TestCase):
+  """A Debugger, self.debugger, whose only backend is a FakeBackend, self.be."""
+  non_stop = False
+
+  def setUp(self):
+    self.debugger = Debugger()
+    if self.non_stop:
+      self.debugger.non_stop = True
+    self.be = FakeBackend(self.debugger)
+    self.debugger._backends.append(self.be)
+
+  def tearDown(self):
+    del self.debugger._backends[:]
+    self.debugger.shutdown()
@@ -0,0 +1,59 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Microbenchmarks for the GDB/MI response parser, using recorded MI payloads
+from tests/resources. Run from the ndbg directory with:
+  python -m tests.debugger.bench_gdb_parsers [iterations]
+"""
+import os
+import re
+import sys
+import time
+
+from debugger.gdb_parsers import *
+
+PAYLOADS = ["gdb_mi_stack_list_frames",
+            "gdb_mi_thread_info",
+            "gdb_mi_var_list_children"]
+
+def load_payload(name):
+  """Returns a list of (code, results) tuples for the result records in the payload."""
+  records = []
+  for l in open(os.path.join("tests/resources", name)).readlines():
+    m = re.match("^(\d+)\^(.[a-z]+),?(.*)$", l.rstrip("\n"))
+    if m:
+      records.append((m.group(2), m.group(3)))
+  return records
+
+def bench_payload(name, iterations):
+  records = load_payload(name)
+  nbytes = sum([len(r[1]) for r in records])
+  start = time.time()
+  for i in range(iterations):
+    for code,results in records:
+      GdbMiResponse(code,results)
+  elapsed = time.time() - start
+  per_parse = elapsed / (iterations * len(records))
+  return (name, nbytes, per_parse * 1000, (nbytes * iterations) / elapsed / (1024 * 1024))
+
+def run(iterations=20):
+  print "%-28s %10s %12s %10s" % ("payload", "bytes", "ms/parse", "MB/s")
+  for name in PAYLOADS:
+    print "%-28s %10i %12.3f %10.2f" % bench_payload(name, iterations)
+
+if __name__ == "__main__":
+  if len(sys.argv) > 1:
+    run(int(sys.argv[1]))
+  else:
+    run()
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from debugger import *
+from util import *
+from tests.debugger import *
 import unittest
 
 class TestDebuggerBreakpoints_Test2(unittest.TestCase):
@@ -34,6 +36,17 @@ class TestDebuggerBreakpoints_Test2(unittest.TestCase):
     self.assertEqual(b2.some_valid,False)
 
 
+  def test_add_breakpoints_in_bulk(self):
+    bps = [Breakpoint(Location(text="c")),
+           Breakpoint(Location(text="no_way_this_function_exists")),
+           Breakpoint(Location(text="test2.c:21"))]
+    progress = []
+    self._debugger.breakpoint_bind_progress.add_listener(lambda n,total: progress.append((n,total)))
+    self._debugger.begin_add_breakpoints(bps).wait()
+    self.assertEqual([b.all_valid for b in bps], [True, False, True])
+    self.assertEqual(progress[-1], (3,3))
+    self.assertEqual(len(self._debugger.breakpoints), 3)
+
   def test_breakpoint_on_hit(self):
     thr = self._debugger.threads.first
 
@@ -66,6 +79,32 @@ class TestDebuggerBreakpoints_Test2(unittest.TestCase):
     trace_sr = " ".join(hit_trace)
     self.assertEqual(trace_sr, "b2 b1 b2")
 
+  def test_hit_threshold(self):
+    thr = self._debugger.threads.first
+    b1 = Breakpoint(Location(text="c"))
+    b2 = Breakpoint(Location(text="test2.c:21"), hit_threshold=2) # skips the first d
+    self._debugger.breakpoints.append(b1)
+    self._debugger.breakpoints.append(b2)
+    self.assertTrue(b2.all_valid)
+    hit_trace = []
+    def trace_and_resume(tv):
+      hit_trace.append(tv)
+      thr.begin_resume()
+    b1.on_hit.add_listener(lambda: trace_and_resume("b1"))
+    b2.on_hit.add_listener(lambda: trace_and_resume("b2"))
+    thr.begin_resume()
+    MessageLoop.run_until(lambda: len(hit_trace) == 2)
+    self.assertEqual(" ".join(hit_trace), "b1 b2")
+    self.assertEqual(b2.hit_count, 2)
+
+  def test_invalid_condition(self):
+    b = Breakpoint(Location(text="c"))
+    self._debugger.breakpoints.append(b)
+    self.assertTrue(b.all_valid)
+    b.condition = "no_way_this_variable_exists == 3"
+    self.assertFalse(b.all_valid)
+    self.assertTrue(b.error != "")
+
   def tearDown(self):
     self._debugger.shutdown()
 
@@ -100,3 +139,123 @@ class TestDebuggerBreakpoints(unittest.TestCase):
 
   def tearDown(self):
     self._debugger.shutdown()
+
+class TestBulkBreakpointBind(FakeBackendTestCase):
+  def test_results_applied_as_they_arrive(self):
+    bps = [Breakpoint(Location(id="main")), Breakpoint(Location(id="bad"))]
+    progress = []
+    self.debugger.breakpoint_bind_progress.add_listener(lambda n,total: progress.append((n,total)))
+    done = self.debugger.begin_add_breakpoints(bps)
+    self.assertEqual(len(self.be.pending), 1) # one batch for all of them
+    self.assertFalse(done.is_done)
+    self.be.deliver()
+    self.assertTrue(done.is_done)
+    self.assertEqual(progress, [(1,2), (2,2)])
+    self.assertTrue(bps[0].all_valid)
+    self.assertFalse(bps[1].all_valid)
+    self.assertEqual(bps[1].error, "No symbol")
+
+  def test_late_reply_after_remove(self):
+    b = Breakpoint(Location(id="main"))
+    self.debugger.begin_add_breakpoints([b])
+    self.debugger.breakpoints.remove(b)
+    self.be.deliver()
+    self.assertEqual(self.be.calls("delete_breakpoint"), [(1,)])
+    self.assertEqual(len(b._backend_breakpoints), 0)
+
+  def test_logpoint_passes_dprintf(self):
+    lp = Logpoint(Location(id="main"), "x=%d y=%s\\n", ["x", "y"])
+    self.debugger.begin_add_breakpoints([Breakpoint(Location(id="foo")), lp])
+    locations, dprintfs, conditions = self.be.calls("begin_new_breakpoints")[0]
+    self.assertEqual(dprintfs[0], None)
+    self.assertEqual(dprintfs[1].id, lp.id)
+    self.assertEqual(dprintfs[1].format, "x=%d y=%s\\n")
+    self.assertEqual(dprintfs[1].args, ["x", "y"])
+    self.be.deliver()
+    self.assertTrue(lp.all_valid)
+
+    self.assertEqual(lp.hit_count, 0)
+    self.debugger.logpoint_log.append(lp.id, "x=1 y=2")
+    self.assertEqual(lp.hit_count, 1)
+
+  def test_conditions_inserted_with_breakpoint(self):
+    bps = [Breakpoint(Location(id="main")),
+           Breakpoint(Location(id="foo"), condition="i == 5000"),
+           Breakpoint(Location(id="bar"), ignore_count=3, hit_threshold=10)]
+    self.debugger.begin_add_breakpoints(bps)
+    locations, dprintfs, conditions = self.be.calls("begin_new_breakpoints")[0]
+    self.assertEqual(conditions[0], None)
+    self.assertEqual(conditions[1].expression, "i == 5000")
+    self.assertEqual(conditions[1].ignore_count, 0)
+    self.assertEqual(conditions[2].expression, None)
+    self.assertEqual(conditions[2].ignore_count, 9)
+    self.be.deliver()
+    self.assertEqual(self._condition_cmds(), [])
+
+  def test_condition_changes_pushed(self):
+    b = Breakpoint(Location(id="main"))
+    self.debugger.begin_add_breakpoints([b])
+    self.be.deliver()
+    b.condition = "x > 2"
+    b.ignore_count = 4
+    self.be.hit_counts[1] = 7
+    b.hit_threshold = 20 # 12 more hits to skip, more than the ignore count
+    b.condition = ""
+    self.assertEqual(self._condition_cmds(), [("set_breakpoint_condition", 1, "x > 2"),
+                                              ("set_breakpoint_ignore_count", 1, 4),
+                                              ("set_breakpoint_ignore_count", 1, 12),
+                                              ("set_breakpoint_condition", 1, None)])
+    self.assertEqual(b.hit_count, 7)
+
+    b.condition = "bad" # the backend rejects it, so the breakpoint can't be left in
+    self.assertFalse(b.all_valid)
+    self.assertEqual(b.error, "No symbol")
+    self.assertEqual(self.be.calls("delete_breakpoint"), [(1,)])
+
+  def _condition_cmds(self):
+    return [r for r in self.be.requests if r[0] in ("set_breakpoint_condition", "set_breakpoint_ignore_count")]
+
+  def test_repr_round_trip(self):
+    env = {"Location" : Location, "Breakpoint" : Breakpoint, "Logpoint" : Logpoint}
+    for b in [Breakpoint(Location(id="main")),
+              Breakpoint(Location(filename="foo.c", line_num=3), condition="p != 0", hit_threshold=100),
+              Logpoint(Location(id="main"), "%d", ["i"], ignore_count=2)]:
+      self.assertEqual(repr(eval(repr(b), env)), repr(b))
+
+  def _symbol_changes(self, loaded=[], unloaded=[]):
+    return DynObject({"all" : False, "loaded" : loaded, "unloaded" : unloaded, "num_events" : len(loaded) + len(unloaded)})
+
+  def test_library_load_retries_only_unresolved(self):
+    good = Breakpoint(Location(id="main"))
+    bad = Breakpoint(Location(id="bad"))
+    self.debugger.begin_add_breakpoints([good, bad])
+    self.be.deliver()
+    self.be.locations = {1 : [Location(prog_ctr=0x10)]}
+
+    libs = [DynObject({"name" : "lib%i.so" % i, "ranges" : None}) for i in range(400)]
+    self.debugger._on_backend_symbols_changed(self.be, self._symbol_changes(loaded=libs))
+    self.assertEqual(len(self.be.pending), 1)
+    self.assertEqual(self.be.pending[0][0], [bad.location])
+    self.assertEqual(len(self.be.calls("begin_list_breakpoint_locations")), 1)
+    self.assertEqual(self.be.calls("delete_breakpoint"), []) # nothing was torn down
+    stats = self.debugger.breakpoint_rebind_stats.last
+    self.assertEqual(stats.symbol_events, 400)
+    self.assertEqual(stats.inserted, 1)
+    self.assertEqual(stats.refreshed, 1)
+    self.assertEqual(good.actual_location_list, [Location(prog_ctr=0x10)])
+
+  def test_library_unload_outside_breakpoints(self):
+    b = Breakpoint(Location(id="main"))
+    self.debugger.begin_add_breakpoints([b])
+    self.be.deliver()
+    b._backend_breakpoints[self.be].location_list = [Location(prog_ctr=0x1000)]
+    lib = DynObject({"name" : "libfoo.so", "ranges" : [(0x5000, 0x6000)]})
+    self.debugger._on_backend_symbols_changed(self.be, self._symbol_changes(unloaded=[lib]))
+    self.assertEqual(len(self.be.calls("begin_list_breakpoint_locations")), 0)
+    self.assertEqual(self.debugger.breakpoint_rebind_stats.last.untouched, 1)
+    lib.ranges = [(0x0, 0x2000)]
+    self.be.locations = {1 : []}
+    self.debugger._on_backend_symbols_changed(self.be, self._symbol_changes(unloaded=[lib]))
+    self.assertEqual(len(self.be.calls("begin_list_breakpoint_locations")), 1)
+    self.assertEqual(b.actual_location_list, [])
+    self.assertEqual(self.debugger.breakpoint_rebind_stats.total.refreshed, 1)
@@ -13,8 +13,10 @@
 # limitations under the License.
 from debugger import *
 from tests import *
+from tests.debugger import *
 import unittest
 import time
+import os
 
 class DebuggerTests(unittest.TestCase):
   def setUp(self):
@@ -41,6 +43,44 @@ class DebuggerTests(unittest.TestCase):
     debugger.wait_for_status_break()
     self.assertEqual(debugger.status,STATUS_BREAK)
 
+  def test_launch_from_backend_pool(self):
+    self.debugger.shutdown()
+    self.debugger = Debugger(backend_pool_size=2)
+    MessageLoop.run_while(lambda: MessageLoop.get_pending_message_count() != 0) # let the pool refill
+    proc = self.debugger.begin_launch_suspended("tests/apps/test1").wait()
+    self.assertEqual(self.debugger.backend_pool.stats.hits, 1)
+    self.assertEqual(self.debugger.status,STATUS_BREAK)
+    proc.kill()
+
+  def test_unique_stacks(self):
+    debugger = self.debugger
+    proc = debugger.begin_launch_suspended("tests/apps/test1").wait()
+    groups = debugger.get_unique_stacks()
+    self.assertEqual(sum([g.count for g in groups]), len(debugger.threads))
+    self.assertTrue(len(groups[0].frames) != 0)
+    proc.kill()
+
+  def test_non_stop(self):
+    debugger = self.debugger
+    debugger.non_stop = True
+    proc = debugger.begin_launch_suspended("tests/apps/test_threads").wait()
+    main = proc.threads[0]
+    b = Breakpoint(Location(text="mythread"))
+    debugger.breakpoints.append(b)
+    hits = []
+    b.on_hit.add_listener(lambda: hits.append(debugger.active_thread))
+    main.begin_resume().wait()
+    MessageLoop.run_until(lambda: len(hits) == 1)
+    slave = hits[0]
+    self.assertNotEqual(slave, main)
+    self.assertEqual(slave.status, STATUS_BREAK)
+    self.assertEqual(main.status, STATUS_RUNNING) # still running
+    self.assertEqual(debugger.status, STATUS_BREAK)
+    self.assertTrue(len(slave.call_stack) != 0)
+    main.begin_interrupt().wait()
+    self.assertEqual(main.status, STATUS_BREAK)
+    proc.kill()
+
   def test_debugger_launch_and_interrupt(self):
     debugger = self.debugger
     proc = debugger.begin_launch_suspended("tests/apps/test1").wait()
@@ -158,6 +198,50 @@ class DebuggerTests(unittest.TestCase):
     self.assertEqual(trace1, expected_trace)
     self.assertEqual(trace2, expected_trace)
 
+  def test_evaluate_expressions(self):
+    debugger = self.debugger
+    proc = debugger.begin_launch_suspended("tests/apps/test1").wait()
+    res = debugger.begin_evaluate_expressions(["argc", "1 + 2", "no_such_variable", "argc * 2"]).wait()
+    self.assertEqual([r.valid for r in res], [True, True, False, True])
+    self.assertEqual(res[0].value, "1")
+    self.assertEqual(res[1].value, "3")
+    self.assertTrue(res[2].error != "")
+    self.assertEqual(res[3].value, "2")
+    self.assertEqual(debugger.begin_evaluate_expressions([]).wait(), [])
+    proc.kill()
+
+  def test_open_core(self):
+    debugger = self.debugger
+    proc = debugger.begin_launch_suspended("tests/apps/test_threads").wait()
+    core_file = "/tmp/ndbg_test_open_core.%i" % os.getpid()
+    resp = proc._backend._run_cmd("interpreter-exec console \"gcore %s\"" % core_file)
+    resp.expect_done()
+    proc.kill()
+    try:
+      core = debugger.begin_open_core("tests/apps/test_threads", core_file).wait()
+      self.assertEqual(core.core_file, os.path.abspath(core_file))
+      self.assertTrue(len(core.threads) != 0)
+      self.assertEqual(debugger.status, STATUS_BREAK)
+      self.assertEqual(debugger.active_thread.call_stack[0].location.identifier, "main")
+      self.assertRaises(DebuggerException, lambda: debugger.active_thread.begin_resume())
+      core.kill()
+      self.assertEqual(len(debugger.processes), 0)
+    finally:
+      os.unlink(core_file)
+
+  def test_explore_calls(self):
+    debugger = self.debugger
+    proc = debugger.begin_launch_suspended("tests/apps/test2").wait()
+    self.run_until_hit(Location(text="d"))
+    changes = []
+    debugger.status_changed.add_listener(lambda: changes.append(debugger.status))
+    calls = []
+    debugger.active_thread.begin_explore_calls(2, calls.extend).wait()
+    self.assertEqual(set(calls), set([("d", "a"), ("d", "c")])) # target and c's call to a are too deep
+    self.assertEqual(changes, [STATUS_RUNNING, STATUS_BREAK])
+    self.assertEqual(debugger.active_thread.call_stack[0].location.identifier, "main")
+    proc.kill()
+
   def test_breakpoint_hit_sets_active_thread_correctly(self):
     debugger = self.debugger
     proc1 = debugger.begin_launch_suspended("tests/apps/test2").wait()
@@ -220,3 +304,39 @@ class DebuggerTests(unittest.TestCase):
     for expr in should_raise:
       self.assertRaises(Exception, lambda val: debugger.begin_interpreter_exec(expr,lambda: None, squash_exceptions=False))
 
+
+class NonStopDebuggerTests(FakeBackendTestCase):
+  non_stop = True
+
+  def setUp(self):
+    FakeBackendTestCase.setUp(self)
+    self.threads = [self.be.add_thread(i) for i in range(1, 4)]
+
+  def test_stop_leaves_other_threads_running(self):
+    debugger = self.debugger
+    self.assertEqual(debugger.status, STATUS_RUNNING)
+    self.be.stop(self.threads[1])
+    self.assertEqual(debugger.active_thread, self.threads[1])
+    self.assertEqual(debugger.status, STATUS_BREAK)
+    self.assertEqual([t.status for t in self.threads], [STATUS_RUNNING, STATUS_BREAK, STATUS_RUNNING])
+    self.assertEqual(self.be.requests, []) # nothing else was interrupted
+
+    # a second stop doesn't steal the active thread from a stopped one
+    self.be.stop(self.threads[2])
+    self.assertEqual(debugger.active_thread, self.threads[1])
+
+    # resuming and stepping only touch the thread concerned
+    self.threads[1].begin_resume()
+    self.assertEqual(debugger.status, STATUS_RUNNING) # the active thread is running again
+    self.threads[2].begin_step_over()
+    self.threads[0].begin_interrupt()
+    self.assertEqual(self.be.requests, [("begin_resume", 2), ("begin_step_over", 3), ("begin_interrupt_thread", 1)])
+
+  def test_cannot_resume_running_thread(self):
+    self.assertRaises(DebuggerException, lambda: self.threads[0].begin_resume())
+    self.be.stop(self.threads[0])
+    self.assertRaises(DebuggerException, lambda: self.threads[0].begin_interrupt())
+
+  def test_mode_fixed_while_debugging(self):
+    self.debugger._processes.add(DynObject({"frontend_id" : 1}))
+    self.assertRaises(DebuggerException, lambda: setattr(self.debugger, "non_stop", False))
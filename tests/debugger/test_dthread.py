@@ -0,0 +1,104 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from debugger import *
+from debugger.dthread import CALL_STACK_PAGE_SIZE
+from tests.debugger import *
+
+class CallStackTest(unittest.TestCase):
+  def _make_thread(self, depth):
+    be = FakeBackend(depth = depth)
+    thr = DThread(be, 1, None)
+    thr._set_status(STATUS_BREAK)
+    be.threads.append(thr)
+    return be, thr
+
+  def test_top_frame_fetches_one_page(self):
+    be, thr = self._make_thread(10000)
+    self.assertEqual(thr.call_stack[0], 0)
+    self.assertEqual(thr.top_frame, 0)
+    self.assertEqual(thr.active_frame, 0)
+    self.assertEqual(be.requests, [("get_frames", 0, CALL_STACK_PAGE_SIZE - 1)])
+    self.assertEqual(thr.call_stack.fetched_frame_count, CALL_STACK_PAGE_SIZE)
+
+  def test_top_frame_snapshot(self):
+    be, thr = self._make_thread(10000)
+    others = [DThread(be, i, None) for i in range(2, 500)]
+    for t in others:
+      t._set_status(STATUS_BREAK)
+    be.threads.extend(others)
+    self.assertEqual(thr.top_frame, "top1")
+    for t in others:
+      self.assertEqual(t.top_frame, "top%i" % t.backend_id)
+      self.assertEqual(t.active_frame, "top%i" % t.backend_id)
+      self.assertEqual(t.call_stack.fetched_frames, ["top%i" % t.backend_id])
+    self.assertEqual(be.requests, [("get_top_frames",)])
+
+    # deeper frames page in as usual, replacing the snapshot
+    self.assertEqual(thr.call_stack[1], 1)
+    self.assertEqual(thr.top_frame, 0)
+
+    # the next stop takes a fresh snapshot
+    thr._set_status(STATUS_RUNNING)
+    thr._set_status(STATUS_BREAK)
+    self.assertEqual(thr.top_frame, "top1")
+    self.assertEqual(be.requests, [("get_top_frames",), ("get_frames", 0, CALL_STACK_PAGE_SIZE - 1), ("get_top_frames",)])
+
+  def test_len_uses_depth(self):
+    be, thr = self._make_thread(10000)
+    self.assertEqual(len(thr.call_stack), 10000)
+    self.assertEqual(be.requests, [("get_call_stack_depth",)])
+
+  def test_short_page_gives_depth(self):
+    be, thr = self._make_thread(5)
+    self.assertEqual(thr.call_stack[0], 0)
+    self.assertEqual(len(thr.call_stack), 5)
+    self.assertEqual(list(thr.call_stack), range(5))
+    self.assertEqual(be.requests, [("get_frames", 0, CALL_STACK_PAGE_SIZE - 1)])
+
+  def test_index_and_slice(self):
+    be, thr = self._make_thread(1000)
+    cs = thr.call_stack
+    self.assertEqual(cs[-1], 999)
+    self.assertEqual(cs[3 * CALL_STACK_PAGE_SIZE + 1], 3 * CALL_STACK_PAGE_SIZE + 1)
+    self.assertEqual(cs[10:20], range(10, 20))
+    self.assertEqual(cs[995:], range(995, 1000))
+    self.assertRaises(IndexError, lambda: cs[1000])
+    # slice spanning several missing pages is one request
+    del be.requests[:]
+    self.assertEqual(cs[CALL_STACK_PAGE_SIZE:3 * CALL_STACK_PAGE_SIZE], range(CALL_STACK_PAGE_SIZE, 3 * CALL_STACK_PAGE_SIZE))
+    self.assertEqual(be.requests, [("get_frames", CALL_STACK_PAGE_SIZE, 3 * CALL_STACK_PAGE_SIZE - 1)])
+    # negative steps
+    self.assertEqual(cs[20:10:-3], range(20, 10, -3))
+    self.assertEqual(cs[10:20:-1], [])
+    self.assertEqual(cs[::-1], range(999, -1, -1))
+
+  def test_fetch_more(self):
+    be, thr = self._make_thread(100)
+    cs = thr.call_stack
+    cs.fetch_more()
+    self.assertEqual(cs.fetched_frame_count, CALL_STACK_PAGE_SIZE)
+    cs.fetch_more()
+    self.assertEqual(cs.fetched_frame_count, 100)
+    self.assertEqual(cs.fetched_frames, range(100))
+
+  def test_stale_after_resume(self):
+    be, thr = self._make_thread(1000)
+    cs = thr.call_stack
+    self.assertEqual(cs[0], 0)
+    thr._set_status(STATUS_RUNNING)
+    self.assertEqual(cs[1], 1) # already fetched
+    self.assertRaises(DebuggerException, lambda: cs[500])
+    thr._set_status(STATUS_BREAK)
+    self.assertTrue(thr.call_stack is not cs)
@@ -39,6 +39,19 @@ class GdbTestBasics(unittest.TestCase):
     proc.kill()
     gdb.shutdown()
 
+  def test_lazy_solib_symbols(self):
+    gdb = GdbBackend()
+    gdb.lazy_solib_symbols = True
+    proc = gdb.begin_launch_suspended("tests/apps/test1").wait()
+    libc = [l for l in gdb.libraries if "libc" in l.name]
+    self.assertTrue(len(libc) != 0)
+    self.assertFalse(libc[0].symbols_loaded)
+    self.assertEqual(gdb.load_library_symbols([libc[0].name]), 1)
+    self.assertTrue(libc[0].symbols_loaded)
+    self.assertEqual(gdb.load_library_symbols([libc[0].name]), 0) # already loaded
+    proc.kill()
+    gdb.shutdown()
+
   def test_launch_suspended_with_no_executable(self):
     gdb = GdbBackend()
     wait = gdb.begin_launch_suspended("tests/apps/this_doesn_t_exist")
@@ -106,12 +119,136 @@ class GdbTestBasics(unittest.TestCase):
     self.assertTrue(proc.poll() != None)
     gdb.shutdown(force=True)
 
+  def test_run_cmds_pipelined(self):
+    gdb = GdbBackend()
+    resps = gdb._run_cmds(["gdb-version", "interpreter-exec console \"show width\""])
+    self.assertEqual(len(resps), 2)
+    self.assertEqual(resps[0].code, "done")
+    self.assertEqual(resps[1].code, "done")
+    self.assertTrue(len(resps[0].gdblines) != 0)
+
+    waitables = gdb._run_cmds_async_with_waitables(["gdb-version", "this-is-not-a-command"])
+    self.assertEqual(waitables[0].wait().code, "done")
+    self.assertEqual(waitables[1].wait().code, "error")
+    gdb.shutdown()
+
   def test_attach_nonexistent(self):
     gdb = GdbBackend()
     self.assertRaises(debugger.DebuggerException,lambda: gdb.begin_attach_to_pid(999999,False).wait())
     gdb.shutdown(force=True)
 
 
+class GdbWatcherTest(unittest.TestCase):
+  def test_batches_records_between_prompts(self):
+    # drive the watcher from a pipe rather than a real gdb
+    gdb = GdbBackend.__new__(GdbBackend)
+    gdb._id = 0
+    gdb._run = True
+    seen = []
+    gdb._on_exec_message = lambda l: seen.append(("exec", l))
+    gdb._on_notify_message = lambda l: seen.append(("notify", l))
+    gdb._on_cmd_complete = lambda id, code, resp, gdblines: seen.append(("cmd", id, code, resp, list(gdblines)))
+    gdb._watcher_stats = DynObject({"records" : 0, "bytes" : 0, "batches" : 0, "busy_time" : 0.0, "max_queue_depth" : 0})
+
+    r, w = os.pipe()
+    lines = ['=library-loaded,id="/lib/libfoo%i.so"' % i for i in range(1000)]
+    lines += ['7^done,value="1"', '~"hello\\n"', '*stopped,reason="end-stepping-range"', '(gdb) ']
+    os.write(w, "\n".join(lines) + "\n")
+    os.close(w)
+    gdb._watcher(os.fdopen(r))
+
+    MessageLoop.run_while(lambda: len(seen) != 1002)
+    self.assertEqual(seen[0], ("notify", lines[0]))
+    self.assertEqual(seen[1000], ("exec", '*stopped,reason="end-stepping-range"'))
+    self.assertEqual(seen[1001], ("cmd", 7, "done", 'value="1"', ["hello"]))
+    stats = gdb.watcher_stats
+    self.assertEqual(stats.records, 1004)
+    self.assertTrue(stats.batches < 10)
+
+  def test_splits_console_records_with_several_lines(self):
+    gdb = GdbBackend.__new__(GdbBackend)
+    gdb._id = 0
+    gdb._run = True
+    seen = []
+    gdb._on_explore_calls_found = lambda calls: seen.append(("calls", list(calls)))
+    gdb._on_cmd_complete = lambda id, code, resp, gdblines: seen.append(("cmd", id, code, resp, list(gdblines)))
+    gdb._watcher_stats = DynObject({"records" : 0, "bytes" : 0, "batches" : 0, "busy_time" : 0.0, "max_queue_depth" : 0})
+
+    r, w = os.pipe()
+    lines = ['~"ndbg-call:main\\tfoo\\nndbg-call:foo\\tbar\\n"', # a batch of edges in one write
+             '~"ndbg-call:bar\\tbaz\\n"',
+             '~"hello\\n"',
+             '3^done',
+             '(gdb) ']
+    os.write(w, "\n".join(lines) + "\n")
+    os.close(w)
+    gdb._watcher(os.fdopen(r))
+
+    MessageLoop.run_while(lambda: len(seen) != 2)
+    self.assertEqual(seen[0], ("calls", [("main", "foo"), ("foo", "bar"), ("bar", "baz")]))
+    self.assertEqual(seen[1], ("cmd", 3, "done", "", ["hello"]))
+
+class GdbInterruptTest(unittest.TestCase):
+  def test_only_live_processes_are_signalled(self):
+    gdb = GdbBackend.__new__(GdbBackend)
+    gdb._id = 0
+    gdb._non_stop = False
+    gdb._stop_pending = False
+    gdb._status = GDB_STATUS_BREAK
+    core = DynObject({"backend_info" : DynObject({"pid" : 1001}), "core_file" : "/tmp/core.1001"})
+    live = DynObject({"backend_info" : DynObject({"pid" : 1002}), "core_file" : None})
+    killed = []
+    real_kill = os.kill
+    os.kill = lambda pid, sig: killed.append(pid)
+    try:
+      gdb._processes = [core]
+      gdb.begin_interrupt().wait()
+      self.assertEqual(killed, [])
+      self.assertFalse(gdb._stop_pending)
+
+      gdb._processes = [core, live]
+      gdb.begin_interrupt().wait()
+      self.assertEqual(killed, [1002])
+      self.assertTrue(gdb._stop_pending)
+    finally:
+      os.kill = real_kill
+
+class GdbLibraryTest(unittest.TestCase):
+  def test_symbols_loaded_comes_from_info_sharedlibrary(self):
+    gdb = GdbBackend.__new__(GdbBackend)
+    gdb._lazy_solib_symbols = True
+    gdb._libraries = {}
+    gdb._on_symbols_changed = lambda loaded: None
+    for name in ["/lib/liba.so", "/lib/libb.so"]:
+      gdb._get_library(GdbMiResponse("library-loaded", 'id="%s",symbols-loaded="1"' % name), True)
+    self.assertEqual([l.symbols_loaded for l in gdb.libraries], [False, False])
+
+    cmds = []
+    def run_cmds(c):
+      cmds.extend(c)
+      resps = [GdbMiResponse("done", "") for x in c]
+      resps[-1].gdblines = ["0x1000  0x2000  Yes (*)     /lib/liba.so",
+                            "0x3000  0x4000  No          /lib/libb.so"]
+      return resps
+    gdb._run_cmds = run_cmds
+    self.assertEqual(gdb.load_library_symbols(["/lib/liba.so", "/lib/libb.so"]), 1)
+    self.assertEqual(cmds[-1], 'interpreter-exec console "info sharedlibrary"')
+    self.assertTrue(gdb._libraries["/lib/liba.so"].symbols_loaded)
+    self.assertFalse(gdb._libraries["/lib/libb.so"].symbols_loaded)
+
+class GdbExprValueTest(unittest.TestCase):
+  def test_values_are_gdbs_text(self):
+    gdb = GdbBackend.__new__(GdbBackend)
+    resps = []
+    gdb._pendingCommands = dict([(i, resps.append) for i in range(4)])
+    gdb._on_cmd_complete(0, "done", 'value="3"', [])
+    gdb._on_cmd_complete(1, "done", 'value="0x0"', [])
+    gdb._on_cmd_complete(2, "done", 'value="{a = 1, b = 2}"', [])
+    gdb._on_cmd_complete(3, "error", 'msg="No symbol \\"x\\" in current context."', [])
+    values = [gdb._conv_expr_value(r) for r in resps]
+    self.assertEqual([v.valid for v in values], [True, True, True, False])
+    self.assertEqual([v.value for v in values[:3]], ["3", "0x0", "{a = 1, b = 2}"])
+
 class GdbTestSingleApp(unittest.TestCase):
   def setUp(self, launch_str):
     gdb = GdbBackend()
@@ -143,6 +280,40 @@ class GdbTest1(GdbTestSingleApp):
     # sanity check the call stack?
     # we want to verify the various frame parsers... so stop it in a few different ways...
 
+  def test_paged_frames(self):
+    thr = self.gdb.threads.first
+    depth = self.gdb.get_call_stack_depth(thr)
+    cs = self.gdb.get_call_stack(thr)
+    self.assertEqual(depth, len(cs))
+    frames = self.gdb.get_frames(thr, 0, depth + 10)
+    self.assertEqual(len(frames), depth)
+    self.assertEqual(str(frames[0]), str(self.gdb.get_frame(thr, 0)))
+    self.assertEqual(self.gdb.get_frames(thr, depth + 10, depth + 20), [])
+
+  def test_top_frames(self):
+    thr = self.gdb.threads.first
+    frames = self.gdb.get_top_frames()
+    self.assertTrue(frames.has_key(thr.backend_id))
+    self.assertEqual(str(frames[thr.backend_id]), str(self.gdb.get_frame(thr, 0)))
+
+  def test_all_thread_stacks(self):
+    thr = self.gdb.threads.first
+    stacks = self.gdb.get_all_thread_stacks(256)
+    self.assertEqual(len(stacks), len(self.gdb.threads))
+    self.assertEqual(len(stacks[thr.backend_id]), len(self.gdb.get_call_stack(thr)))
+
+  def test_varobjs(self):
+    thr = self.gdb.threads.first
+    v = self.gdb.create_varobj(thr, 0, "argc")
+    self.assertEqual(v.type, "int")
+    self.assertEqual(v.num_children, 0)
+    self.assertEqual(self.gdb.update_varobjs(thr, 0), [])
+    a = self.gdb.create_varobj(thr, 0, "argv")
+    self.assertEqual(len(self.gdb.list_varobj_children(a.name, 0, 1)), 1)
+    self.gdb.delete_varobj(a.name)
+    self.gdb.delete_varobj(v.name)
+    self.assertRaises(DebuggerException, lambda: self.gdb.create_varobj(thr, 0, "no_such_variable"))
+
   def test_step(self):
     thr = self.gdb.threads.first
     self.gdb.begin_step_over(thr).wait()
@@ -0,0 +1,62 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from util import *
+from debugger.gdb_backend_pool import GdbBackendPool
+from tests.debugger import *
+
+class GdbBackendPoolTest(unittest.TestCase):
+  def test_take_and_refill(self):
+    made = []
+    def factory():
+      made.append(FakeBackend())
+      return made[-1]
+    pool = GdbBackendPool(2, factory)
+    MessageLoop.run_until(lambda: pool.stats.available == 2)
+    b = pool.take()
+    self.assertTrue(b is made[0])
+    self.assertEqual(pool.stats.hits, 1)
+    self.assertEqual(pool.stats.available, 1)
+    MessageLoop.run_until(lambda: pool.stats.available == 2)
+    self.assertEqual(pool.stats.created, 3)
+    pool.shutdown()
+    self.assertTrue(made[1].is_shutdown and made[2].is_shutdown)
+    self.assertFalse(made[0].is_shutdown) # taken backends belong to the caller
+
+  def test_take_waits_for_initializing_backend(self):
+    slow = FakeBackend(ready = False)
+    pool = GdbBackendPool(1, lambda: slow)
+    MessageLoop.run_until(lambda: pool.stats.available == 1)
+    MessageLoop.add_delayed_message(lambda: slow.init_waitable.set_done(slow), 20)
+    self.assertTrue(pool.take() is slow)
+    pool.shutdown()
+
+  def test_resize(self):
+    pool = GdbBackendPool(3, FakeBackend)
+    MessageLoop.run_until(lambda: pool.stats.available == 3)
+    pool.size = 1
+    self.assertEqual(pool.stats.available, 1)
+    pool.shutdown()
+
+  def test_factory_failure_stops_refill(self):
+    calls = []
+    def factory():
+      calls.append(True)
+      raise Exception("gdb not found")
+    pool = GdbBackendPool(2, factory)
+    MessageLoop.run_until(lambda: len(calls) != 0)
+    pool.size = 3
+    MessageLoop.add_message(lambda: None)
+    MessageLoop.run_while(lambda: MessageLoop.get_pending_message_count() != 0)
+    self.assertEqual(len(calls), 1)
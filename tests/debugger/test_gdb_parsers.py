@@ -14,8 +14,20 @@
 from tests import *
 import unittest
 from debugger.gdb_parsers import *
+import re
 
 class ParseTest(unittest.TestCase):
+  def test_parse_info_sharedlibrary(self):
+    clines = ["From                To                  Syms Read   Shared Object Library",
+              "0x00007ffff7fc5090  0x00007ffff7fee315  Yes         /lib64/ld-linux-x86-64.so.2",
+              "0x00007ffff7dab630  0x00007ffff7f3e27d  Yes (*)     /lib/x86_64-linux-gnu/libc.so.6",
+              "                                        No          /usr/lib/libfoo bar.so",
+              "(*): Shared library is missing debugging information."]
+    self.assertEqual(parse_info_sharedlibrary(clines),
+                     {"/lib64/ld-linux-x86-64.so.2" : True,
+                      "/lib/x86_64-linux-gnu/libc.so.6" : True,
+                      "/usr/lib/libfoo bar.so" : False})
+
   def test_parse_response(self):
     t = []
     t.append('thread-id="1"')
@@ -39,6 +51,36 @@ class ParseTest(unittest.TestCase):
       r = GdbMiResponse('done',c)
 #      print "In:\n%s\nOut:\n%s\n\n" % (c,r)
 
+  def test_parse_response_values(self):
+    r = GdbMiResponse('done','a="1",b="0x10",c="hello \\"world\\"",d-e={x="1",y=[{z="2"},{z="3"}]},f=[x="a",x="b"],g=["1","2"],h=""')
+    self.assertEqual(r.code, 'done')
+    self.assertEqual(r.a, 1)
+    self.assertEqual(r.b, 16)
+    self.assertEqual(r.c, 'hello "world"')
+    self.assertEqual(r.d_e.x, 1)
+    self.assertEqual([i.z for i in r.d_e.y], [2,3])
+    self.assertEqual(r.f, ['a','b'])
+    self.assertEqual(r.g, [1,2])
+    self.assertEqual(r.h, '')
+
+  def test_parse_recorded_payloads(self):
+    def load(name):
+      l = open("tests/resources/%s" % name).readline().rstrip("\n")
+      m = re.match("^(\d+)\^(.[a-z]+),?(.*)$",l)
+      return GdbMiResponse(m.group(2),m.group(3))
+    r = load("gdb_mi_stack_list_frames")
+    self.assertEqual(len(r.stack), 1000)
+    self.assertEqual([f.level for f in r.stack], range(1000))
+    self.assertEqual(r.stack[5].func, "??")
+    r = load("gdb_mi_thread_info")
+    self.assertEqual(len(r.threads), 500)
+    self.assertEqual(r.threads[0].frame.level, 0)
+    self.assertEqual(r.current_thread_id, 1)
+    r = load("gdb_mi_var_list_children")
+    self.assertEqual(r.numchild, 1000)
+    self.assertEqual(len(r.children), 1000)
+    self.assertEqual(r.children[0].type, "std::pair<int, std::string>")
+
   def test_breakpoint_parser(self):
     hresp = GdbMiResponse("done", 'BreakpointTable={nr_rows="1",nr_cols="6",hdr=[{width="7",alignment="-1",col_name="number",colhdr="Num"},{width="14",alignment="-1",col_name="type",colhdr="Type"},{width="4",alignment="-1",col_name="disp",colhdr="Disp"},{width="3",alignment="-1",col_name="enabled",colhdr="Enb"},{width="18",alignment="-1",col_name="addr",colhdr="Address"},{width="40",alignment="2",col_name="what",colhdr="What"}],body=[bkpt={number="2",type="breakpoint",disp="keep",enabled="y",addr="<MULTIPLE>",times="0",original-location="WebKit::WebViewImpl::composite"}]}')
 #                     1         2         3         4         5
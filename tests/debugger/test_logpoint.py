@@ -0,0 +1,58 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from util import *
+from debugger import *
+
+class LogpointLogTest(unittest.TestCase):
+  def test_bounded(self):
+    log = LogpointLog(3)
+    for i in range(5):
+      log.append(1, "line %i" % i)
+    self.assertEqual(log.num_appended, 5)
+    n, entries = log.get_entries()
+    self.assertEqual(n, 5)
+    self.assertEqual([e[2] for e in entries], ["line 2", "line 3", "line 4"])
+
+  def test_get_entries_since(self):
+    log = LogpointLog(10)
+    log.append(1, "a")
+    n, entries = log.get_entries()
+    self.assertEqual(n, 1)
+    log.append(2, "b")
+    log.append(1, "c")
+    n, entries = log.get_entries(n)
+    self.assertEqual(n, 3)
+    self.assertEqual([(e[1], e[2]) for e in entries], [(2, "b"), (1, "c")])
+    self.assertEqual(log.get_entries(n), (3, []))
+
+  def test_hit_counts(self):
+    log = LogpointLog(2)
+    for i in range(4):
+      log.append(7, "hit")
+    log.append(8, "hit")
+    self.assertEqual(log.get_hit_count(7), 4) # counts outlive the buffer
+    self.assertEqual(log.get_hit_count(8), 1)
+    self.assertEqual(log.get_hit_count(9), 0)
+    log.clear()
+    self.assertEqual(log.get_hit_count(7), 0)
+    self.assertEqual(log.get_entries(log.num_appended), (5, []))
+
+class LogpointTest(unittest.TestCase):
+  def test_repr_round_trip(self):
+    lp = Logpoint(Location(filename="foo.c", line_num=10), "%d %s\n", ["i", "s->name"])
+    lp2 = eval(repr(lp), {"Location" : Location, "Logpoint" : Logpoint})
+    self.assertEqual(repr(lp2), repr(lp))
+    self.assertEqual(lp2.format, "%d %s\n")
+    self.assertEqual(lp2.args, ["i", "s->name"])
@@ -0,0 +1,76 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from debugger import *
+from tests import *
+from tests.debugger import *
+import unittest
+
+def _frame(name):
+  return DynObject({"location" : Location(id=name), "library" : None})
+
+class CallTreeTest(unittest.TestCase):
+  def test_add_stack(self):
+    root = CallTreeNode("<all>")
+    root._add_stack(["main", "a", "b"])
+    root._add_stack(["main", "a"])
+    root._add_stack(["main", "c"])
+    self.assertEqual(root.count, 3)
+    main = root.children[0]
+    self.assertEqual(main.name, "main")
+    self.assertEqual(main.count, 3)
+    self.assertEqual(main.self_count, 0)
+    a,c = main.children
+    self.assertEqual((a.name, a.count, a.self_count), ("a", 2, 1))
+    self.assertEqual((c.name, c.count, c.self_count), ("c", 1, 1))
+    self.assertEqual(a.children[0].path, ["main", "a", "b"])
+
+  def test_collapsed_stacks(self):
+    p = Profiler(DynObject())
+    p._on_sample(0, [(None, [_frame("b"), _frame("a"), _frame("main")]),
+                     (None, [_frame("a"), _frame("main")])])
+    p._on_sample(0, [(None, [_frame("b"), _frame("a"), _frame("main")])])
+    self.assertEqual(p.stats.num_samples, 2)
+    self.assertEqual(p.stats.num_stacks, 3)
+    self.assertEqual(p.get_collapsed_stacks(), "main;a 1\nmain;a;b 2\n")
+    p.reset()
+    self.assertEqual(p.get_collapsed_stacks(), "")
+
+class SampleStacksTest(FakeBackendTestCase):
+  def setUp(self):
+    FakeBackendTestCase.setUp(self)
+    self.thr = self.be.add_thread(1, [_frame("a"), _frame("main")])
+
+  def test_sample_resumes_silently(self):
+    debugger = self.debugger
+    changes = []
+    debugger.status_changed.add_listener(lambda: changes.append(debugger.status))
+    w = debugger.begin_sample_stacks(16)
+    self.assertRaises(DebuggerException, lambda: debugger.begin_sample_stacks(16))
+    MessageLoop.run_until(lambda: w.is_done)
+    self.assertEqual(self.be.request_names, ["begin_interrupt", "get_all_thread_stacks", "begin_resume_nonspecific"])
+    self.assertEqual(w.wait(), [(self.thr, self.be.stacks[1])])
+    self.assertEqual(debugger.status, STATUS_RUNNING)
+    self.assertEqual(changes, [])
+
+  def test_breakpoint_hit_while_sampling(self):
+    debugger = self.debugger
+    b = DynObject({"on_hit" : Event()})
+    hits = []
+    b.on_hit.add_listener(lambda: hits.append(True))
+    w = debugger.begin_sample_stacks(16)
+    debugger._on_backend_breakpoint_hit(self.be, b)
+    MessageLoop.run_until(lambda: w.is_done)
+    self.assertEqual(self.be.request_names, ["begin_interrupt", "get_all_thread_stacks"])
+    self.assertEqual(debugger.status, STATUS_BREAK)
+    self.assertEqual(hits, [True])
@@ -0,0 +1,113 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+import os
+import shutil
+import struct
+import tempfile
+import time
+from util import *
+from debugger.symbol_index_cache import *
+
+def write_fake_elf(path, build_id):
+  """Writes a minimal 64-bit little-endian ELF with just a build-id note section."""
+  desc = build_id.decode("hex")
+  note = struct.pack("<III", 4, len(desc), 3) + "GNU\0" + desc
+  shoff = 64 + len(note)
+  hdr = "\x7fELF\x02\x01\x01" + "\0" * 9
+  hdr += struct.pack("<HHIQQQIHHHHHH", 2, 62, 1, 0, 0, shoff, 0, 64, 0, 0, 64, 2, 0)
+  null_sh = "\0" * 64
+  note_sh = struct.pack("<IIQQQQIIQQ", 0, 7, 2, 0, 64, len(note), 0, 0, 4, 0)
+  f = open(path, "wb")
+  f.write(hdr + note + null_sh + note_sh)
+  f.close()
+
+class SymbolIndexCacheTest(unittest.TestCase):
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp()
+    self.dir = os.path.join(self.tmp, "cache")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def add_index(self, build_id, size, age):
+    path = os.path.join(self.dir, build_id + ".gdb-index")
+    open(path, "wb").write("x" * size)
+    t = time.time() - age
+    os.utime(path, (t, t))
+    return path
+
+  def test_read_build_id(self):
+    exe = os.path.join(self.tmp, "a.out")
+    write_fake_elf(exe, "deadbeef0011")
+    self.assertEqual(read_build_id(exe), "deadbeef0011")
+    open(exe, "w").write("#!/bin/sh\n")
+    self.assertEqual(read_build_id(exe), None)
+    self.assertEqual(read_build_id(os.path.join(self.tmp, "nonexistent")), None)
+
+  def test_hit_miss_and_time_saved(self):
+    cache = SymbolIndexCache(self.dir, 1024 * 1024)
+    exe = os.path.join(self.tmp, "a.out")
+    write_fake_elf(exe, "abcd")
+
+    tok = cache.begin_load(exe)
+    self.assertFalse(tok.was_cached)
+    tok.start_time -= 10 # pretend the uncached load took 10s
+    cache.end_load(tok, True)
+    self.assertEqual(cache.stats.misses, 1)
+
+    self.add_index("abcd", 10, 0) # what gdb would have written
+    tok = cache.begin_load(exe)
+    self.assertTrue(tok.was_cached)
+    cache.end_load(tok, True)
+    self.assertEqual(cache.stats.hits, 1)
+    self.assertTrue(cache.stats.time_saved > 9)
+
+    # load times survive a restart
+    cache2 = SymbolIndexCache(self.dir, 1024 * 1024)
+    tok = cache2.begin_load(exe)
+    cache2.end_load(tok, True)
+    self.assertTrue(cache2.stats.time_saved > 9)
+
+  def test_failed_load_not_counted(self):
+    cache = SymbolIndexCache(self.dir, 1024)
+    exe = os.path.join(self.tmp, "a.out")
+    write_fake_elf(exe, "abcd")
+    cache.end_load(cache.begin_load(exe), False)
+    self.assertEqual(cache.stats.misses, 0)
+
+  def test_evicts_least_recently_used(self):
+    os.makedirs(self.dir)
+    old = self.add_index("aa", 600, 300)
+    mid = self.add_index("bb", 600, 200)
+    new = self.add_index("cc", 600, 100)
+    cache = SymbolIndexCache(self.dir, 1500)
+    self.assertFalse(os.path.exists(old))
+    self.assertTrue(os.path.exists(mid) and os.path.exists(new))
+
+    # using an index protects it from eviction
+    exe = os.path.join(self.tmp, "a.out")
+    write_fake_elf(exe, "bb")
+    cache.end_load(cache.begin_load(exe), True)
+    self.add_index("dd", 600, 0)
+    cache.evict()
+    self.assertTrue(os.path.exists(mid))
+    self.assertFalse(os.path.exists(new))
+    self.assertTrue(cache.stats.size <= 1500)
+
+  def test_gdb_init_commands(self):
+    cache = SymbolIndexCache(self.dir, 1024)
+    cmds = cache.get_gdb_init_commands()
+    self.assertTrue(self.dir in cmds[0])
+    self.assertEqual(cmds[1], "interpreter-exec console \"set index-cache on\"")
@@ -0,0 +1,48 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from debugger import *
+
+def make_stack(*funcs):
+  frames = []
+  for i in range(len(funcs)):
+    frames.append(StackFrame(i, Location(id=funcs[i], filename="%s.c" % funcs[i], line_num=10, prog_ctr=0x1000 + i)))
+  return frames
+
+class UniqueStacksTest(unittest.TestCase):
+  def test_grouping(self):
+    thread_stacks = []
+    for i in range(1000):
+      thread_stacks.append(("idle%i" % i, make_stack("futex_wait", "worker_loop", "start_thread")))
+    thread_stacks.append(("main", make_stack("poll", "main")))
+    for i in range(3):
+      thread_stacks.append(("io%i" % i, make_stack("read", "io_loop", "start_thread")))
+    groups = group_unique_stacks(thread_stacks)
+    self.assertEqual([g.count for g in groups], [1000, 3, 1])
+    self.assertEqual(groups[0].threads[0], "idle0")
+    self.assertEqual(groups[2].threads, ["main"])
+    self.assertEqual(groups[1].frames[0].location.identifier, "read")
+
+  def test_pc_ignored_when_function_known(self):
+    a = make_stack("f", "main")
+    b = make_stack("f", "main")
+    b[0].location.prog_ctr = 0x2000
+    self.assertEqual(len(group_unique_stacks([(1, a), (2, b)])), 1)
+
+  def test_pc_only_frames(self):
+    a = [StackFrame(0, Location(prog_ctr=0x10))]
+    b = [StackFrame(0, Location(prog_ctr=0x20))]
+    c = [StackFrame(0, Location(prog_ctr=0x10))]
+    groups = group_unique_stacks([(1, a), (2, b), (3, c)])
+    self.assertEqual([g.threads for g in groups], [[1, 3], [2]])
@@ -0,0 +1,91 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+from debugger import *
+from util import *
+from tests.debugger import *
+
+def change(name, value, in_scope = "true"):
+  return DynObject({"name" : name, "value" : value, "in_scope" : in_scope})
+
+class WatchTest(FakeBackendTestCase):
+  def setUp(self):
+    FakeBackendTestCase.setUp(self)
+    self.debugger._active_thread = DThread(self.be, 1, None)
+
+  def test_create_and_update(self):
+    self.be.values["x"] = (1, 0)
+    w = Watch("x")
+    self.debugger.watches.append(w)
+    self.assertTrue(w.valid)
+    self.assertEqual(w.value, 1)
+    self.assertEqual(self.be.requests, [("create_varobj", "x")])
+
+    fired = []
+    w.changed.add_listener(lambda: fired.append(True))
+    self.be.pending_changes = [change("var1", 2)]
+    self.debugger._update_watches()
+    self.assertEqual(w.value, 2)
+    self.assertEqual(len(fired), 1)
+
+    # nothing changed: one update request, no events
+    self.debugger._update_watches()
+    self.assertEqual(len(fired), 1)
+    self.assertEqual(self.be.requests, [("create_varobj", "x"), ("update_varobjs",), ("update_varobjs",)])
+
+  def test_out_of_scope(self):
+    self.be.values["x"] = (1, 0)
+    w = Watch("x")
+    self.debugger.watches.append(w)
+    self.be.pending_changes = [change("var1", None, "false")]
+    self.debugger._update_watches()
+    self.assertFalse(w.valid)
+    self.assertEqual(w.error, "Not in scope")
+
+  def test_invalid_expression_retried(self):
+    w = Watch("y")
+    self.debugger.watches.append(w)
+    self.assertFalse(w.valid)
+    self.assertTrue("No symbol" in w.error)
+    self.be.values["y"] = (5, 0)
+    self.debugger._update_watches()
+    self.assertTrue(w.valid)
+    self.assertEqual(w.value, 5)
+
+  def test_children_paged(self):
+    self.be.values["arr"] = ("[1000]", 1000)
+    w = Watch("arr")
+    self.debugger.watches.append(w)
+    children = w.get_children(0, 10)
+    self.assertEqual([c.value for c in children], range(0, 100, 10))
+    self.assertEqual(self.be.requests[-1], ("list_varobj_children", "var1", 0, WATCH_CHILDREN_PAGE_SIZE))
+    n = len(self.be.requests)
+    w.get_children(5, 20)
+    self.assertEqual(len(self.be.requests), n) # same page
+    c = w.get_children(999, 1000)[0]
+    self.assertEqual(c.expression, "[999]")
+    self.assertEqual(self.be.requests[-1], ("list_varobj_children", "var1", 900, 1000))
+
+    # changes to children arrive through the same update
+    self.be.pending_changes = [change("var1.999", 42)]
+    self.debugger._update_watches()
+    self.assertEqual(c.value, 42)
+
+  def test_remove(self):
+    self.be.values["x"] = (1, 0)
+    w = Watch("x")
+    self.debugger.watches.append(w)
+    self.debugger.watches.remove(w)
+    self.assertEqual(self.be.requests[-1], ("delete_varobj", "var1"))
+    self.assertEqual(len(self.debugger._watch_varobjs), 0)
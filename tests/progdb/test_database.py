@@ -15,8 +15,12 @@ import time
 import unittest
 
 import progdb
+from progdb.database import _list_dir
 from util import *
 import os
+import re
+import shutil
+import tempfile
 
 class TestDatabase(unittest.TestCase):
   def test_basic(self):
@@ -55,6 +59,19 @@ class TestDatabase(unittest.TestCase):
 
     db.shutdown()
 
+  def test_multiple_crawlers(self):
+    db = progdb.Database(num_crawlers=3)
+    db.add_search_path("./tests/apps")
+    db.add_search_path("./progdb")
+
+    MessageLoop.run_until(lambda: db.get_status() == "Idle." and db.get_num_files() != 0)
+    self.assertTrue(os.path.abspath("./tests/apps/test1.c") in db.find_files_matching("test1.c"))
+    self.assertTrue(os.path.abspath("./progdb/database.py") in db.find_files_matching("database.py"))
+    self.assertTrue(db.get_crawl_rate() > 0)
+    self.assertTrue("files/s" in db.get_stats())
+
+    db.shutdown()
+
   def test_remoted_basic(self):
     db = RemoteClass(progdb.Database)
     db.call_async.add_search_path("./tests")
@@ -71,3 +88,204 @@ class TestDatabase(unittest.TestCase):
     self.assertTrue(goal in matching)
 
     db.shutdown()
+
+  def test_streaming(self):
+    db = progdb.Database()
+    db.add_search_path("./tests")
+    MessageLoop.run_until(lambda: db.get_status() == "Idle." and db.get_num_files() != 0)
+
+    old_chunk_size = progdb.database.DATABASE_STREAM_CHUNK_SIZE
+    progdb.database.DATABASE_STREAM_CHUNK_SIZE = 3
+    try:
+      chunks = list(db.find_files_streaming("t", 0))
+      self.assertTrue(len(chunks) > 2)
+      self.assertTrue(all(len(c) == 3 for c in chunks[:-1]))
+      expected, truncated = db._search_index.find("t", progdb.database.DATABASE_MAX_STREAMED_RESULTS)
+      self.assertEqual(sorted(sum(chunks, [])), sorted(expected + (truncated and ["<TRUNCATED>"] or [])))
+
+      # a later query makes an earlier one stop
+      old = db.find_files_streaming("t", 1)
+      old.next()
+      new = db.find_files_streaming("te", 2)
+      new.next()
+      self.assertRaises(StopIteration, old.next)
+      new.next()
+    finally:
+      progdb.database.DATABASE_STREAM_CHUNK_SIZE = old_chunk_size
+    db.shutdown()
+
+  def test_remoted_streaming(self):
+    db = RemoteClass(progdb.Database)
+    db.call.add_search_path("./tests")
+    MessageLoop.run_until(lambda: db.call.get_status() == "Idle." and db.call.get_num_files() != 0)
+
+    s = db.call_async_stream.find_files_streaming("test1.c", 0)
+    found = []
+    s.part_received.add_listener(lambda files: found.extend(files))
+    s.wait()
+    self.assertTrue(os.path.abspath("./tests/apps/test1.c") in found)
+
+    db.shutdown()
+
+class TestListDir(unittest.TestCase):
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+    for d in ["a", "b", "ignored_dir"]:
+      os.mkdir(os.path.join(self.dir, d))
+    for f in ["x.c", "y.h", "ignored_file"]:
+      open(os.path.join(self.dir, f), "w").close()
+    os.symlink(os.path.join(self.dir, "a"), os.path.join(self.dir, "link"))
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+
+  def test_list_dir(self):
+    subdirs, files = _list_dir(self.dir, re.compile("(?:ignored_dir)|(?:ignored_file)"))
+    j = lambda names: sorted([os.path.join(self.dir, n) for n in names])
+    self.assertEqual(sorted(subdirs), j(["a", "b"]))
+    self.assertEqual(sorted(files), j(["x.c", "y.h"])) # symlinked dirs are neither followed nor files
+
+  def test_list_dir_no_ignores(self):
+    subdirs, files = _list_dir(self.dir, None)
+    self.assertEqual(len(subdirs), 3)
+    self.assertEqual(len(files), 3)
+
+  def test_symlinks(self):
+    os.symlink(os.path.join(self.dir, "x.c"), os.path.join(self.dir, "file_link"))
+    os.symlink(os.path.join(self.dir, "nowhere"), os.path.join(self.dir, "broken_link"))
+    subdirs, files = _list_dir(self.dir, None)
+    self.assertTrue(os.path.join(self.dir, "file_link") in files)
+    self.assertTrue(os.path.join(self.dir, "broken_link") in files)
+    self.assertFalse(os.path.join(self.dir, "link") in files + subdirs)
+
+    # and a symlinked dir doesn't get into the database
+    db = progdb.Database(index_dir=None, use_inotify=False)
+    db.add_search_path(self.dir)
+    MessageLoop.run_until(lambda: db.get_status() == "Idle." and db.get_num_files() != 0)
+    self.assertEqual(db.find_files_matching("link"), [os.path.join(self.dir, "file_link"), os.path.join(self.dir, "broken_link")])
+    db.shutdown()
+
+def _make_test_tree():
+  dir = os.path.realpath(tempfile.mkdtemp())
+  for d in ["a", "a/aa", "b"]:
+    os.mkdir(os.path.join(dir, d))
+  for f in ["x.c", "a/y.c", "a/aa/z.c", "b/w.c"]:
+    open(os.path.join(dir, f), "w").close()
+  return dir
+
+class TestDatabaseIndex(unittest.TestCase):
+  def setUp(self):
+    self.dir = _make_test_tree()
+    self.index_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.dir)
+    shutil.rmtree(self.index_dir)
+
+  def crawl(self):
+    db = progdb.Database(index_dir=self.index_dir)
+    db.add_search_path(self.dir)
+    MessageLoop.run_until(lambda: db.get_status() == "Idle.")
+    return db
+
+  def find(self, db, name):
+    return [os.path.relpath(f, self.dir) for f in db.find_files_matching(name)]
+
+  def test_unchanged_tree_is_not_listed_again(self):
+    self.crawl().shutdown()
+    db = progdb.Database(index_dir=self.index_dir)
+    db.add_search_path(self.dir)
+    self.assertEqual(db.get_num_files(), 4) # before any crawling
+    MessageLoop.run_until(lambda: db.get_status() == "Idle.")
+    self.assertEqual(db.get_num_files(), 4)
+    self.assertTrue("crawled 0 dirs" in db.get_stats())
+    db.shutdown()
+
+  def test_changes_are_picked_up(self):
+    self.crawl().shutdown()
+    os.unlink(os.path.join(self.dir, "a/y.c"))
+    open(os.path.join(self.dir, "a/v.c"), "w").close()
+    shutil.rmtree(os.path.join(self.dir, "b"))
+    os.mkdir(os.path.join(self.dir, "c"))
+    open(os.path.join(self.dir, "c/u.c"), "w").close()
+
+    db = self.crawl()
+    self.assertEqual(sorted(self.find(db, ".")), ["a/aa/z.c", "a/v.c", "c/u.c", "x.c"])
+    self.assertTrue("crawled 3 dirs" in db.get_stats()) # the root, a and c
+    db.shutdown()
+
+  def test_set_index_dir_saves_paths_already_added(self):
+    db = progdb.Database()
+    db.add_search_path(self.dir)
+    MessageLoop.run_until(lambda: db.get_status() == "Idle.")
+    self.assertEqual(os.listdir(self.index_dir), [])
+    db.set_index_dir(self.index_dir)
+    db.shutdown()
+
+    db = progdb.Database(index_dir=self.index_dir)
+    db.add_search_path(self.dir)
+    self.assertEqual(db.get_num_files(), 4) # before any crawling
+    db.shutdown()
+
+  def test_index_is_per_ignores(self):
+    self.crawl().shutdown()
+    db = progdb.Database(index_dir=self.index_dir)
+    db.add_ignore("^z\\.c$")
+    db.add_search_path(self.dir)
+    self.assertEqual(db.get_num_files(), 0)
+    MessageLoop.run_until(lambda: db.get_status() == "Idle.")
+    self.assertEqual(sorted(self.find(db, ".")), ["a/y.c", "b/w.c", "x.c"])
+    db.shutdown()
+
+class TestDatabaseUpdates(unittest.TestCase):
+  def setUp(self):
+    self.dir = _make_test_tree()
+    self.db = progdb.Database(index_dir=None, use_inotify=False, poll_interval=50)
+
+  def tearDown(self):
+    self.db.shutdown()
+    shutil.rmtree(self.dir)
+
+  def crawl(self, path):
+    self.db.add_search_path(path)
+    MessageLoop.run_until(lambda: self.db.get_status() == "Idle.")
+
+  def find_all(self):
+    return sorted([os.path.relpath(f, self.dir) for f in self.db.find_files_matching(".")])
+
+  def test_polling(self):
+    self.crawl(self.dir)
+    os.unlink(os.path.join(self.dir, "a/y.c"))
+    os.rename(os.path.join(self.dir, "x.c"), os.path.join(self.dir, "b/x.c"))
+    os.mkdir(os.path.join(self.dir, "a/aa/c"))
+    open(os.path.join(self.dir, "a/aa/c/u.c"), "w").close()
+    expected = ["a/aa/c/u.c", "a/aa/z.c", "b/w.c", "b/x.c"]
+    MessageLoop.run_until(lambda: self.find_all() == expected)
+
+    shutil.rmtree(os.path.join(self.dir, "a"))
+    MessageLoop.run_until(lambda: self.find_all() == ["b/w.c", "b/x.c"])
+    self.assertEqual(self.db.get_num_files(), 2)
+
+  def test_ignores_change_in_place(self):
+    self.crawl(self.dir)
+    num_dirs_crawled = self.db._num_dirs_crawled
+    self.db.add_ignore("^a$")
+    self.db.add_ignore("^w\\.c$")
+    self.assertEqual(self.find_all(), ["x.c"])
+    self.assertEqual(self.db._num_dirs_crawled, num_dirs_crawled)
+
+    self.db.remove_ignore("^a$")
+    self.assertEqual(self.find_all(), ["x.c"])
+    MessageLoop.run_until(lambda: self.db.get_status() == "Idle.")
+    self.assertEqual(self.find_all(), ["a/aa/z.c", "a/y.c", "x.c"])
+
+  def test_search_path_subsumes_subpaths(self):
+    self.crawl(os.path.join(self.dir, "a"))
+    self.db.add_search_path(os.path.join(self.dir, "a/aa"))
+    self.assertEqual(self.db._search_paths, set([os.path.join(self.dir, "a")]))
+
+    self.db.add_search_path(self.dir)
+    self.assertEqual(self.db._search_paths, set([self.dir]))
+    self.assertEqual(self.find_all(), ["a/aa/z.c", "a/y.c"]) # kept while the rest is crawled
+    MessageLoop.run_until(lambda: self.db.get_status() == "Idle.")
+    self.assertEqual(self.find_all(), ["a/aa/z.c", "a/y.c", "b/w.c", "x.c"])
@@ -0,0 +1,97 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import unittest
+
+import progdb
+from progdb.file_search_index import FileSearchIndex
+
+class TestFileSearchIndex(unittest.TestCase):
+  def setUp(self):
+    self.files_by_basename = {}
+    self.index = FileSearchIndex(self.files_by_basename)
+    for f in ["/src/ui/main_window.py", "/src/ui/main.py", "/src/main.c",
+              "/src/debugger/domain.py", "/src/ui/remain.py", "/src/debugger/MainLoop.py",
+              "/src/util/message_loop.py", "/src/ui/aMain.py", "/src/lib/my_animation.py"]:
+      self.add(f)
+
+  def add(self, filename):
+    basename = os.path.basename(filename)
+    if not self.files_by_basename.has_key(basename):
+      self.files_by_basename[basename] = []
+      self.index.name_added(basename)
+    self.files_by_basename[basename].append(progdb.TaggedFile(filename))
+
+  def remove(self, basename):
+    del self.files_by_basename[basename]
+    self.index.name_removed(basename)
+
+  def find(self, query, max_results = 100):
+    res, truncated = self.index.find(query, max_results)
+    return [os.path.basename(f) for f in res]
+
+  def test_ranking(self):
+    self.assertEqual(self.find("main"),
+                     ["main.c", "main.py", "MainLoop.py", "main_window.py", # prefixes, shortest first
+                      "aMain.py", "domain.py", "remain.py", # substrings, at word starts first
+                      "my_animation.py"]) # subsequences
+    self.assertEqual(self.find("MAINPY"), ["main.py", "aMain.py", "domain.py", "remain.py", # the tightest first
+                                           "MainLoop.py", "main_window.py", "my_animation.py"])
+    self.assertEqual(self.find("xyz"), [])
+
+  def test_truncation(self):
+    res, truncated = self.index.find("main", 3)
+    self.assertEqual([os.path.basename(f) for f in res], ["main.c", "main.py", "MainLoop.py"])
+    self.assertTrue(truncated)
+    res, truncated = self.index.find("domain", 3)
+    self.assertFalse(truncated)
+
+  def test_directories(self):
+    self.add("/src/debugger/main.py")
+    self.assertEqual(self.index.find("ui/main.py", 100)[0],
+                     ["/src/ui/main.py", "/src/ui/aMain.py", "/src/ui/remain.py", "/src/ui/main_window.py"])
+    self.assertEqual(self.index.find("dbg/main.py", 100)[0],
+                     ["/src/debugger/main.py", "/src/debugger/domain.py", "/src/debugger/MainLoop.py"])
+    self.assertEqual(self.find("ui/"), [])
+
+  def test_narrowing(self):
+    self.assertEqual(self.find("ma"), ["main.c", "main.py", "MainLoop.py", "main_window.py",
+                                       "aMain.py", "domain.py", "remain.py", "my_animation.py",
+                                       "message_loop.py"])
+    self.assertEqual(self.index._last_query, "ma")
+    self.assertEqual(self.find("mainl"), ["MainLoop.py"])
+    self.assertEqual(self.index._last_query, "mainl")
+
+    # changes can't be narrowed into
+    self.add("/src/mainline.txt")
+    self.remove("MainLoop.py")
+    self.assertEqual(self.index._last_query, None)
+    self.assertEqual(self.find("mainl"), ["mainline.txt"])
+
+  def test_no_narrowing_from_before_a_change(self):
+    it = self.index.iter_find("ma")
+    it.next() # the first tier is out; the last is yet to be worked out
+    self.add("/src/mainline.txt")
+    list(it)
+    self.assertEqual(self.index._last_query, None)
+    self.assertEqual(self.find("mainl"), ["MainLoop.py", "mainline.txt"])
+
+  def test_rebuild(self):
+    for i in range(1200):
+      self.add("/gen/file%i.c" % i)
+    self.remove("main.c")
+    self.assertEqual(self.find("file1199"), ["file1199.c"])
+    self.assertEqual(self.index._added, [])
+    self.assertEqual(self.find("main.c"), [])
+    self.assertEqual(self.find("main.")[:2], ["main.py", "aMain.py"])
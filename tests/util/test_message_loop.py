@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
+import select
 import unittest
 from util.message_loop import *
 
@@ -34,3 +36,82 @@ class TestMessageLoop_NoMessages(unittest.TestCase):
       return i[0] > 0
     MessageLoop.add_delayed_message(tick, 200)
     MessageLoop.run_until(lambda: len(res) == 2)
+
+  def test_add_message_from_thread_wakes_loop(self):
+    res = []
+    def post():
+      time.sleep(0.02)
+      MessageLoop.add_message(lambda: res.append(time.time()))
+    t = threading.Thread(target=post)
+    start = time.time()
+    t.start()
+    MessageLoop.run_while(lambda: len(res) == 0)
+    t.join()
+    self.assertTrue(res[0] - start < 0.5)
+
+  def test_delayed_message_not_run_early(self):
+    res = []
+    start = time.time()
+    MessageLoop.add_delayed_message(lambda: res.append(time.time()), 100)
+    MessageLoop.run_while(lambda: len(res) == 0)
+    self.assertTrue(res[0] - start >= 0.1)
+
+  def test_wait_until_wakeup(self):
+    flag = [False]
+    def set_flag():
+      time.sleep(0.02)
+      flag[0] = True
+      MessageLoop.wakeup()
+    t = threading.Thread(target=set_flag)
+    t.start()
+    MessageLoop.wait_until(lambda: flag[0])
+    t.join()
+    self.assertTrue(flag[0])
+
+  def test_wakeup_during_drain_is_not_lost(self):
+    import util.message_loop
+    r = util.message_loop._get_wakeup_pipe()[0]
+    MessageLoop.wakeup()
+    real_read = os.read
+    woken = []
+    def read_racing_wakeup(fd, n):
+      if fd == r and not len(woken):
+        woken.append(True)
+        MessageLoop.wakeup() # as another thread might, mid drain
+      return real_read(fd, n)
+    os.read = read_racing_wakeup
+    try:
+      util.message_loop._drain_wakeup_pipe()
+    finally:
+      os.read = real_read
+    MessageLoop.wakeup()
+    self.assertEqual(select.select([r], [], [], 0)[0], [r])
+    util.message_loop._drain_wakeup_pipe()
+
+  def test_wait_until_passes_on_wakeups(self):
+    # a message posted during a wait_until must still wake up whatever runs
+    # the queue, such as gtk's watch on the wakeup pipe, once it returns
+    import util.message_loop
+    r = util.message_loop._get_wakeup_pipe()[0]
+    util.message_loop._drain_wakeup_pipe()
+    res = []
+    flag = [False]
+    def post():
+      time.sleep(0.02)
+      MessageLoop.add_message(lambda: res.append(True))
+      time.sleep(0.02)
+      flag[0] = True # no wakeup; wait_until polls
+    t = threading.Thread(target=post)
+    t.start()
+    MessageLoop.wait_until(lambda: flag[0])
+    t.join()
+    self.assertEqual(res, [])
+    self.assertEqual(select.select([r], [], [], 0)[0], [r])
+    MessageLoop.run_until(lambda: len(res) != 0)
+
+  def test_idle_wait_blocks(self):
+    # an idle loop should sleep in select rather than spin
+    start_cpu = time.clock()
+    end = time.time() + 0.3
+    MessageLoop.run_until(lambda: time.time() > end)
+    self.assertTrue(time.clock() - start_cpu < 0.15)
@@ -33,6 +33,21 @@ class A():
     time.sleep(0.5)
     return self.vall
 
+  def count(self, n):
+    for i in range(n):
+      yield i
+
+  def count_forever(self):
+    i = 0
+    while True:
+      yield i
+      i += 1
+
+  def count_then_raise(self, n):
+    for i in range(n):
+      yield i
+    raise Exception("This is an expected exception")
+
 class TestRemoteClient(unittest.TestCase):
   def test_basic(self):
     a = RemoteClient(A)
@@ -64,6 +79,39 @@ class TestRemoteClient(unittest.TestCase):
     self.assertRaises(Exception, lambda: w.wait())
     a.shutdown()
 
+  def test_call_async_stream(self):
+    a = RemoteClient(A)
+    s = a.call_async_stream('count', 3)
+    parts = []
+    s.part_received.add_listener(lambda i: parts.append(i))
+    self.assertEqual(s.wait(), 3)
+    self.assertEqual(parts, [0, 1, 2])
+    a.shutdown()
+
+  def test_call_async_stream_exception(self):
+    a = RemoteClient(A)
+    s = a.call_async_stream('count_then_raise', 2)
+    parts = []
+    s.part_received.add_listener(lambda i: parts.append(i))
+    self.assertRaises(Exception, lambda: s.wait())
+    self.assertEqual(parts, [0, 1])
+    a.shutdown()
+
+  def test_cancel_stream(self):
+    a = RemoteClient(A)
+    s = a.call_async_stream('count_forever')
+    parts = []
+    s.part_received.add_listener(lambda i: parts.append(i))
+    MessageLoop.run_until(lambda: len(parts) >= 3)
+    s.cancel()
+    num_parts = len(parts)
+    self.assertRaises(Exception, lambda: s.wait())
+
+    # the server moves on to other calls, and what it sent before the cancel is dropped
+    self.assertEqual(a.call_async_waitable('get').wait(), 7)
+    self.assertEqual(len(parts), num_parts)
+    a.shutdown()
+
 class TestRemoteClass(unittest.TestCase):
   def test_basic(self):
     a = RemoteClass(A)
@@ -76,6 +124,7 @@ class TestRemoteClass(unittest.TestCase):
     self.assertEqual(v, 5)
     self.assertRaises(Exception, lambda: a.call.exception())
     self.assertRaises(Exception, lambda: a.call_async_waitable.exception().wait())
+    self.assertEqual(a.call_async_stream.count(4).wait(), 4)
     a.shutdown()
 
   def test_leave_running(self):
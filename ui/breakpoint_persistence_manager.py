@@ -11,8 +11,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import gtk
+
 from util import *
 from debugger import *
+from butter_bar import *
+
+# bulk inserts smaller than this finish too quickly to be worth a progress bar
+_MIN_BREAKPOINTS_FOR_PROGRESS = 20
 
 class BreakpointPersistenceManager(object):
   def __init__(self, mc):
@@ -20,17 +26,42 @@ class BreakpointPersistenceManager(object):
     debugger = self._mc.debugger
 
     mc.settings.register("CurrentBreakpoints", list, [])
+    mc.settings.register("CurrentLogpoints", list, [])
+
+    self._progress_bar = None
+    debugger.breakpoint_bind_progress.add_listener(self._on_bind_progress)
 
     self._restore_breakpoints_from_settings()
     debugger.breakpoints.changed.add_listener(self._on_breakpoints_changed)
 
   def _restore_breakpoints_from_settings(self):
-    for loc_str in self._mc.settings.CurrentBreakpoints:
-      bp = Breakpoint(eval(loc_str, {"Location" : Location}, {}))
-      self._mc.debugger.breakpoints.append(bp)
+    env = {"Location" : Location, "Breakpoint" : Breakpoint, "Logpoint" : Logpoint}
+    bps = []
+    for bp_str in self._mc.settings.CurrentBreakpoints:
+      bp = eval(bp_str, env, {})
+      if isinstance(bp, Location): # saved before breakpoints had conditions
+        bp = Breakpoint(bp)
+      bps.append(bp)
+    bps += [eval(lp_str, env, {}) for lp_str in self._mc.settings.CurrentLogpoints]
+    self._mc.debugger.begin_add_breakpoints(bps)
+
+  def _on_bind_progress(self, num_done, num_total):
+    if num_total < _MIN_BREAKPOINTS_FOR_PROGRESS:
+      return
+    if num_done == num_total:
+      if self._progress_bar and self._mc.butter_bar_collection.has_bar(self._progress_bar):
+        self._mc.butter_bar_collection.close_bar(self._progress_bar)
+        self._progress_bar = None
+      return
+    if not self._progress_bar:
+      self._progress_bar = ButterBar()
+      self._progress_bar.set_stock_icon(gtk.STOCK_DIALOG_INFO)
+      self._mc.butter_bar_collection.add_bar(self._progress_bar)
+    self._progress_bar.text = "Setting breakpoints: %i of %i" % (num_done, num_total)
 
   def _on_breakpoints_changed(self):
-    locs = [repr(bp.location) for bp in self._mc.debugger.breakpoints if bp.location.has_repr]
-    self._mc.settings.CurrentBreakpoints = locs
+    bps = [bp for bp in self._mc.debugger.breakpoints if bp.location.has_repr]
+    self._mc.settings.CurrentBreakpoints = [repr(bp) for bp in bps if not isinstance(bp, Logpoint)]
+    self._mc.settings.CurrentLogpoints = [repr(bp) for bp in bps if isinstance(bp, Logpoint)]
 
 
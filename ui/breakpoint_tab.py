@@ -16,12 +16,15 @@ pygtk.require('2.0')
 import gtk
 import gobject
 
+from util import *
 from debugger import *
 from tab_interface import *
 
 ICON_COLUMN=0
 ID_COLUMN=1
 LOCATION_COLUMN=2
+CONDITION_COLUMN=3
+THRESHOLD_COLUMN=4
 
 class BreakpointTab(gtk.VBox):
   def __init__(self,mc):
@@ -29,7 +32,7 @@ class BreakpointTab(gtk.VBox):
     gtk.VBox.__init__(self)
     self._id = None
     self._mc = mc
-    self._ls = gtk.ListStore(gtk.gdk.Pixbuf,object,str)
+    self._ls = gtk.ListStore(gtk.gdk.Pixbuf,object,str,str,str)
 
     tv = gtk.TreeView(self._ls)
     self._tv = tv
@@ -47,9 +50,18 @@ class BreakpointTab(gtk.VBox):
     locCell.set_property("editable",True)
     tv.append_column(gtk.TreeViewColumn("Function", locCell, text=LOCATION_COLUMN))
 
+    condCell = gtk.CellRendererText()
+    condCell.set_property("editable",True)
+    tv.append_column(gtk.TreeViewColumn("Condition", condCell, text=CONDITION_COLUMN))
+
+    thresholdCell = gtk.CellRendererText()
+    thresholdCell.set_property("editable",True)
+    tv.append_column(gtk.TreeViewColumn("Break on hit", thresholdCell, text=THRESHOLD_COLUMN))
 
 
     locCell.connect('edited', self._on_breakpoint_location_edit)
+    condCell.connect('edited', self._on_breakpoint_condition_edit)
+    thresholdCell.connect('edited', self._on_breakpoint_threshold_edit)
 
     tvs = tv.get_selection()
     tvs.set_mode(gtk.SELECTION_SINGLE)
@@ -131,6 +143,23 @@ class BreakpointTab(gtk.VBox):
     b = self._ls.get_value(iter,ID_COLUMN)
     b.location = Location(text=newtext)
 
+  def _on_breakpoint_condition_edit(self,cell,path,newtext):
+    iter = self._ls.get_iter(path)
+    b = self._ls.get_value(iter,ID_COLUMN)
+    b.condition = newtext.strip()
+
+  def _on_breakpoint_threshold_edit(self,cell,path,newtext):
+    iter = self._ls.get_iter(path)
+    b = self._ls.get_value(iter,ID_COLUMN)
+    newtext = newtext.strip()
+    if newtext == "":
+      b.hit_threshold = 0
+      return
+    try:
+      b.hit_threshold = int(newtext)
+    except ValueError:
+      log0("Not a hit number: %s", newtext)
+
   def _on_button_press(self,tv,evt):
     if evt.button == 1 and evt.type == gtk.gdk._2BUTTON_PRESS:
       b = self.get_selected()
@@ -188,3 +217,7 @@ class BreakpointTab(gtk.VBox):
         self._ls.set(row,ICON_COLUMN,r.mark_error_break.pixmap)
         self._ls.set(row,ID_COLUMN,b)
         self._ls.set(row,LOCATION_COLUMN, str(b.location))
+      if b.condition != None:
+        self._ls.set(row,CONDITION_COLUMN, b.condition)
+      if b.hit_threshold:
+        self._ls.set(row,THRESHOLD_COLUMN, str(b.hit_threshold))
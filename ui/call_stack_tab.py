@@ -24,6 +24,8 @@ FRAME_NUM_COLUMN=1
 FUNCTION_COLUMN=2
 BGCOLOR_COLUMN=3
 
+MORE_FRAMES_ROW=-1 # frame number of the row that fetches the next page
+
 class CallStackTab(gtk.VBox):
   def __init__(self,mc):
     TabInterface.validate_implementation(self)
@@ -86,6 +88,10 @@ class CallStackTab(gtk.VBox):
   def _on_row_activated(self,tv,path,view_column):
     iter = self._ls.get_iter(path)
     fn = self._ls.get_value(iter,FRAME_NUM_COLUMN)
+    if fn == MORE_FRAMES_ROW:
+      self._mc.debugger.active_thread.call_stack.fetch_more()
+      self.on_active_frame_changed()
+      return
     if fn != None:
       self._mc.debugger.active_thread.set_active_frame_number(fn)
       self._mc.focus_editor()
@@ -97,12 +103,22 @@ class CallStackTab(gtk.VBox):
     if not self._mc.debugger.active_thread:
       return
 
-    # update table
-    cs = self._mc.debugger.active_thread.call_stack
-    for frame in cs:
+    # update table, showing the first page plus whatever has been fetched since
+    thr = self._mc.debugger.active_thread
+    cs = thr.call_stack
+    if cs.fetched_frame_count <= thr.active_frame_number:
+      cs.fetch_more(thr.active_frame_number + 1 - cs.fetched_frame_count)
+    if cs.fetched_frame_count < debugger.CALL_STACK_PAGE_SIZE:
+      cs.fetch_more(debugger.CALL_STACK_PAGE_SIZE - cs.fetched_frame_count)
+    n = cs.fetched_frame_count
+    for frame in cs[:n]:
       row = self._ls.append()
       self._ls.set(row,FRAME_NUM_COLUMN,frame.frame_number)
       self._ls.set(row,FUNCTION_COLUMN, str(frame.location))
+    if n < len(cs):
+      row = self._ls.append()
+      self._ls.set(row,FRAME_NUM_COLUMN,MORE_FRAMES_ROW)
+      self._ls.set(row,FUNCTION_COLUMN, "... %i more frames, activate to load" % (len(cs) - n))
 
     # update coloring...
     activeFrameNum = self._mc.debugger.active_thread.active_frame_number
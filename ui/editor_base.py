@@ -159,9 +159,7 @@ class EditorBase(object):
     # focus the active location
     if self._mc.debugger.active_thread: # we probably just went from running to break...
       log2("Active frame changed. Active thread is %s", self._mc.debugger.active_thread);
-      fn = self._mc.debugger.active_thread.active_frame_number
-      cs = self._mc.debugger.active_thread.call_stack
-      self.focus_location(cs[fn].location)
+      self.focus_location(self._mc.debugger.active_thread.active_frame.location)
 
     # update marks
     self._schedule_update_marks()
@@ -238,12 +236,12 @@ class EditorBase(object):
 
     # add current and active frames to the table
     if self._mc.debugger.active_thread: # we probably just went from running to break...
-      afn = self._mc.debugger.active_thread.active_frame_number
-      cs = self._mc.debugger.active_thread.call_stack
-      getmark(cs[0].location).current_line = True
-      if afn != 0:
-        getmark(cs[afn].location).active_frame = True
-      for f in cs[1:]:
+      thr = self._mc.debugger.active_thread
+      getmark(thr.top_frame.location).current_line = True
+      if thr.active_frame_number != 0:
+        getmark(thr.active_frame.location).active_frame = True
+      # only mark frames somebody has already fetched; never unwind the whole stack for marks
+      for f in thr.call_stack.fetched_frames[1:]:
         getmark(f.location).on_callstack = True
 
     # compute changes between self._line_marks_by_loc and new_line_marks_by_loc
@@ -166,6 +166,7 @@ if __name__ == "__main__":
 #  set_loglevel(3)
   import progdb
   db = RemoteClass(progdb.Database)
+  db.call.set_index_dir(progdb.DATABASE_DEFAULT_INDEX_DIR)
   db.call.add_search_path("./tests")
   time.sleep(2) # let it discover tests # todo remove so we can try this without tests...
   dlg = GotoMethodDialog(db, os.path.abspath("./tests/resources/ctags_test1.cpp"))
@@ -0,0 +1,190 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pygtk
+pygtk.require('2.0')
+import gtk
+import time
+
+from tab_interface import *
+from debugger import *
+from util import *
+
+LOGPOINT_COLUMN=0
+LOCATION_COLUMN=1
+FORMAT_COLUMN=2
+HITS_COLUMN=3
+
+# how often the log is checked for new output while the tab is showing
+_POLL_INTERVAL = 250
+
+def _split_args(text):
+  """Splits comma separated expressions, ignoring commas inside brackets."""
+  args = []
+  depth = 0
+  cur = ""
+  for c in text:
+    if c in "([{":
+      depth += 1
+    elif c in ")]}":
+      depth -= 1
+    if c == "," and depth == 0:
+      args.append(cur.strip())
+      cur = ""
+    else:
+      cur += c
+  if cur.strip() != "":
+    args.append(cur.strip())
+  return args
+
+class LogpointTab(gtk.VBox):
+  """
+  Logpoints and their output. The log is polled while the tab is showing
+  rather than updated per hit.
+  """
+  def __init__(self,mc):
+    TabInterface.validate_implementation(self)
+    gtk.VBox.__init__(self)
+    self._id = None
+    self._mc = mc
+    self._num_shown = 0 # log entries appended so far that we've displayed
+    self._poll_pending = False
+
+    # new logpoint
+    self._location_entry = gtk.Entry()
+    self._format_entry = gtk.Entry()
+    self._args_entry = gtk.Entry()
+    for e in [self._location_entry, self._format_entry, self._args_entry]:
+      e.connect("activate", self._on_add)
+    add = gtk.Button("Add")
+    add.connect("clicked", self._on_add)
+    hbox = gtk.HBox()
+    hbox.pack_start(gtk.Label("Location"), False, False, 2)
+    hbox.pack_start(self._location_entry, True, True, 2)
+    hbox.pack_start(gtk.Label("Format"), False, False, 2)
+    hbox.pack_start(self._format_entry, True, True, 2)
+    hbox.pack_start(gtk.Label("Args"), False, False, 2)
+    hbox.pack_start(self._args_entry, True, True, 2)
+    hbox.pack_start(add, False, False, 2)
+
+    # logpoint list
+    self._ls = gtk.ListStore(object,str,str,str)
+    tv = gtk.TreeView(self._ls)
+    self._tv = tv
+    cell = gtk.CellRendererText()
+    tv.append_column(gtk.TreeViewColumn("Location", cell, text=LOCATION_COLUMN))
+    tv.append_column(gtk.TreeViewColumn("Format", cell, text=FORMAT_COLUMN))
+    tv.append_column(gtk.TreeViewColumn("Hits", cell, text=HITS_COLUMN))
+    tv.connect("key-press-event", self._on_key_press)
+    lsw = gtk.ScrolledWindow()
+    lsw.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
+    lsw.add(tv)
+
+    # output
+    self._buffer = gtk.TextBuffer()
+    self._output = gtk.TextView(self._buffer)
+    self._output.set_editable(False)
+    osw = gtk.ScrolledWindow()
+    osw.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
+    osw.add(self._output)
+    self._output_sw = osw
+    clear = gtk.Button("Clear")
+    clear.connect("clicked", self._on_clear)
+    bbox = gtk.HBox()
+    bbox.pack_end(clear, False, False, 0)
+
+    paned = gtk.VPaned()
+    paned.pack1(lsw, True, True)
+    paned.pack2(osw, True, True)
+    self.pack_start(hbox,False,False,0)
+    self.pack_start(paned,True,True,0)
+    self.pack_start(bbox,False,False,0)
+    self.show_all()
+
+    self.connect("map", self._on_map)
+    mc.debugger.breakpoints.changed.add_listener(self._update_logpoints)
+
+  @property
+  def id(self):
+    return self._id
+  @id.setter
+  def id(self,id):
+    self._id = id
+
+  def special_grab_focus(self):
+    self._location_entry.grab_focus()
+
+  def _on_add(self, *args):
+    loc_text = self._location_entry.get_text().strip()
+    format = self._format_entry.get_text()
+    if loc_text == "" or format == "":
+      return
+    try:
+      loc = Location(text=loc_text)
+    except Exception, e:
+      log0("Invalid logpoint location %s: %s", loc_text, e)
+      return
+    self._mc.debugger.breakpoints.append(Logpoint(loc, format, _split_args(self._args_entry.get_text())))
+    self._location_entry.set_text("")
+
+  def _on_key_press(self, tv, evt):
+    if gtk.gdk.keyval_name(evt.keyval) != "Delete":
+      return False
+    m, s = tv.get_selection().get_selected()
+    if s == None:
+      return False
+    self._mc.debugger.breakpoints.remove(m.get_value(s, LOGPOINT_COLUMN))
+    return True
+
+  def _on_clear(self, *args):
+    self._mc.debugger.logpoint_log.clear()
+    self._buffer.set_text("")
+    self._update_logpoints()
+
+  def _update_logpoints(self):
+    self._ls.clear()
+    for b in self._mc.debugger.breakpoints:
+      if not isinstance(b, Logpoint):
+        continue
+      row = self._ls.append()
+      self._ls.set(row, LOGPOINT_COLUMN, b)
+      self._ls.set(row, LOCATION_COLUMN, str(b.location))
+      if b.all_valid:
+        self._ls.set(row, FORMAT_COLUMN, "%s %s" % (b.format, ", ".join(b.args)))
+      else:
+        self._ls.set(row, FORMAT_COLUMN, b.error)
+      self._ls.set(row, HITS_COLUMN, str(b.hit_count))
+
+  def _on_map(self, *args):
+    self._update_logpoints()
+    self._poll()
+
+  def _poll(self):
+    self._poll_pending = False
+    if not (self.flags() & gtk.MAPPED):
+      return
+    log = self._mc.debugger.logpoint_log
+    if log.num_appended != self._num_shown:
+      self._num_shown, entries = log.get_entries(self._num_shown)
+      text = "".join(["%s [%i] %s\n" % (time.strftime("%H:%M:%S", time.localtime(t)), id, line) for t,id,line in entries])
+      self._buffer.insert(self._buffer.get_end_iter(), text)
+      excess = self._buffer.get_line_count() - 1 - log.size
+      if excess > 0:
+        self._buffer.delete(self._buffer.get_start_iter(), self._buffer.get_iter_at_line(excess))
+      adj = self._output_sw.get_vadjustment()
+      adj.set_value(adj.upper)
+      for row in self._ls:
+        row[HITS_COLUMN] = str(row[LOGPOINT_COLUMN].hit_count)
+    if not self._poll_pending:
+      self._poll_pending = True
+      MessageLoop.add_delayed_message(self._poll, _POLL_INTERVAL)
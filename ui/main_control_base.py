@@ -35,6 +35,10 @@ from resources import Resources
 
 from call_stack_tab import CallStackTab
 from thread_tab import ThreadTab
+from unique_stacks_tab import UniqueStacksTab
+from watch_tab import WatchTab
+from logpoint_tab import LogpointTab
+from profiler_tab import ProfilerTab
 from process_tab import ProcessTab
 from breakpoint_tab import *
 from breakpoint_persistence_manager import *
@@ -87,7 +91,19 @@ class MainControlBase(dbus.service.Object):
     self._when_debugging_overlay = self.new_overlay("Debugging only overlay")
     self._always_overlay = self.new_overlay("Always-on overlay")
 
-    self._debugger = Debugger()
+    settings.register("SymbolIndexCacheDirectory", str, os.path.expanduser("~/.ndbg_cache/index-cache"))
+    settings.register("SymbolIndexCacheMaxMB", int, 2048)
+    if settings.SymbolIndexCacheDirectory != "":
+      try:
+        SymbolIndexCache.set_default(SymbolIndexCache(settings.SymbolIndexCacheDirectory, settings.SymbolIndexCacheMaxMB * 1024 * 1024))
+      except OSError, e:
+        log0("Not using a symbol index cache: %s", e)
+    settings.register("GdbBackendPoolSize", int, 1)
+    self._debugger = Debugger(backend_pool_size=settings.GdbBackendPoolSize)
+    settings.register("LazySharedLibrarySymbols", bool, False)
+    self._debugger.lazy_solib_symbols = settings.LazySharedLibrarySymbols
+    settings.register("NonStopMode", bool, False)
+    self._debugger.non_stop = settings.NonStopMode
 
     self._filemanager = FileManager(self.settings, self.debugger)
 
@@ -136,6 +152,18 @@ class MainControlBase(dbus.service.Object):
     self._always_overlay.add_tab(bt,"tabpage.breakpoints")
     self._always_overlay.add_tabs_menu_item("tabs.breakpoints", lambda x,y: self._focus_tab(bt)),
 
+    wt = WatchTab(self)
+    self._always_overlay.add_tab(wt,"tabpage.watches")
+    self._always_overlay.add_tabs_menu_item("tabs.watches", lambda x,y: self._focus_tab(wt)),
+
+    lt = LogpointTab(self)
+    self._always_overlay.add_tab(lt,"tabpage.logpoints")
+    self._always_overlay.add_tabs_menu_item("tabs.logpoints", lambda x,y: self._focus_tab(lt))
+
+    proft = ProfilerTab(self)
+    self._always_overlay.add_tab(proft,"tabpage.profiler")
+    self._always_overlay.add_tabs_menu_item("tabs.profiler", lambda x,y: self._focus_tab(proft))
+
 #    sx = StackExplorer(self)
 #    self._when_break_overlay.add_tab(sx)
 
@@ -143,6 +171,10 @@ class MainControlBase(dbus.service.Object):
     self._when_break_overlay.add_tab(tt,"tabpage.threads")
     self._when_break_overlay.add_tabs_menu_item("tabs.threads", lambda x,y: self._focus_tab(tt)),
 
+    ust = UniqueStacksTab(self)
+    self._when_break_overlay.add_tab(ust,"tabpage.unique_stacks")
+    self._when_break_overlay.add_tabs_menu_item("tabs.unique_stacks", lambda x,y: self._focus_tab(ust)),
+
     pt = ProcessTab(self)
     self._when_debugging_overlay.add_tab(pt,"tabpage.processes")
     self._when_debugging_overlay.add_tabs_menu_item("tabs.processes", lambda x,y: self._focus_tab(pt))
@@ -242,6 +274,8 @@ class MainControlBase(dbus.service.Object):
       self._run_primary_executable(suspended=True)
     elif self._settings.ExecAttach != -1:
       self._attach_to_pids([self._settings.ExecAttach])
+    elif self._settings.ExecCore != None:
+      self._open_core(*self._settings.ExecCore)
 
   def _on_show(self,*args):
     log2("Main control: window shown, scheduling load in 200ms")
@@ -421,6 +455,16 @@ class MainControlBase(dbus.service.Object):
         pid_attached.when_done(do_next_pid)
     pid_attached.when_done(do_next_pid)
 
+  def _open_core(self, exe, core_file):
+    self._focus_tab(self.find_tab(OutputTab))
+    status_dlg = StatusDialog("Debugger Status")
+    status_dlg.status = "Opening core %s" % core_file
+    try:
+      self.debugger.begin_open_core(exe, core_file).wait()
+    except Exception, ex:
+      log0("Could not open core %s: %s", core_file, ex)
+    status_dlg.hide()
+
   def find_tab_by_id(self,tab_id):
     for ovl in self._mw.overlays:
       t = ovl.find_tab_by_id(tab_id)
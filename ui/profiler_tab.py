@@ -0,0 +1,260 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pygtk
+pygtk.require('2.0')
+import gtk
+import pango
+
+from tab_interface import *
+from debugger import *
+from util import *
+
+# how often the flame view is redrawn while profiling and the tab is showing
+_REDRAW_INTERVAL = 500
+
+_ROW_HEIGHT = 18
+_COLORS = ["#f4a460", "#f08080", "#eedd82", "#ffa07a", "#f5deb3", "#e9967a"]
+
+class FlameView(gtk.DrawingArea):
+  """
+  Draws a call tree as an icicle graph: the root on top, callees below their
+  callers, each as wide as its share of the samples. Click a function to zoom
+  into it, click the top row or hit Escape to zoom back out.
+  """
+  def __init__(self):
+    gtk.DrawingArea.__init__(self)
+    self._root = None
+    self._zoom = None
+    self._rects = [] # (x, y, w, node) as last drawn, for picking
+    self._hovered = None
+    self.hovered_changed = Event()
+    self.set_flags(gtk.CAN_FOCUS)
+    self.set_events(gtk.gdk.POINTER_MOTION_MASK | gtk.gdk.BUTTON_PRESS_MASK | gtk.gdk.KEY_PRESS_MASK | gtk.gdk.LEAVE_NOTIFY_MASK)
+    self.connect("expose-event", self._on_expose)
+    self.connect("motion-notify-event", self._on_mouse_moved)
+    self.connect("leave-notify-event", self._on_mouse_leave)
+    self.connect("button-press-event", self._on_mouse_down)
+    self.connect("key-press-event", self._on_key_press)
+
+  hovered = property(lambda self: self._hovered)
+
+  def set_call_tree(self, root):
+    if root != self._root:
+      self._root = root
+      self._zoom = None
+    self.queue_draw()
+
+  def _pick(self, x, y):
+    for rx,ry,rw,node in self._rects:
+      if rx <= x < rx + rw and ry <= y < ry + _ROW_HEIGHT:
+        return node
+    return None
+
+  def _on_mouse_moved(self, w, event):
+    node = self._pick(event.x, event.y)
+    if node != self._hovered:
+      self._hovered = node
+      self.hovered_changed.fire()
+
+  def _on_mouse_leave(self, w, event):
+    if self._hovered:
+      self._hovered = None
+      self.hovered_changed.fire()
+
+  def _on_mouse_down(self, w, event):
+    self.grab_focus()
+    if event.button != 1:
+      return
+    node = self._pick(event.x, event.y)
+    if node == None:
+      return
+    if node == self._zoom:
+      self._zoom = node.parent
+    elif node.parent:
+      self._zoom = node
+    else:
+      self._zoom = None
+    self.queue_draw()
+
+  def _on_key_press(self, w, event):
+    if gtk.gdk.keyval_name(event.keyval) != "Escape":
+      return False
+    self._zoom = None
+    self.queue_draw()
+    return True
+
+  def _on_expose(self, w, event):
+    g = self.window
+    gc = g.new_gc()
+    colormap = self.get_colormap()
+    colors = {}
+    def get_color(c):
+      if colors.has_key(c) == False:
+        colors[c] = colormap.alloc_color(c, False, False)
+      return colors[c]
+    width = self.allocation.width
+    self._rects = []
+    if self._root == None or self._root.count == 0:
+      return
+    zoom = self._zoom or self._root
+    layout = self.create_pango_layout("")
+    layout.set_ellipsize(pango.ELLIPSIZE_END)
+
+    def draw_node(node, x, y, w, depth):
+      if w < 1:
+        return
+      self._rects.append((x, y, w, node))
+      gc.foreground = get_color(_COLORS[hash(node.name) % len(_COLORS)])
+      g.draw_rectangle(gc, True, int(x), y, max(1, int(w) - 1), _ROW_HEIGHT - 1)
+      if w > 20:
+        layout.set_width(int((w - 4) * pango.SCALE))
+        layout.set_text(str(node))
+        gc.foreground = get_color("black")
+        g.draw_layout(gc, int(x) + 2, y + 1, layout)
+      if y > self.allocation.height:
+        return
+      cx = x
+      for c in node.children:
+        cw = w * c.count / node.count
+        draw_node(c, cx, y + _ROW_HEIGHT, cw, depth + 1)
+        cx += cw
+    draw_node(zoom, 0, 0, float(width), 0)
+
+class ProfilerTab(gtk.VBox):
+  """
+  Sampling profiler controls and a flame view of where the program spends
+  its time. The view is redrawn on a timer rather than per sample.
+  """
+  def __init__(self,mc):
+    TabInterface.validate_implementation(self)
+    gtk.VBox.__init__(self)
+    self._id = None
+    self._mc = mc
+    self._redraw_pending = False
+    self._dirty = False
+
+    mc.settings.register("ProfilerSampleRate", int, PROFILER_DEFAULT_RATE)
+    self._profiler = Profiler(mc.debugger, mc.settings.ProfilerSampleRate)
+    self._profiler.changed.add_listener(self._on_profiler_changed)
+
+    self._run_button = gtk.ToggleButton("Profile")
+    self._run_button.connect("toggled", self._on_run_toggled)
+    self._rate = gtk.SpinButton(gtk.Adjustment(self._profiler.rate, 1, 1000, 1, 10))
+    self._rate.connect("value-changed", self._on_rate_changed)
+    reset = gtk.Button("Reset")
+    reset.connect("clicked", lambda *args: self._profiler.reset())
+    export = gtk.Button("Export...")
+    export.connect("clicked", self._on_export)
+    self._status = gtk.Label()
+    self._status.set_alignment(0, 0.5)
+    hbox = gtk.HBox()
+    hbox.pack_start(self._run_button, False, False, 2)
+    hbox.pack_start(gtk.Label("Samples/s"), False, False, 2)
+    hbox.pack_start(self._rate, False, False, 2)
+    hbox.pack_start(reset, False, False, 2)
+    hbox.pack_start(export, False, False, 2)
+    hbox.pack_start(self._status, True, True, 6)
+
+    self._flame = FlameView()
+    self._flame.hovered_changed.add_listener(self._update_status)
+    sw = gtk.ScrolledWindow()
+    sw.set_policy(gtk.POLICY_NEVER, gtk.POLICY_AUTOMATIC)
+    sw.add_with_viewport(self._flame)
+
+    self.pack_start(hbox,False,False,0)
+    self.pack_start(sw,True,True,0)
+    self.show_all()
+
+    self.connect("map", self._on_map)
+    self._update_status()
+
+  @property
+  def id(self):
+    return self._id
+  @id.setter
+  def id(self,id):
+    self._id = id
+
+  def special_grab_focus(self):
+    self._flame.grab_focus()
+
+  def _on_run_toggled(self, *args):
+    if self._run_button.get_active() == self._profiler.running:
+      return
+    if self._run_button.get_active():
+      try:
+        self._profiler.start()
+      except DebuggerException, e:
+        log0("Can't profile: %s", e)
+        self._run_button.set_active(False)
+    else:
+      self._profiler.stop()
+
+  def _on_rate_changed(self, *args):
+    rate = self._rate.get_value_as_int()
+    self._profiler.rate = rate
+    self._mc.settings.ProfilerSampleRate = rate
+
+  def _on_export(self, *args):
+    dlg = gtk.FileChooserDialog(title="Export collapsed stacks",action=gtk.FILE_CHOOSER_ACTION_SAVE,
+                                buttons=(gtk.STOCK_CANCEL,gtk.RESPONSE_CANCEL,gtk.STOCK_SAVE,gtk.RESPONSE_OK))
+    resp = dlg.run()
+    filename = dlg.get_filename()
+    dlg.destroy()
+    if resp != gtk.RESPONSE_OK:
+      return
+    f = open(filename, 'w')
+    f.write(self._profiler.get_collapsed_stacks())
+    f.close()
+
+  def _on_profiler_changed(self):
+    if self._run_button.get_active() != self._profiler.running:
+      self._run_button.set_active(self._profiler.running)
+    self._dirty = True
+    if not self._profiler.running:
+      self._redraw()
+    elif not self._redraw_pending:
+      self._redraw_pending = True
+      MessageLoop.add_delayed_message(self._on_redraw_timer, _REDRAW_INTERVAL)
+
+  def _on_map(self, *args):
+    self._dirty = True
+    self._redraw()
+
+  def _on_redraw_timer(self):
+    self._redraw_pending = False
+    self._redraw()
+
+  def _redraw(self):
+    if not self._dirty or not (self.flags() & gtk.MAPPED):
+      return
+    self._dirty = False
+    root = self._profiler.call_tree
+    self._flame.set_size_request(-1, (self._get_depth(root) + 1) * _ROW_HEIGHT)
+    self._flame.set_call_tree(root)
+    self._update_status()
+
+  def _get_depth(self, node):
+    depth = 0
+    for c in node.children:
+      depth = max(depth, 1 + self._get_depth(c))
+    return depth
+
+  def _update_status(self):
+    stats = self._profiler.stats
+    text = "%i samples, %.1f ms mean pause, %.1f ms max" % (stats.num_samples, stats.mean_pause * 1000, stats.max_pause * 1000)
+    node = self._flame.hovered
+    if node and node.parent:
+      text += "    %s: %i/%i (%i on top)" % (node.name, node.count, self._profiler.call_tree.count, node.self_count)
+    self._status.set_text(text)
@@ -27,6 +27,9 @@ class QuickOpenDialog(gtk.Dialog):
     settings.register("QuickOpenDialog_FilterText", str, "")
     self._settings = settings
     self._progdb = progdb
+    self._query_stream = None
+    self._query_generation = 0 # of the latest query sent to progdb
+    self._shown_generation = None # of the query whose results are in the model
     self.set_title("Quick open...")
     self.set_size_request(1000,400)
     self.add_button("_Open",gtk.RESPONSE_OK)
@@ -51,6 +54,7 @@ class QuickOpenDialog(gtk.Dialog):
     def on_destroy(*args):
       self.response(gtk.RESPONSE_CANCEL)
     self.connect('destroy', on_destroy)
+    self.connect('response', lambda *args: self._cancel_query())
 
     truncated_bar = ButterBar()
     refresh_button = gtk.Button("_Refresh")
@@ -121,13 +125,8 @@ class QuickOpenDialog(gtk.Dialog):
       self.response(gtk.RESPONSE_OK)
 
   def _on_filter_text_changed(self,entry):
-    text = entry.get_text()
-    try:
-      re.compile(text)
-      self._settings.QuickOpenDialog_FilterText = text
-      self.refresh()
-    except Exception, ex:
-      log0("Regexp error: %s" % str(ex)) # TODO(nduca) put up a warning that this isn't a valid regex
+    self._settings.QuickOpenDialog_FilterText = entry.get_text()
+    self.refresh()
 
 
   def _update_stats(self,stats_label):
@@ -139,52 +138,75 @@ class QuickOpenDialog(gtk.Dialog):
     self._progdb.call.reset()
     self.refresh()
 
+  def _cancel_query(self):
+    if self._query_stream:
+      self._query_stream.cancel()
+      self._query_stream = None
+
   def refresh(self):
     # TODO(nduca) save the selection
+    self._cancel_query()
+    self._query_generation += 1
+    generation = self._query_generation
+
+    if self._settings.QuickOpenDialog_FilterText != "":
+      ft = str(self._settings.QuickOpenDialog_FilterText)
+      log2("QuickOpenDialog: Calling progdb %s, query %i", ft, generation)
+      s = self._progdb.call_async_stream.find_files_streaming(ft, generation)
+      s.part_received.add_listener(lambda files: self._on_files_found(generation, files))
+      s.when_done(lambda num_parts: self._on_query_done(generation))
+      self._query_stream = s
+    else:
+      self._show_files(generation, [])
+
+  def _on_files_found(self, generation, files):
+    if generation != self._query_generation:
+      return # left over from a query that has since been replaced
+    self._show_files(generation, files)
+
+  def _on_query_done(self, generation):
+    if generation != self._query_generation:
+      return
+    self._query_stream = None
+    if self._shown_generation != generation: # nothing matched
+      self._show_files(generation, [])
+
+  def _show_files(self, generation, files):
+    """Adds files, a part of the results of query generation, to the model, replacing any older query's."""
+    start_time = time.time()
+    first_part = self._shown_generation != generation
+    self._shown_generation = generation
+
+    if len(files) and files[-1] == "<TRUNCATED>":
+      truncated = True
+      del files[-1]
+    else:
+      truncated = False
 
-    # update the model based on result
-    def on_result(files):
-      start_time = time.time()
+    if first_part:
       self._treeview.freeze_child_notify()
       self._treeview.set_model(None)
-
       self._model.clear()
-      if len(files) and files[-1] == "<TRUNCATED>":
-        truncated = True
-        del files[-1]
-      else:
-        truncated = False
+      self._truncated_bar.hide()
 
-      for f in files:
-        row = self._model.append()
-        self._model.set(row, 0, f)
+    for f in files:
+      row = self._model.append()
+      self._model.set(row, 0, f)
 
+    if first_part:
       self._treeview.set_model(self._model)
       self._treeview.thaw_child_notify()
 
-      if truncated:
-        self._truncated_bar.text = "Search was truncated at %i items" % len(files)
-        self._truncated_bar.show()
-      else:
-        self._truncated_bar.hide()
-
-      elapsed = time.time() - start_time
-      log2("Model update time: %0.3fms" % (elapsed * 1000))
+    if truncated:
+      self._truncated_bar.text = "Search was truncated at %i items" % len(self._model)
+      self._truncated_bar.show()
 
-      if len(self._model) > 0:
-        if self._treeview.get_selection():
-          self._treeview.get_selection().select_path((0,))
+    elapsed = time.time() - start_time
+    log2("Model update time: %0.3fms" % (elapsed * 1000))
 
-    if self._settings.QuickOpenDialog_FilterText != "":
-      ft = str(self._settings.QuickOpenDialog_FilterText)
-      log2("QuickOpenDialog: Calling progdb %s", ft)
-      w = self._progdb.call_async_waitable.find_files_matching(ft)
-      w.when_done(on_result)
-
-#      res = self._progdb.call.find_files_matching(ft)
-#      on_result(res)
-    else:
-      self._model.clear()
+    if first_part and len(self._model) > 0:
+      if self._treeview.get_selection():
+        self._treeview.get_selection().select_path((0,))
 
 
   def _on_treeview_selection_changed(self, selection):
@@ -205,6 +227,7 @@ if __name__ == "__main__":
   set_loglevel(2)
   import progdb
   db = RemoteClass(progdb.Database)
+  db.call.set_index_dir(progdb.DATABASE_DEFAULT_INDEX_DIR)
   db.call.add_search_path("./tests")
   dlg = QuickOpenDialog(new_settings(),db)
   resp = dlg.run()
@@ -128,7 +128,11 @@ class Resources(object):
       MenuItemResource("tabs.call_stack", "Call stack", 'C', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
       MenuItemResource("tabs.output", "Output", 'O', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
       MenuItemResource("tabs.breakpoints", "Breakpoints", 'B', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
+      MenuItemResource("tabs.watches", "Watches", 'W', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
+      MenuItemResource("tabs.logpoints", "Logpoints", 'L', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
+      MenuItemResource("tabs.profiler", "Profiler", 'F', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
       MenuItemResource("tabs.threads", "Threads", 'H', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
+      MenuItemResource("tabs.unique_stacks", "Unique stacks", 'U', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
       MenuItemResource("tabs.processes", "Processes", 'P', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK),
       MenuItemResource("tabs.interactive", "GDB Interaction", 'I', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK | gtk.gdk.CONTROL_MASK),
       MenuItemResource("tabs.python", "Python", 'Y', gtk.gdk.CONTROL_MASK | gtk.gdk.MOD1_MASK | gtk.gdk.CONTROL_MASK),
@@ -136,7 +140,11 @@ class Resources(object):
       TabPageResource("tabpage.call_stack", "panel1", "Call stack"),
       TabPageResource("tabpage.output", "panel1", "Output"),
       TabPageResource("tabpage.breakpoints", "panel2", "Breakpoints"),
+      TabPageResource("tabpage.watches", "panel1", "Watches"),
+      TabPageResource("tabpage.logpoints", "panel2", "Logpoints"),
+      TabPageResource("tabpage.profiler", "panel2", "Profiler"),
       TabPageResource("tabpage.threads", "panel2", "Threads"),
+      TabPageResource("tabpage.unique_stacks", "panel2", "Unique stacks"),
       TabPageResource("tabpage.processes", "panel1", "Processes"),
       TabPageResource("tabpage.interactive", "panel2", "Interactive"),
       TabPageResource("tabpage.python", "panel2", "Python"),
@@ -150,7 +150,8 @@ class StackExplorer(gtk.VBox):
     if self._mc.debugger.active_thread == None:
       return
 
-    cs = self._mc.debugger.active_thread.call_stack
+    # only color what has already been fetched, rather than unwinding the whole stack
+    cs = self._mc.debugger.active_thread.call_stack.fetched_frames
     active_frame_num = self._mc.debugger.active_thread.active_frame_number
     for frameNum in range(0,len(cs)):
       frame = cs[frameNum]
@@ -180,78 +181,56 @@ class StackExplorer(gtk.VBox):
 
     
 
-  # explore workflow --- steps down through the graph
+  # explore workflow --- the backend steps down through the calls, we graph them
   def _on_explore_clicked(self,b):
-    self._gw.layout_enabled = False
-    
     d = self._mc.debugger
+    thr = d.active_thread
+    if d.status != STATUS_BREAK or thr == None:
+      return
+    self._gw.layout_enabled = False
+    self._add_callstack_to_graph([thr.top_frame])
+
     dlg = gtk.Dialog("Exploring",
                      None,
                      gtk.DIALOG_MODAL | gtk.DIALOG_DESTROY_WITH_PARENT,
-                     (gtk.STOCK_OK, gtk.RESPONSE_OK))
-
-    start_stack = d.active_thread.call_stack
-    def still_inside(cs):
-#      print "Checking insideness."
-      for i in range(1, len(start_stack)+1):
-#        print "comp %s to %s" % (cs[-i].location, start_stack[-i].location)
-        if cs[-i].location.soft_eq(start_stack[-i].location) == False: # use soft eq so we don't fall onto line-numbers
-          return False
-      return True
-    def get_inside_portion(cs):
-      dropAmt = len(start_stack)-1
-      if dropAmt > 0:
-        return cs[:-dropAmt]
-      else:
-        return cs[:]
-
-    delay = 0.001
-    def status_changed():
-      if d.status == STATUS_BREAK:
-        cs = d.active_thread.call_stack
-        if not still_inside(cs):
-          print "Done"
-          dlg.response(gtk.RESPONSE_OK)
-          return
-        print "Currently at %s" % cs[0]
-        inside_cs = get_inside_portion(cs)
-        print "inside cs: %s" % (inside_cs)
-        self._add_callstack_to_graph(inside_cs)
-
-        if inside_cs[0].location.has_identifier:
-          # see if filemgr recognizes it
-          confirm = False
-          if inside_cs[0].location.has_file_location:
-            resolved_filename = self._mc.filemanager.find_file(inside_cs[0].location.filename)
-            confirm = resolved_filename != None
-          else:
-            confirm = False
-            
-          # have we exceeded maxdepth?
-          if confirm and len(inside_cs) > self._get_maxdepth():
-            confirm = False
+                     (gtk.STOCK_STOP, gtk.RESPONSE_CANCEL))
+    label = gtk.Label("Exploring %s..." % thr.top_frame.location)
+    label.show()
+    dlg.vbox.pack_start(label,True,True,6)
+    found = [0]
+    def on_calls_found(calls):
+      self._add_calls_to_graph(calls)
+      found[0] += len(calls)
+      label.set_text("Found %i calls" % found[0])
 
-          if confirm:
-            print "step in"
-            time.sleep(delay)
-            d.active_thread.begin_step_into()
-          else:
-            print "uninteresting, stepping out"
-            time.sleep(delay)
-            d.active_thread.begin_step_out()
-        else:
-          print "step out"
-          time.sleep(delay)
-          d.active_thread.begin_step_out()
-    d.status_changed.add_listener(status_changed)
-    d.active_thread.begin_step_into()
-    dlg.run()
-    dlg.hide()
-    d.status_changed.remove_listener(status_changed)
+    try:
+      w = thr.begin_explore_calls(self._get_maxdepth(), on_calls_found)
+    except DebuggerException, e:
+      log0("Could not explore calls: %s", e)
+      dlg.destroy()
+      self._gw.layout_enabled = True
+      return
+    w.when_done(lambda num_calls: dlg.response(gtk.RESPONSE_OK))
+    if dlg.run() != gtk.RESPONSE_OK:
+      thr.cancel_explore_calls()
+      w.wait()
+    dlg.destroy()
 
     self._gw.layout_enabled = True
     self._update_graph_colors_based_on_callstack()
-    
+
+  # adds (caller, callee) pairs to the graph
+  def _add_calls_to_graph(self, calls):
+    g = self._graph
+    for caller,callee in calls:
+      for name in [caller, callee]:
+        if not g.nodes.has_key(name):
+          g.nodes.add(Node(name))
+      # edges point from callee to caller, as in _add_callstack_to_graph
+      e = Edge(g.nodes[callee],g.nodes[caller])
+      if g.edges.contains(e) == False:
+        g.edges.add(e)
+
   # adds  call stack to the graph
   def _add_callstack_to_graph(self, cs):
     g = self._graph
@@ -120,8 +120,10 @@ class ThreadTab(gtk.VBox):
       else:
         self._ls.set(row,BGCOLOR_COLUMN, "white")
 
-      if show_where:
-        self._ls.set(row,WHERE_COLUMN, str(t.active_frame))
-      else:
+      if not show_where:
         self._ls.set(row,WHERE_COLUMN, "")
+      elif t.status == STATUS_BREAK:
+        self._ls.set(row,WHERE_COLUMN, str(t.top_frame))
+      else: # in non-stop mode, other threads keep running
+        self._ls.set(row,WHERE_COLUMN, "(running)")
 
@@ -0,0 +1,106 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pygtk
+pygtk.require('2.0')
+import gtk
+import gobject
+
+from tab_interface import *
+from debugger import *
+from util import *
+
+THREAD_COLUMN=0
+COUNT_COLUMN=1
+TEXT_COLUMN=2
+
+class UniqueStacksTab(gtk.VBox):
+  """
+  Shows the distinct call stacks across all threads, with a count of how many
+  threads are in each. Stacks are only collected while the tab is showing.
+  """
+  def __init__(self,mc):
+    TabInterface.validate_implementation(self)
+    gtk.VBox.__init__(self)
+    self._id = None
+    self._mc = mc
+    self._stale = True
+    self._ts = gtk.TreeStore(object,str,str)
+
+    tv = gtk.TreeView(self._ts)
+    self._tv = tv
+    cell = gtk.CellRendererText()
+    tv.append_column(gtk.TreeViewColumn("Threads", cell, text=COUNT_COLUMN))
+    tv.append_column(gtk.TreeViewColumn("Stack", cell, text=TEXT_COLUMN))
+    tv.get_selection().set_mode(gtk.SELECTION_SINGLE)
+    tv.connect("row-activated", self._on_row_activated)
+
+    refresh = gtk.Button("Refresh")
+    refresh.connect("clicked", lambda *args: self._refresh())
+    bbox = gtk.HBox()
+    bbox.pack_end(refresh, False, False, 0)
+
+    sw = gtk.ScrolledWindow()
+    sw.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
+    sw.add(tv)
+    self.pack_start(bbox,False,False,0)
+    self.pack_start(sw,True,True,0)
+    self.show_all()
+
+    self.connect("map", self._on_map)
+    mc.debugger.status_changed.add_listener(self._on_status_changed)
+
+  @property
+  def id(self):
+    return self._id
+  @id.setter
+  def id(self,id):
+    self._id = id
+
+  def special_grab_focus(self):
+    self._tv.grab_focus()
+
+  def _on_map(self, *args):
+    if self._stale:
+      self._refresh()
+
+  def _on_status_changed(self):
+    self._ts.clear()
+    self._stale = True
+    if self.flags() & gtk.MAPPED:
+      self._refresh()
+
+  def _refresh(self):
+    self._ts.clear()
+    if self._mc.debugger.status != STATUS_BREAK:
+      return
+    self._stale = False
+    for g in self._mc.debugger.get_unique_stacks():
+      row = self._ts.append(None)
+      self._ts.set(row, THREAD_COLUMN, g.threads[0])
+      self._ts.set(row, COUNT_COLUMN, str(g.count))
+      self._ts.set(row, TEXT_COLUMN, str(g))
+      tids = ", ".join([str(t.frontend_id) for t in g.threads])
+      trow = self._ts.append(row)
+      self._ts.set(trow, THREAD_COLUMN, g.threads[0])
+      self._ts.set(trow, TEXT_COLUMN, "Threads: %s" % tids)
+      for f in g.frames:
+        frow = self._ts.append(row)
+        self._ts.set(frow, THREAD_COLUMN, g.threads[0])
+        self._ts.set(frow, TEXT_COLUMN, str(f))
+
+  def _on_row_activated(self,tv,path,view_column):
+    iter = self._ts.get_iter(path)
+    t = self._ts.get_value(iter,THREAD_COLUMN)
+    if t:
+      self._mc.debugger.active_thread = t
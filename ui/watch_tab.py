@@ -0,0 +1,172 @@
+# Copyright 2011 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pygtk
+pygtk.require('2.0')
+import gtk
+import gobject
+
+from tab_interface import *
+from debugger import *
+from util import *
+
+WATCH_COLUMN=0
+EXPR_COLUMN=1
+VALUE_COLUMN=2
+TYPE_COLUMN=3
+
+class _PendingChildren(object):
+  """Stands in for children of a watch that haven't been fetched yet."""
+  def __init__(self, parent, low):
+    self.parent = parent
+    self.low = low
+
+class WatchTab(gtk.VBox):
+  def __init__(self,mc):
+    TabInterface.validate_implementation(self)
+    gtk.VBox.__init__(self)
+    self._id = None
+    self._mc = mc
+    self._ts = gtk.TreeStore(object,str,str,str)
+
+    entry = gtk.Entry()
+    entry.connect("activate", self._on_entry_activate)
+    self._entry = entry
+
+    tv = gtk.TreeView(self._ts)
+    self._tv = tv
+    cell = gtk.CellRendererText()
+    tv.append_column(gtk.TreeViewColumn("Expression", cell, text=EXPR_COLUMN))
+    tv.append_column(gtk.TreeViewColumn("Value", cell, text=VALUE_COLUMN))
+    tv.append_column(gtk.TreeViewColumn("Type", cell, text=TYPE_COLUMN))
+    tv.get_selection().set_mode(gtk.SELECTION_SINGLE)
+    tv.connect("row-expanded", self._on_row_expanded)
+    tv.connect("row-activated", self._on_row_activated)
+    tv.connect("key-press-event", self._on_key_press)
+
+    sw = gtk.ScrolledWindow()
+    sw.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
+    sw.add(tv)
+    self.pack_start(entry,False,False,0)
+    self.pack_start(sw,True,True,0)
+    self.show_all()
+
+    mc.debugger.watches.item_added.add_listener(lambda idx,w: self._rebuild())
+    mc.debugger.watches.item_deleted.add_listener(lambda idx,w: self._rebuild())
+    mc.debugger.watches.changed.add_listener(self._on_watches_changed)
+
+  @property
+  def id(self):
+    return self._id
+  @id.setter
+  def id(self,id):
+    self._id = id
+
+  def special_grab_focus(self):
+    self._entry.grab_focus()
+
+  def _on_entry_activate(self, entry):
+    text = entry.get_text().strip()
+    if text == "":
+      return
+    entry.set_text("")
+    self._mc.debugger.watches.append(Watch(text))
+
+  def _on_key_press(self, tv, evt):
+    if gtk.gdk.keyval_name(evt.keyval) != "Delete":
+      return False
+    m, s = tv.get_selection().get_selected()
+    if s == None:
+      return False
+    w = m.get_value(s, WATCH_COLUMN)
+    if isinstance(w, Watch) and w.parent == None:
+      self._mc.debugger.watches.remove(w)
+    return True
+
+  # tree maintenance
+  def _set_row(self, row, w):
+    self._ts.set(row, WATCH_COLUMN, w)
+    self._ts.set(row, EXPR_COLUMN, w.expression)
+    if w.valid:
+      self._ts.set(row, VALUE_COLUMN, str(w.value))
+    else:
+      self._ts.set(row, VALUE_COLUMN, w.error)
+    self._ts.set(row, TYPE_COLUMN, str(w.type or ""))
+
+  def _add_pending_row(self, row, w, low):
+    child = self._ts.append(row)
+    self._ts.set(child, WATCH_COLUMN, _PendingChildren(w, low))
+    if low == 0:
+      self._ts.set(child, EXPR_COLUMN, "...")
+    else:
+      self._ts.set(child, EXPR_COLUMN, "... %i more, activate to load" % (w.num_children - low))
+    self._ts.set(child, VALUE_COLUMN, "")
+    self._ts.set(child, TYPE_COLUMN, "")
+
+  def _append_watch(self, parent_row, w):
+    row = self._ts.append(parent_row)
+    self._set_row(row, w)
+    if w.valid and w.num_children > 0:
+      self._add_pending_row(row, w, 0)
+
+  def _rebuild(self):
+    self._ts.clear()
+    for w in self._mc.debugger.watches:
+      self._append_watch(None, w)
+
+  def _load_children(self, pending_iter):
+    pending = self._ts.get_value(pending_iter, WATCH_COLUMN)
+    parent_iter = self._ts.iter_parent(pending_iter)
+    self._ts.remove(pending_iter)
+    w = pending.parent
+    high = pending.low + WATCH_CHILDREN_PAGE_SIZE
+    try:
+      children = w.get_children(pending.low, high)
+    except DebuggerException, e:
+      log1("Could not list children of %s: %s", w.expression, e.message)
+      return
+    for c in children:
+      self._append_watch(parent_iter, c)
+    if high < w.num_children:
+      self._add_pending_row(parent_iter, w, high)
+
+  def _on_row_expanded(self, tv, iter, path):
+    child = self._ts.iter_children(iter)
+    if child and isinstance(self._ts.get_value(child, WATCH_COLUMN), _PendingChildren):
+      self._load_children(child)
+      tv.expand_row(path, False)
+
+  def _on_row_activated(self, tv, path, view_column):
+    iter = self._ts.get_iter(path)
+    if isinstance(self._ts.get_value(iter, WATCH_COLUMN), _PendingChildren):
+      self._load_children(iter)
+
+  def _on_watches_changed(self):
+    # only values are refreshed in place; a watch whose children were dropped
+    # (e.g. its type changed) gets its subtree collapsed back to a placeholder.
+    def refresh(iter):
+      while iter:
+        w = self._ts.get_value(iter, WATCH_COLUMN)
+        if isinstance(w, Watch):
+          self._set_row(iter, w)
+          child = self._ts.iter_children(iter)
+          loaded = child and isinstance(self._ts.get_value(child, WATCH_COLUMN), Watch)
+          if (loaded and len(w._children) == 0) or (child == None and w.valid and w.num_children > 0) or (child and not w.valid):
+            while self._ts.iter_children(iter):
+              self._ts.remove(self._ts.iter_children(iter))
+            if w.valid and w.num_children > 0:
+              self._add_pending_row(iter, w, 0)
+          elif loaded:
+            refresh(child)
+        iter = self._ts.iter_next(iter)
+    refresh(self._ts.get_iter_first())
@@ -173,21 +173,13 @@ class _IOThread(WellBehavedThread):
   def _blocking_call_on_iothread(cb,*args):
     done = BoxedObject(False)
     retval = BoxedObject(None)
-    done_cond = threading.Condition()
     def run_on_iothread():
       rv = cb(*args)
       retval.set(rv)
-      done_cond.acquire()
-      done_cond.notify()
-      done_cond.release()
       done.set(True)
+      MessageLoop.wakeup()
     _IOThread.get().add_message(run_on_iothread)
-    done_cond.acquire()
-    def is_done():
-      done_cond.wait(0.01)
-      return done.get()
-    MessageLoop.wait_until(is_done)
-    done_cond.release()
+    MessageLoop.wait_until(lambda: done.get())
     return retval.get()
 
   @staticmethod
@@ -25,10 +25,14 @@ import exceptions
 import time
 import threading
 import thread
+import os
+import select
+import fcntl
+import errno
 
 from util.logging import *
 
-# TODO : this system is horribly thought out and organically grown. It pegs the CPU when there's nothing to do.
+# TODO : this system is horribly thought out and organically grown.
 #
 # I think a Task system might work better. Tasks that can be enqueued to threads, waited on, etc.
 #
@@ -58,6 +62,51 @@ import heapq
 _pending_message_heap_lock = threading.Lock()
 _pending_message_heap = []
 
+# Wakeup pipe. Posting a message writes a byte to it so that a loop blocked in
+# select() returns immediately instead of polling. The pipe is recreated after
+# a fork so that parent and child don't steal each other's wakeups.
+_MAX_IDLE_WAIT = 0.05 # upper bound on a blocking wait, for conditions not driven by messages
+_wakeup_pipe = None
+_wakeup_pipe_pid = None
+_wakeup_pending = False
+
+def _get_wakeup_pipe():
+  global _wakeup_pipe
+  global _wakeup_pipe_pid
+  global _wakeup_pending
+  pid = os.getpid()
+  if _wakeup_pipe_pid != pid:
+    r,w = os.pipe()
+    for fd in (r,w):
+      fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+      fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.fcntl(fd, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+    _wakeup_pipe = (r,w)
+    _wakeup_pipe_pid = pid
+    _wakeup_pending = False
+  return _wakeup_pipe
+
+def _drain_wakeup_pipe():
+  """
+  Empties the wakeup pipe, returning whether there was a wakeup in it.
+  Callers must run the queue afterwards or, like wait_until, pass the
+  wakeup on to whoever will.
+  """
+  global _wakeup_pending
+  r = _get_wakeup_pipe()[0]
+  woken = False
+  try:
+    while os.read(r, 4096):
+      woken = True
+  except OSError, ex:
+    if ex.errno != errno.EAGAIN:
+      raise
+  # only once the pipe is empty: clearing this first would let a wakeup() in
+  # between write a byte we then read away, leaving it set with the pipe
+  # empty and every later wakeup() a no-op. A wakeup() that finds it still set
+  # here is covered by what the caller does next.
+  _wakeup_pending = False
+  return woken
+
 
 class Message :
   def __init__(self,cb,ud):
@@ -98,6 +147,29 @@ class MessageLoop:
   @staticmethod
   def add_message(cb,*args):
     _deferred_event_queue.put(Message(cb,args))
+    MessageLoop.wakeup()
+
+  @staticmethod
+  def wakeup():
+    """
+    Wakes up any loop blocked waiting for work. Messages do this automatically;
+    call it directly after changing state that a wait_until/run_while
+    condition depends on from another thread.
+    """
+    global _wakeup_pending
+    if _wakeup_pending:
+      return
+    _wakeup_pending = True
+    try:
+      os.write(_get_wakeup_pipe()[1], "x")
+    except OSError, ex:
+      if ex.errno != errno.EAGAIN: # full pipe is already a pending wakeup
+        raise
+
+  @staticmethod
+  def get_pending_message_count():
+    """Approximate number of messages waiting to be run on the main thread."""
+    return _deferred_event_queue.qsize()
 
   @staticmethod
   def add_delayed_message(cb, timeout_ms, *args):
@@ -106,11 +178,14 @@ class MessageLoop:
       _pending_message_heap_lock.acquire()
       ts = (time.time() * 1000) + timeout_ms
       heapq.heappush(_pending_message_heap, (ts, cb, timeout_ms, args))
+      is_head = _pending_message_heap[0][0] == ts
     finally:
       try:
         _pending_message_heap_lock.release()
       except thread.error:
         pass
+    if is_head: # sleepers need to recompute their timeout
+      MessageLoop.wakeup()
 
   @staticmethod
   def add_cancellable_delayed_message(cb, timeout_ms, *args):
@@ -139,6 +214,47 @@ class MessageLoop:
         MessageLoop.add_delayed_message(cb,timeout_ms,*args)
 
 
+  @staticmethod
+  def _get_time_until_next_delayed_message():
+    """Seconds until the earliest delayed message is due, or None if there are none."""
+    try:
+      _pending_message_heap_lock.acquire()
+      if len(_pending_message_heap) == 0:
+        return None
+      ts = _pending_message_heap[0][0]
+    finally:
+      try:
+        _pending_message_heap_lock.release()
+      except thread.error:
+        pass
+    return max(0, (ts - (time.time() * 1000)) / 1000.0)
+
+  @staticmethod
+  def _wait_for_wakeup(timeout):
+    """
+    Blocks until MessageLoop.wakeup is called or timeout seconds elapse.
+    Returns whether it was woken up.
+    """
+    r = _get_wakeup_pipe()[0]
+    if timeout > 0:
+      try:
+        select.select([r],[],[],timeout)
+      except select.error, ex:
+        if ex.args[0] != errno.EINTR:
+          raise
+    return _drain_wakeup_pipe()
+
+  @staticmethod
+  def _wait_for_work():
+    """Blocks until a message is posted or the next delayed message is due."""
+    if not _deferred_event_queue.empty():
+      return
+    timeout = _MAX_IDLE_WAIT
+    next_delayed = MessageLoop._get_time_until_next_delayed_message()
+    if next_delayed != None:
+      timeout = min(timeout, next_delayed)
+    MessageLoop._wait_for_wakeup(timeout)
+
   @staticmethod
   def _try_pop_ready_message(now):
     try:
@@ -201,10 +317,19 @@ class MessageLoop:
       raise Exception("cb is not callable")
     if cb():
       return
-    while not cb():
-      if _quit_requested:
-        raise QuitException()
-      time.sleep(0.001)
+    woken = False
+    try:
+      while not cb():
+        if _quit_requested:
+          raise QuitException()
+        if MessageLoop._wait_for_wakeup(_MAX_IDLE_WAIT):
+          woken = True
+    finally:
+      # we run nothing, so a wakeup we took may have been meant for a message
+      # or timer that the loop outside us, e.g. gtk's watch on the pipe, has
+      # yet to hear about
+      if woken:
+        MessageLoop.wakeup()
 
   @staticmethod
   def run_until(cb):
@@ -219,7 +344,7 @@ class MessageLoop:
     while not cb():
       if _quit_requested:
         raise QuitException()
-      time.sleep(0.001)
+      MessageLoop._wait_for_work()
       MessageLoop._run_until_empty()
       MessageLoop._run_pending_messages()
 
@@ -236,7 +361,7 @@ class MessageLoop:
     while cb():
       if _quit_requested:
         raise QuitException()
-      time.sleep(0.001)
+      MessageLoop._wait_for_work()
       MessageLoop._run_until_empty()
       MessageLoop._run_pending_messages()
 
@@ -284,13 +409,35 @@ class MessageLoop:
     # gtk idle hook
     global _idle_hook_enabled
     _idle_hook_enabled = True
-    def on_idle():
+    # Rather than spinning in an idle handler, wake up when the wakeup pipe is
+    # written to and arm a one-shot timer for the earliest delayed message.
+    timer_deadline = [None]
+    def schedule_timer():
+      timeout = MessageLoop._get_time_until_next_delayed_message()
+      if timeout == None:
+        return
+      deadline = time.time() + timeout
+      if timer_deadline[0] != None and timer_deadline[0] <= deadline:
+        return
+      timer_deadline[0] = deadline
+      glib.timeout_add(int(timeout * 1000) + 1, on_timer)
+    def on_timer():
+      timer_deadline[0] = None
       MessageLoop._run_until_empty()
       MessageLoop._run_pending_messages()
+      if _idle_hook_enabled:
+        schedule_timer()
+      return False
+    def on_wakeup(*args):
+      _drain_wakeup_pipe()
+      MessageLoop._run_until_empty()
+      MessageLoop._run_pending_messages()
+      schedule_timer()
       return _idle_hook_enabled
 
     if gtk:
-      glib.idle_add(on_idle)
+      glib.io_add_watch(_get_wakeup_pipe()[0], glib.IO_IN, on_wakeup)
+      on_wakeup()
 
     # install exception hook
     global _original_excepthook
@@ -338,6 +485,7 @@ class MessageLoop:
     _initialied = False
 
     # fix the idle proc
+    global _idle_hook_enabled
     _idle_hook_enabled = False
 
     # run cleanup_hooks
@@ -21,6 +21,24 @@ def _RemoteServer(cls, c2s, s2c):
   log2("RemoteServer for %s started", cls)
   inst = cls()
   exp = ExponentialBackoff()
+  streams = {} # resp_id -> iterator of a call_async_stream that hasn't finished
+
+  def step_streams():
+    # one part from each stream at a time, so that cancels get in between parts
+    for resp_id, stream in streams.items():
+      try:
+        part = stream.next()
+      except StopIteration:
+        del streams[resp_id]
+        s2c.put(('stream_done', (resp_id,)))
+        continue
+      except:
+        del streams[resp_id]
+        exc = traceback.format_exc()
+        s2c.put(('async_exception', (resp_id, exc)))
+        continue
+      s2c.put(('stream_part', (resp_id, part)))
+
   def remote_server_loop():
     found = False
     while True:
@@ -48,6 +66,21 @@ def _RemoteServer(cls, c2s, s2c):
               s2c.put(('async_exception', (resp_id, exc)))
               continue
             s2c.put(('async_result', (resp_id, ret)))
+          elif cmd == 'call_async_stream':
+            resp_id = args[0]
+            fn_name = args[1]
+            rest = args[2]
+            fn = getattr(inst, fn_name)
+            try:
+              streams[resp_id] = iter(fn(*rest))
+            except:
+              exc = traceback.format_exc()
+              s2c.put(('async_exception', (resp_id, exc)))
+          elif cmd == 'cancel':
+            resp_id = args[0]
+            stream = streams.pop(resp_id, None)
+            if hasattr(stream, 'close'):
+              stream.close()
           else:
             raise Exception("Unrecognized command: %s" % cmd)
         except:
@@ -55,6 +88,9 @@ def _RemoteServer(cls, c2s, s2c):
           traceback.print_exc()
       except Queue.Empty:
         break
+    if len(streams):
+      step_streams()
+      found = True
     if found:
 #      print "Resetting"
       exp.reset()
@@ -77,6 +113,32 @@ def _RemoteServer(cls, c2s, s2c):
 
 _active_clients = []
 
+class RemoteStream(CallbackDrivenWaitable):
+  """
+  The parts a remote generator yields. part_received fires with each as it
+  arrives; once the generator is exhausted, the stream is done with the
+  number of parts it had. cancel() stops the generator on the server and
+  drops any parts still in flight.
+  """
+  def __init__(self, client, resp_id):
+    CallbackDrivenWaitable.__init__(self)
+    self._client = client
+    self._resp_id = resp_id
+    self._num_parts = 0
+    self.part_received = Event()
+
+  num_parts = property(lambda self: self._num_parts)
+
+  def _on_part(self, part):
+    self._num_parts += 1
+    self.part_received.fire(part)
+
+  def cancel(self):
+    if self._done:
+      return
+    self._client._cancel_stream(self._resp_id)
+    self.abort(Exception("Cancelled"))
+
 class RemoteClient():
   def __init__(self, cls):
     self._cls = cls
@@ -122,11 +184,23 @@ class RemoteClient():
           elif cmd == 'async_exception':
             resp_id = args[0]
             exc_fmt = args[1]
-            w = self._pending_waitables[resp_id]
-            del self._pending_waitables[resp_id]
+            w = self._pending_waitables.pop(resp_id, None)
+            if w == None: # a stream that was cancelled
+              continue
             print "While processing server replies:"
             print exc_fmt
             w.abort(Exception(exc_fmt))
+          elif cmd == 'stream_part':
+            resp_id = args[0]
+            part = args[1]
+            w = self._pending_waitables.get(resp_id)
+            if w != None: # else, cancelled
+              w._on_part(part)
+          elif cmd == 'stream_done':
+            resp_id = args[0]
+            w = self._pending_waitables.pop(resp_id, None)
+            if w != None:
+              w.set_done(w.num_parts)
           else:
             raise Exception("Unrecognized command: %s" % cmd)
         except:
@@ -147,6 +221,20 @@ class RemoteClient():
     self._pending_waitables[cur_id] = waitable
     return waitable
 
+  def call_async_stream(self, fn_name, *args):
+    cur_id = self._resp_id
+    self._resp_id += 1
+    stream = RemoteStream(self, cur_id)
+    self._pending_waitables[cur_id] = stream
+    self._c2s_put('call_async_stream', cur_id, fn_name, args)
+    return stream
+
+  def _cancel_stream(self, resp_id):
+    if self._pending_waitables.pop(resp_id, None) == None:
+      return
+    if self._c2s:
+      self._c2s_put('cancel', resp_id)
+
   def shutdown(self):
     log2("Shutting down remote class %s", self._cls)
     if self._c2s:
@@ -199,11 +287,14 @@ class RemoteClassInner(object):
 
 class RemoteClass(object):
   """This class wraps the provided class in a child process with Multiprocessing,
-  then expoes its methods in three ways:
+  then expoes its methods in four ways:
   - call : regular, blocking call to the remote method.
   - call_async: async call to the remote method. Ignores return value.
   - call_async_waitable: async call to the remote method. Returns a waitable, which
     will eventually provide the return value.
+  - call_async_stream: async call to a remote method that returns an
+    iterable, typically a generator. Returns a RemoteStream, whose
+    part_received event fires with each item as the server produces it.
 
   For example:
     class A:
@@ -227,12 +318,33 @@ class RemoteClass(object):
     Done: 6
     => 6
 
+    # Calls a generator, gets its items one at a time.
+    class B:
+      def count(n):
+        for i in range(n):
+          yield i
+    b = RemoteClass(B)
+    s = b.call_async_stream.count(3)
+    s.part_received.add_listener(lambda i: print("Got: ", i))
+    s.wait()
+    Got: 0
+    Got: 1
+    Got: 2
+    => 3
+
+  The server takes one item from each running stream in turn between
+  handling calls, so a stream's cancel() takes effect after at most one
+  more item is computed. Items the client receives after cancel() are
+  dropped.
+
   When exceptions occur on the remote method:
   - call will raise the exception
   - call_async will ignore the exception
   - call_async_waitable will:
      - wait() and get_return_value() will raise an exception [but not of the same Type!]
      - when_done callbcaks will not run
+  - call_async_stream will behave like call_async_waitable, after firing
+    part_received for the items produced before the exception
 
   """
   def __init__(self, cls):
@@ -256,11 +368,17 @@ class RemoteClass(object):
       return call_async_waitable
     self.call_async_waitable = RemoteClassInner(lambda k: make_call_async_waitable(k))
 
+    def make_call_async_stream(k):
+      def call_async_stream(*args):
+        return self._client.call_async_stream(k,*args)
+      return call_async_stream
+    self.call_async_stream = RemoteClassInner(lambda k: make_call_async_stream(k))
+
   def shutdown(self):
     self._client.shutdown()
 
   def __setattr__(self,k,v):
-    if k in ('_client', 'call', 'call_async', 'call_async_waitable'):
+    if k in ('_client', 'call', 'call_async', 'call_async_waitable', 'call_async_stream'):
       return object.__setattr__(self, k,v)
     else:
       raise Exception("Cannot assign to here.")